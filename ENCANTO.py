@@ -4,105 +4,246 @@ Sistema profesional de gestión de productos y ventas (Tkinter).
 
 - Autocompletado búsqueda por artículo/nombre.
 - Carrito de venta con varios artículos y cantidades editables.
-- Registro de cliente por venta (nombre, DNI, teléfono).
+- Registro de cliente por venta (nombre, DNI, teléfono); los clientes que ya
+  compraron se autocompletan y tienen su historial (clientes.py).
 - Stock descontado automáticamente al registrar la venta.
 - Reporte por rango de fechas en ventana nueva + exportar a Excel/PDF.
-- Persistencia en JSON: productos.json y ventas.json.
+- Meses cerrados archivados por mes (archivo.py): al abrir se carga solo el
+  mes en curso y la pestaña Historial muestra ese mes; reportes, análisis e
+  historial de clientes traen los meses viejos cuando los tocan.
+- Pestaña Análisis: más vendidos, ingresos por marca/mes, rotación, días de
+  stock y sugerencias de reposición (analitica.py, NumPy opcional).
+- Importación / exportación masiva del catálogo en CSV o XLSX (catalogo.py).
+- Stock mínimo por producto y panel "Para reponer" con exportación (alertas.py).
+- Persistencia en JSON: productos.json y ventas.json (+ diario ventas.jsonl
+  y copia binaria .bin para cargar rápido, ver binario.py),
+  o en SQLite (ENCANTO_ALMACEN=sqlite, ver almacenamiento.py).
+- Varias cajas: con SQLite compartido (ENCANTO_CAJA identifica la caja) el
+  carrito reserva stock y los cambios de las otras cajas se traen solos.
+- API HTTP/JSON local opcional (ENCANTO_API=puerto, ver servidor_api.py).
+- Tiempos por operación y log de operaciones lentas (metricas.py); Ctrl+Shift+D
+  abre la ventana de diagnóstico con p50/p95/p99.
+- Arranque rápido: la ventana aparece antes de leer los datos (se cargan en
+  un hilo, ver nucleo.CargaEnSegundoPlano) y openpyxl/reportlab se importan
+  recién al exportar.
+- Lógica de negocio sin UI en nucleo.py (MotorEncanto); esta clase es solo la interfaz Tk.
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
-from datetime import datetime
-import json, os
-
-# Optional libs for export
-try:
-    from openpyxl import Workbook
-except Exception:
-    Workbook = None
-
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet
-except Exception:
-    SimpleDocTemplate = None
-
-DATA_FILE = "productos.json"
-VENTAS_FILE = "ventas.json"
+from datetime import datetime, timedelta
+import atexit, os, time
+
+from nucleo import MotorEncanto, ErrorNegocio, CarritoVacio, CargaEnSegundoPlano, RESERVA_SEGUNDOS
+from escritor import EscritorSegundoPlano
+from carrito import Carrito, StockInsuficiente, formato_pesos
+from vistas import TablaVirtual
+import exportar
+import reportes
+import catalogo
+import analitica
+from precios import FiltroPrecios
+from alertas import minimo_de, exportar_reponer
+import metricas
+from metricas import medido, medir
+
+# Optional libs for export (openpyxl, reportlab): see exportar.py
+
+BUSQUEDA_DEMORA_MS = 150  # debounce del autocompletado
+REVISAR_ESCRITOR_MS = 300  # polling de errores del hilo de guardado
+PROGRESO_MS = 100  # refresco de la barra de progreso de exportación
+REPORTE_BLOQUE = 500  # líneas de reporte insertadas por tanda
+SINCRONIZAR_MS = 2000  # polling de cambios de otras cajas (almacén compartido)
+DIAGNOSTICO_MS = 1000  # refresco de la ventana de diagnóstico
+CARGA_MS = 50  # polling de la carga inicial en segundo plano
+ANALISIS_DIAS = 90  # rango por defecto de la pestaña Análisis
+ANALISIS_TOP = 50  # filas de "más vendidos"
+VISTAS_ANALISIS = ["Más vendidos (unidades)", "Más vendidos (importe)", "Ingresos por marca", "Ingresos por mes",
+                   "Rotación y días de stock", "Sugerencias de reposición"]
 
 class GestorRopaInterior:
     def __init__(self, root):
         self.root = root
         self.root.title("Gestor - Ropa Interior (Profesional)")
         self.root.geometry("1200x760")
-        self.productos = []
-        self.ventas = []
-        self.cargar_datos()
-        self.cargar_ventas()
+        # business logic lives in nucleo.MotorEncanto; writes go through a background thread
+        self.escritor = EscritorSegundoPlano()
+        atexit.register(self.escritor.vaciar, 30)
+        self.motor = MotorEncanto(escritor=self.escritor)
+        # JSON: one instance per data folder (several registers need SQLite)
+        try:
+            self.motor.bloquear()
+        except ErrorNegocio as e:
+            messagebox.showerror("ENCANTO ya está abierto", str(e))
+            self.root.destroy()
+            raise SystemExit(1)
+        self.carrito = Carrito()
+        self._after_busqueda = None
+        self._ultima_renovacion = time.monotonic()
+        self.root.protocol("WM_DELETE_WINDOW", self._al_cerrar)
+        self.servidor_api = None
         self.crear_ui()
+        self._ventana_diag = None
+        self.root.bind_all("<Control-D>", lambda e: self._abrir_diagnostico())  # Ctrl+Shift+D
+        self.root.after(REVISAR_ESCRITOR_MS, self._revisar_escritor)
+        if self.motor.compartido:
+            self.root.title(f"{self.root.title()} - Caja {self.motor.caja}")
+        # the window shows up right away; JSON parsing and table rows run off the Tk thread
+        self._carga = CargaEnSegundoPlano(self.motor, preparar=lambda: self._lineas_hist(self.motor.ventas))
+        self._carga.start()
+        self.root.after(CARGA_MS, self._revisar_carga)
+
+    def _revisar_carga(self):
+        carga = self._carga
+        if not carga.terminado:
+            self.root.after(CARGA_MS, self._revisar_carga)
+            return
+        self._carga = None
+        if carga.error is not None:
+            messagebox.showerror("Error", f"No se pudieron cargar los datos:\n{carga.error}")
+            self.motor.cerrar(timeout=5)
+            self.root.destroy()
+            return
+        self.frm_cargando.destroy()
+        self.nb.pack(fill="both", expand=True, padx=8, pady=8)
+        self._refresh_tree_prod()
+        self.tabla_hist.set_filas(carga.preparado)
+        self._refresh_productos_venta()
+        if carga.avisos:
+            messagebox.showwarning("Aviso", "\n\n".join(carga.avisos))
+        if self.motor.compartido:
+            self.root.after(SINCRONIZAR_MS, self._sincronizar_cajas)
+        api = os.environ.get("ENCANTO_API", "").strip()
+        if api and api != "0":
+            # ENCANTO_API=<puerto> (o =1 para el puerto por defecto)
+            self._iniciar_api(int(api) if api.isdigit() and int(api) > 1 else None)
+
+    def _iniciar_api(self, puerto=None):
+        # imported here: the API is optional and the cash register runs without it
+        import servidor_api
+        api = servidor_api.API(self.motor, servidor_api.EjecutorTk(self.root), al_vender=self._venta_api)
+        try:
+            self.servidor_api = servidor_api.ServidorAPI(api, puerto=puerto or servidor_api.PUERTO)
+        except OSError as e:
+            messagebox.showerror("API", f"No se pudo iniciar la API local: {e}")
+            return
+        self.servidor_api.iniciar()
+
+    def _venta_api(self, venta, cambiados):
+        # runs on the Tk thread (EjecutorTk)
+        self._refresh_tree_prod(cambiados)
+        self._refresh_historial([venta])
+        for linea in self.carrito:
+            p = self.repo.get(linea.articulo)
+            if p:
+                self._pintar_linea_carrito(linea, p['stock'])
+
+    @property
+    def productos(self):
+        return self.motor.productos
+
+    @property
+    def ventas(self):
+        return self.motor.ventas
+
+    @property
+    def repo(self):
+        return self.motor.repo
 
     # -------------------- I/O --------------------
-    def cargar_datos(self):
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        self.productos = data
-                    else:
-                        self.productos = []
-            except Exception:
-                messagebox.showwarning("Aviso", f"{DATA_FILE} corrupto. Iniciando inventario vacío.")
-                self.productos = []
-        else:
-            self.productos = []
-
-        # normalize types
-        for p in self.productos:
-            try: p["precio"] = float(p.get("precio", 0) or 0)
-            except: p["precio"] = 0.0
-            try: p["stock"] = int(p.get("stock", 0) or 0)
-            except: p["stock"] = 0
-            p["articulo"] = str(p.get("articulo","")).strip()
-            p["nombre"] = str(p.get("nombre","")).strip()
-            p["marca"] = str(p.get("marca","")).strip()
-
-    def guardar_datos(self):
+    def _revisar_escritor(self):
+        errores = self.motor.tomar_errores()
+        if errores:
+            messagebox.showerror("Error", "\n".join(errores))
+        self.root.after(REVISAR_ESCRITOR_MS, self._revisar_escritor)
+
+    def _sincronizar_cajas(self):
         try:
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.productos, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo guardar productos: {e}")
+            self.motor.sincronizar()
+            if len(self.carrito) and time.monotonic() - self._ultima_renovacion > RESERVA_SEGUNDOS / 3:
+                self.motor.renovar_reservas()
+                self._ultima_renovacion = time.monotonic()
+        except Exception:
+            pass  # database busy/locked by another register: try again next round
+        self._aplicar_cambios_remotos()
+        self.root.after(SINCRONIZAR_MS, self._sincronizar_cajas)
 
-    def cargar_ventas(self):
-        if os.path.exists(VENTAS_FILE):
-            try:
-                with open(VENTAS_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        self.ventas = data
-                    else:
-                        self.ventas = []
-            except Exception:
-                messagebox.showwarning("Aviso", f"{VENTAS_FILE} corrupto. Iniciando historial vacío.")
-                self.ventas = []
+    @medido("ui_cambios_remotos")
+    def _aplicar_cambios_remotos(self):
+        cambiados, lista, ventas = self.motor.tomar_cambios_remotos()
+        if lista:
+            self._refresh_tree_prod()
+            self._refresh_productos_venta()
+        elif cambiados:
+            self._refresh_tree_prod(cambiados)
+        if lista or cambiados:
+            # stock shown in the cart
+            for linea in self.carrito:
+                p = self.repo.get(linea.articulo)
+                if p:
+                    self._pintar_linea_carrito(linea, p['stock'])
+        if ventas:
+            self._refresh_historial(ventas)
+
+    def _al_cerrar(self):
+        if self.servidor_api is not None:
+            self.servidor_api.detener()
+            self.servidor_api = None
+        # flush pending writes before closing
+        if not self.motor.cerrar(timeout=30):
+            if not messagebox.askyesno("Guardando", "Todavía hay datos sin guardar. ¿Cerrar igual?"):
+                return
+        errores = self.motor.tomar_errores()
+        if errores:
+            messagebox.showerror("Error", "\n".join(errores))
+        self.root.destroy()
+
+    # -------------------- Diagnóstico --------------------
+    def _abrir_diagnostico(self):
+        # hidden window (Ctrl+Shift+D): per-operation latency percentiles
+        if self._ventana_diag is not None and self._ventana_diag.winfo_exists():
+            self._ventana_diag.lift()
+            return
+        w = self._ventana_diag = tk.Toplevel(self.root)
+        w.title("Diagnóstico - tiempos por operación")
+        w.geometry("820x420")
+        if metricas.ACTIVO:
+            info = f"Operaciones de más de {metricas.UMBRAL_LENTO * 1000:.0f} ms: {metricas.ruta_log()}"
         else:
-            self.ventas = []
+            info = "Métricas desactivadas (ENCANTO_METRICAS=0)."
+        ttk.Label(w, text=info, foreground="gray").pack(anchor="w", padx=10, pady=(8,4))
+        frm = ttk.Frame(w); frm.pack(fill="both", expand=True, padx=10)
+        cols = ("op","n","p50","p95","p99","max","total")
+        tree = ttk.Treeview(frm, columns=cols, show="headings")
+        for col, t in zip(cols, ("Operación","Veces","p50 ms","p95 ms","p99 ms","Máx. ms","Total s")):
+            tree.heading(col, text=t); tree.column(col, width=220 if col == "op" else 90, anchor="w" if col == "op" else "e")
+        sb = ttk.Scrollbar(frm, orient="vertical", command=tree.yview); sb.pack(side="right", fill="y")
+        tree.configure(yscrollcommand=sb.set)
+        tree.pack(side="left", fill="both", expand=True)
+        ttk.Button(w, text="Reiniciar", command=lambda: (metricas.reiniciar(), refrescar(False))).pack(pady=8)
 
-    def guardar_ventas(self):
-        try:
-            with open(VENTAS_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.ventas, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo guardar ventas: {e}")
+        def refrescar(seguir=True):
+            if not w.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for nombre, n, p50, p95, p99, maximo, total in metricas.resumen():
+                tree.insert("", "end", values=(nombre, n, f"{p50 * 1000:.1f}", f"{p95 * 1000:.1f}",
+                                               f"{p99 * 1000:.1f}", f"{maximo * 1000:.1f}", f"{total:.2f}"))
+            if seguir:
+                w.after(DIAGNOSTICO_MS, refrescar)
+        refrescar()
 
     # -------------------- UI --------------------
     def crear_ui(self):
-        # Notebook
-        nb = ttk.Notebook(self.root)
-        nb.pack(fill="both", expand=True, padx=8, pady=8)
+        # Notebook: packed when the data is loaded (_revisar_carga); until then
+        # nothing in it can be clicked or focused
+        nb = self.nb = ttk.Notebook(self.root)
+        self.frm_cargando = ttk.Frame(self.root)
+        self.frm_cargando.pack(fill="both", expand=True)
+        ttk.Label(self.frm_cargando, text="Cargando productos y ventas...").pack(pady=(200, 8))
+        barra = ttk.Progressbar(self.frm_cargando, mode="indeterminate", length=260)
+        barra.pack()
+        barra.start(15)
 
         # Tab Productos
         tab_prod = ttk.Frame(nb)
@@ -114,6 +255,11 @@ class GestorRopaInterior:
         nb.add(tab_ventas, text="Ventas")
         self._ui_ventas(tab_ventas)
 
+        # Tab Análisis
+        tab_analisis = ttk.Frame(nb)
+        nb.add(tab_analisis, text="Análisis")
+        self._ui_analisis(tab_analisis)
+
         # Footer: info sobre dependencias
         info = "Export: openpyxl (Excel) and reportlab (PDF). Install with: pip install openpyxl reportlab"
         lbl = ttk.Label(self.root, text=info, foreground="gray")
@@ -128,6 +274,8 @@ class GestorRopaInterior:
         self.ent_articulo = ttk.Entry(frm, width=20); self.ent_articulo.grid(row=0, column=1, padx=6)
         ttk.Label(frm, text="Nombre:").grid(row=0, column=2, sticky="w")
         self.ent_nombre = ttk.Entry(frm, width=40); self.ent_nombre.grid(row=0, column=3, padx=6)
+        ttk.Label(frm, text="Stock mín.:").grid(row=0, column=4, sticky="w")
+        self.ent_minimo = ttk.Entry(frm, width=10); self.ent_minimo.grid(row=0, column=5, padx=6)
         ttk.Label(frm, text="Marca:").grid(row=1, column=0, sticky="w")
         self.ent_marca = ttk.Entry(frm, width=20); self.ent_marca.grid(row=1, column=1, padx=6)
         ttk.Label(frm, text="Precio:").grid(row=1, column=2, sticky="w")
@@ -138,22 +286,49 @@ class GestorRopaInterior:
         ttk.Button(frm, text="Agregar/Actualizar", command=self.agregar_o_actualizar_producto).grid(row=0, column=6, rowspan=2, padx=8)
         ttk.Button(frm, text="Limpiar", command=self.limpiar_form_producto).grid(row=0, column=7, rowspan=2, padx=4)
 
-        # Tabla productos
+        # Tabla productos (virtual: only visible rows exist in the Treeview, iid = articulo)
+        frm_tree = ttk.Frame(parent); frm_tree.pack(fill="both", expand=True, padx=10, pady=10)
         cols = ("articulo","nombre","marca","precio","stock")
-        self.tree_prod = ttk.Treeview(parent, columns=cols, show="headings", selectmode="browse", height=14)
+        self.tree_prod = ttk.Treeview(frm_tree, columns=cols, show="headings", selectmode="browse", height=14)
         for c, t, w in [("articulo","Artículo",100),("nombre","Nombre",360),("marca","Marca",120),("precio","Precio",100),("stock","Stock",80)]:
             self.tree_prod.heading(c, text=t)
             self.tree_prod.column(c, width=w, anchor=("e" if c=="precio" else "w"))
-        self.tree_prod.pack(fill="both", expand=True, padx=10, pady=10)
+        sb_prod = ttk.Scrollbar(frm_tree, orient="vertical")
+        sb_prod.pack(side="right", fill="y")
+        self.tree_prod.pack(side="left", fill="both", expand=True)
         self.tree_prod.bind("<Double-1>", self._cargar_producto_para_editar)
+        self.tabla_prod = TablaVirtual(
+            self.tree_prod,
+            lambda p: (p["articulo"], p["nombre"], p["marca"], f"${p['precio']:.2f}", p["stock"]),
+            lambda p: p["articulo"], self.productos, scrollbar=sb_prod)
 
         # Botones acciones
         frm_actions = ttk.Frame(parent); frm_actions.pack(fill="x", padx=10, pady=(0,10))
         ttk.Button(frm_actions, text="Eliminar seleccionado", command=self.eliminar_producto).pack(side="left", padx=6)
-        ttk.Button(frm_actions, text="Aplicar % por Marca", command=self._dialog_aplicar_porcentaje_marca).pack(side="left", padx=6)
+        ttk.Button(frm_actions, text="Cambiar precios...", command=self._abrir_cambio_precios).pack(side="left", padx=6)
+        ttk.Button(frm_actions, text="Deshacer cambio de precios", command=self._deshacer_cambio_precios).pack(side="left", padx=6)
         ttk.Button(frm_actions, text="Actualizar stock (seleccion)", command=self._dialog_actualizar_stock_seleccion).pack(side="left", padx=6)
+        ttk.Button(frm_actions, text="Importar catálogo...", command=self._importar_catalogo).pack(side="left", padx=6)
+        ttk.Button(frm_actions, text="Exportar catálogo...", command=self._exportar_catalogo).pack(side="left", padx=6)
 
-        self._refresh_tree_prod()
+        # Para reponer: products at or below their minimum, kept by the engine's index
+        self.frm_reponer = ttk.LabelFrame(parent, text="Para reponer", padding=6)
+        self.frm_reponer.pack(fill="x", padx=10, pady=(0,10))
+        cols_r = ("articulo","nombre","marca","stock","minimo","faltante")
+        tree_r = ttk.Treeview(self.frm_reponer, columns=cols_r, show="headings", selectmode="browse", height=5)
+        for c, t, w in [("articulo","Artículo",100),("nombre","Nombre",360),("marca","Marca",120),("stock","Stock",80),("minimo","Mínimo",80),("faltante","Faltante",80)]:
+            tree_r.heading(c, text=t)
+            tree_r.column(c, width=w)
+        sb_r = ttk.Scrollbar(self.frm_reponer, orient="vertical")
+        sb_r.pack(side="right", fill="y")
+        ttk.Button(self.frm_reponer, text="Exportar lista...", command=self._exportar_reponer).pack(side="right", padx=6, anchor="n")
+        tree_r.pack(side="left", fill="both", expand=True)
+        self.tabla_reponer = TablaVirtual(
+            tree_r,
+            lambda p: (p["articulo"], p["nombre"], p["marca"], p["stock"], minimo_de(p), minimo_de(p) - p["stock"]),
+            lambda p: p["articulo"], scrollbar=sb_r)
+        self._version_reponer = None
+        # rows are filled once the data is loaded (_revisar_carga)
 
     def limpiar_form_producto(self):
         self.ent_articulo.delete(0, tk.END)
@@ -161,29 +336,24 @@ class GestorRopaInterior:
         self.ent_marca.delete(0, tk.END)
         self.ent_precio.delete(0, tk.END)
         self.ent_stock.delete(0, tk.END)
+        self.ent_minimo.delete(0, tk.END)
 
     def agregar_o_actualizar_producto(self):
         art = self.ent_articulo.get().strip()
-        nombre = self.ent_nombre.get().strip()
-        marca = self.ent_marca.get().strip()
         try:
-            precio = float(self.ent_precio.get())
-            stock = int(self.ent_stock.get())
-        except Exception:
-            messagebox.showerror("Error", "Precio o stock inválidos.")
-            return
-        if not art or not nombre or not marca:
-            messagebox.showerror("Error", "Artículo, Nombre y Marca son obligatorios.")
+            p, nuevo = self.motor.agregar_o_actualizar_producto(
+                art, self.ent_nombre.get(), self.ent_marca.get(), self.ent_precio.get(), self.ent_stock.get(), self.ent_minimo.get())
+        except ErrorNegocio as e:
+            self._aplicar_cambios_remotos()
+            messagebox.showerror("Error", str(e))
             return
-        # si existe artículo, actualizar
-        existing = next((p for p in self.productos if p["articulo"]==art), None)
-        if existing:
-            existing.update({"nombre":nombre,"marca":marca,"precio":precio,"stock":stock})
-            messagebox.showinfo("Actualizado", f"Producto {art} actualizado.")
-        else:
-            self.productos.append({"articulo":art,"nombre":nombre,"marca":marca,"precio":precio,"stock":stock})
+        if nuevo:
             messagebox.showinfo("Agregado", f"Producto {art} agregado.")
-        self.guardar_datos(); self._refresh_tree_prod(); self.limpiar_form_producto()
+            self._refresh_tree_prod()
+        else:
+            messagebox.showinfo("Actualizado", f"Producto {art} actualizado.")
+            self._refresh_tree_prod([p])
+        self.limpiar_form_producto()
         # also refresh venta product lists
         self._refresh_productos_venta()
 
@@ -192,13 +362,16 @@ class GestorRopaInterior:
         if not sel: return
         vals = self.tree_prod.item(sel[0], "values")
         art = vals[0]
-        p = next((x for x in self.productos if x["articulo"]==art), None)
+        p = self.repo.get(art)
         if not p: return
         self.ent_articulo.delete(0, tk.END); self.ent_articulo.insert(0, p["articulo"])
         self.ent_nombre.delete(0, tk.END); self.ent_nombre.insert(0, p["nombre"])
         self.ent_marca.delete(0, tk.END); self.ent_marca.insert(0, p["marca"])
         self.ent_precio.delete(0, tk.END); self.ent_precio.insert(0, f"{p['precio']:.2f}")
         self.ent_stock.delete(0, tk.END); self.ent_stock.insert(0, str(p["stock"]))
+        self.ent_minimo.delete(0, tk.END)
+        if p.get("minimo") is not None:
+            self.ent_minimo.insert(0, str(p["minimo"]))
 
     def eliminar_producto(self):
         sel = self.tree_prod.selection()
@@ -209,29 +382,115 @@ class GestorRopaInterior:
         art = vals[0]
         if not messagebox.askyesno("Confirmar", f"Eliminar artículo {art}?"):
             return
-        self.productos = [p for p in self.productos if p["articulo"]!=art]
-        self.guardar_datos()
+        try:
+            self.motor.eliminar_producto(art)
+        except ErrorNegocio as e:
+            self._aplicar_cambios_remotos()
+            messagebox.showerror("Error", str(e))
+            return
         self._refresh_tree_prod()
         self._refresh_productos_venta()
 
-    def _dialog_aplicar_porcentaje_marca(self):
-        marcas = sorted({p["marca"] for p in self.productos if p.get("marca")})
-        if not marcas:
-            messagebox.showinfo("Info", "No hay marcas cargadas.")
+    def _abrir_cambio_precios(self):
+        # filter -> preview (nothing touched) -> apply as one batch
+        w = tk.Toplevel(self.root)
+        w.title("Cambio de precios en lote")
+        w.geometry("900x560")
+        frm = ttk.LabelFrame(w, text="Filtro y cambio"); frm.pack(fill="x", padx=10, pady=8)
+        ttk.Label(frm, text="Marca:").grid(row=0, column=0, sticky="e")
+        cmb_marca = ttk.Combobox(frm, values=[""] + self.motor.marcas(), width=18); cmb_marca.grid(row=0, column=1, padx=4, pady=2)
+        ttk.Label(frm, text="Artículo empieza con:").grid(row=0, column=2, sticky="e")
+        ent_prefijo = ttk.Entry(frm, width=12); ent_prefijo.grid(row=0, column=3, padx=4)
+        ttk.Label(frm, text="Nombre (texto o patrón *):").grid(row=0, column=4, sticky="e")
+        ent_patron = ttk.Entry(frm, width=20); ent_patron.grid(row=0, column=5, padx=4)
+        ttk.Label(frm, text="Stock mín:").grid(row=1, column=0, sticky="e")
+        ent_smin = ttk.Entry(frm, width=8); ent_smin.grid(row=1, column=1, sticky="w", padx=4, pady=2)
+        ttk.Label(frm, text="Stock máx:").grid(row=1, column=2, sticky="e")
+        ent_smax = ttk.Entry(frm, width=8); ent_smax.grid(row=1, column=3, sticky="w", padx=4)
+        ttk.Label(frm, text="% (+/-):").grid(row=2, column=0, sticky="e")
+        ent_pct = ttk.Entry(frm, width=8); ent_pct.grid(row=2, column=1, sticky="w", padx=4, pady=2)
+        ttk.Label(frm, text="Monto fijo $:").grid(row=2, column=2, sticky="e")
+        ent_monto = ttk.Entry(frm, width=8); ent_monto.grid(row=2, column=3, sticky="w", padx=4)
+        ttk.Label(frm, text="Redondear a $:").grid(row=2, column=4, sticky="e")
+        ent_redondeo = ttk.Entry(frm, width=8); ent_redondeo.grid(row=2, column=5, sticky="w", padx=4)
+
+        frm_tabla = ttk.Frame(w); frm_tabla.pack(fill="both", expand=True, padx=10)
+        cols = ("articulo","nombre","marca","anterior","nuevo","dif")
+        tree = ttk.Treeview(frm_tabla, columns=cols, show="headings")
+        for c, txt in zip(cols, ("Artículo","Nombre","Marca","Precio actual","Precio nuevo","Diferencia")):
+            tree.heading(c, text=txt)
+            tree.column(c, width=90 if c not in ("nombre",) else 260)
+        sb = ttk.Scrollbar(frm_tabla, orient="vertical"); sb.pack(side="right", fill="y")
+        tree.pack(side="left", fill="both", expand=True)
+        tabla = TablaVirtual(
+            tree,
+            lambda c: (c.producto["articulo"], c.producto["nombre"], c.producto["marca"], f"${c.anterior:.2f}", f"${c.nuevo:.2f}", f"{c.diferencia:+.2f}"),
+            lambda c: c.producto["articulo"], scrollbar=sb)
+        lbl = ttk.Label(w, text="Calcule la vista previa para ver los cambios."); lbl.pack(anchor="w", padx=10, pady=4)
+        estado = {"cambios": [], "descripcion": ""}
+
+        def numero(ent, tipo=float):
+            t = ent.get().strip().replace(",", ".")
+            return tipo(t) if t else None
+
+        def previsualizar():
+            try:
+                filtro = FiltroPrecios(cmb_marca.get(), ent_prefijo.get(), ent_patron.get(), numero(ent_smin, int), numero(ent_smax, int))
+                pct = numero(ent_pct) or 0.0; monto = numero(ent_monto) or 0.0; redondeo = numero(ent_redondeo) or 0
+            except ValueError:
+                messagebox.showerror("Error", "Valores numéricos inválidos.", parent=w)
+                return
+            try:
+                cambios = self.motor.previsualizar_precios(filtro, pct, monto, redondeo)
+            except ErrorNegocio as e:
+                messagebox.showerror("Error", str(e), parent=w)
+                return
+            partes = [f"{pct:+g}%" if pct else "", f"{monto:+g}$" if monto else "", f"redondeo {redondeo:g}" if redondeo else ""]
+            estado["cambios"] = cambios
+            estado["descripcion"] = " ".join(p for p in partes if p) + f" ({filtro.describir()})"
+            tabla.set_filas(cambios)
+            dif = sum(c.diferencia for c in cambios)
+            lbl.config(text=f"{len(cambios)} productos cambian. Diferencia total (por unidad): ${dif:,.2f}")
+
+        def aplicar():
+            cambios = estado["cambios"]
+            if not cambios:
+                messagebox.showinfo("Info", "No hay cambios para aplicar.", parent=w)
+                return
+            if not messagebox.askyesno("Confirmar", f"Aplicar {len(cambios)} cambios de precio?", parent=w):
+                return
+            try:
+                productos = self.motor.aplicar_cambios_precio(cambios, estado["descripcion"])
+            except ErrorNegocio as e:
+                messagebox.showerror("Error", str(e), parent=w)
+                return
+            self._refresh_tree_prod(productos)
+            w.destroy()
+            messagebox.showinfo("Listo", f"Precio actualizado en {len(productos)} productos.")
+
+        frm_bot = ttk.Frame(w); frm_bot.pack(fill="x", padx=10, pady=(0,10))
+        ttk.Button(frm_bot, text="Vista previa", command=previsualizar).pack(side="left", padx=6)
+        ttk.Button(frm_bot, text="Aplicar", command=aplicar).pack(side="left", padx=6)
+        ttk.Button(frm_bot, text="Cerrar", command=w.destroy).pack(side="right", padx=6)
+
+    def _deshacer_cambio_precios(self):
+        ultimo = self.motor.deshacer_precios.ultimo()
+        if ultimo is None:
+            messagebox.showinfo("Info", "No hay cambios de precio para deshacer.")
+            return
+        if not messagebox.askyesno("Deshacer", f"Deshacer el cambio del {ultimo['fecha']}:\n{ultimo['descripcion']}\n({len(ultimo['cambios'])} productos)?"):
             return
-        marca = simpledialog.askstring("Marca", "Ingrese marca:\n" + ", ".join(marcas))
-        if not marca: return
         try:
-            pct = float(simpledialog.askstring("Porcentaje", "Ingrese porcentaje (+ aumento, - rebaja)"))
-        except Exception:
+            _lote, restaurados, omitidos = self.motor.deshacer_ultimo_cambio_precio()
+        except ErrorNegocio as e:
+            self._aplicar_cambios_remotos()
+            messagebox.showerror("Error", str(e))
             return
-        count = 0
-        for p in self.productos:
-            if p["marca"].lower()==marca.lower():
-                p["precio"] = round(p["precio"]*(1.0 + pct/100.0), 2)
-                count += 1
-        self.guardar_datos(); self._refresh_tree_prod(); self._refresh_productos_venta()
-        messagebox.showinfo("Listo", f"Aplicado {pct}% a {count} productos de {marca}.")
+        self._refresh_tree_prod(restaurados)
+        msg = f"Restaurados {len(restaurados)} precios."
+        if omitidos:
+            msg += f"\n{omitidos} productos se omitieron (editados o eliminados después)."
+        messagebox.showinfo("Deshacer", msg)
 
     def _dialog_actualizar_stock_seleccion(self):
         sel = self.tree_prod.selection()
@@ -241,21 +500,85 @@ class GestorRopaInterior:
         # take first selected for prompt
         vals = self.tree_prod.item(sel[0], "values")
         art = vals[0]
-        p = next((x for x in self.productos if x["articulo"]==art), None)
+        p = self.repo.get(art)
         if not p: return
         try:
             qty = int(simpledialog.askstring("Agregar Stock", f"Ingrese cantidad a sumar para {p['nombre']} (stock actual {p['stock']}):"))
         except Exception:
             messagebox.showerror("Error", "Cantidad inválida.")
             return
-        p["stock"] += qty
-        self.guardar_datos(); self._refresh_tree_prod(); self._refresh_productos_venta()
+        try:
+            p = self.motor.sumar_stock(art, qty)
+        except ErrorNegocio as e:
+            self._aplicar_cambios_remotos()
+            messagebox.showerror("Error", str(e))
+            return
+        self._refresh_tree_prod([p])
         messagebox.showinfo("OK", f"Stock actualizado: {p['stock']}")
 
-    def _refresh_tree_prod(self):
-        self.tree_prod.delete(*self.tree_prod.get_children())
-        for p in self.productos:
-            self.tree_prod.insert("", tk.END, values=(p["articulo"], p["nombre"], p["marca"], f"${p['precio']:.2f}", p["stock"]))
+    def _importar_catalogo(self):
+        tipos = [("Catálogo", "*.csv *.xlsx"), ("CSV files", "*.csv"), ("Excel files", "*.xlsx")]
+        path = filedialog.askopenfilename(filetypes=tipos)
+        if not path: return
+        try:
+            nuevos, actualizados, errores = catalogo.importar_catalogo(self.motor, path)
+        except Exception as e:
+            messagebox.showerror("Error importando", str(e))
+            return
+        # one refresh for the whole batch
+        if nuevos:
+            self._refresh_tree_prod()
+        elif actualizados:
+            self._refresh_tree_prod(actualizados)
+        if nuevos or actualizados:
+            self._refresh_productos_venta()
+        msg = f"Nuevos: {len(nuevos)}   Actualizados: {len(actualizados)}   Filas con error: {len(errores)}"
+        if errores:
+            msg += "\n\n" + "\n".join(f"Fila {n}: {e}" for n, e in errores[:20])
+            if len(errores) > 20:
+                msg += f"\n... y {len(errores) - 20} más."
+            messagebox.showwarning("Importación", msg)
+        else:
+            messagebox.showinfo("Importación", msg)
+
+    def _exportar_catalogo(self):
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files","*.csv"), ("Excel files","*.xlsx")], initialfile="catalogo.csv")
+        if not path: return
+        try:
+            n = catalogo.exportar_catalogo(path, self.productos)
+        except Exception as e:
+            messagebox.showerror("Error exportando", str(e))
+            return
+        messagebox.showinfo("Exportado", f"{n} productos guardados en {path}")
+
+    def _exportar_reponer(self):
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files","*.csv")], initialfile="para_reponer.csv")
+        if not path: return
+        try:
+            n = exportar_reponer(path, self.motor.stock_bajo.listar())
+        except Exception as e:
+            messagebox.showerror("Error exportando", str(e))
+            return
+        messagebox.showinfo("Exportado", f"{n} productos guardados en {path}")
+
+    @medido("ui_refresh_productos")
+    def _refresh_tree_prod(self, cambiados=None):
+        # cambiados: only those rows are updated; None = catalog changed (adds/deletes)
+        if cambiados is None:
+            self.tabla_prod.set_filas(self.productos)
+        else:
+            self.tabla_prod.actualizar(cambiados)
+            self.tabla_reponer.actualizar(cambiados)
+        self._refresh_reponer()
+
+    def _refresh_reponer(self):
+        # O(k): only the low-stock products; skipped when the index did not change
+        bajo = self.motor.stock_bajo
+        if bajo.version == self._version_reponer:
+            return
+        self._version_reponer = bajo.version
+        self.tabla_reponer.set_filas(bajo.listar())
+        self.frm_reponer.config(text=f"Para reponer ({len(bajo)})")
 
     # -------------------- UI Ventas --------------------
     def _ui_ventas(self, parent):
@@ -263,18 +586,26 @@ class GestorRopaInterior:
         frm_cli = ttk.LabelFrame(parent, text="Datos del cliente", padding=8)
         frm_cli.pack(fill="x", padx=10, pady=6)
         ttk.Label(frm_cli, text="Nombre:*").grid(row=0, column=0, sticky="w")
-        self.ent_cli_nombre = ttk.Entry(frm_cli, width=28); self.ent_cli_nombre.grid(row=0, column=1, padx=6)
+        self.ent_cli_nombre = ttk.Combobox(frm_cli, width=28); self.ent_cli_nombre.grid(row=0, column=1, padx=6)
+        self.ent_cli_nombre.bind("<KeyRelease>", self._programar_filtro_clientes)
+        self.ent_cli_nombre.bind("<<ComboboxSelected>>", self._cliente_elegido)
         ttk.Label(frm_cli, text="DNI:*").grid(row=0, column=2, sticky="w")
         self.ent_cli_dni = ttk.Entry(frm_cli, width=18); self.ent_cli_dni.grid(row=0, column=3, padx=6)
+        self.ent_cli_dni.bind("<FocusOut>", self._completar_por_dni)
+        self.ent_cli_dni.bind("<Return>", self._completar_por_dni)
         ttk.Label(frm_cli, text="Teléfono:").grid(row=0, column=4, sticky="w")
         self.ent_cli_tel = ttk.Entry(frm_cli, width=18); self.ent_cli_tel.grid(row=0, column=5, padx=6)
+        ttk.Button(frm_cli, text="Historial del cliente...", command=self._abrir_historial_cliente).grid(row=0, column=6, padx=6)
+        self.lbl_cli_info = ttk.Label(frm_cli, text="", foreground="gray")
+        self.lbl_cli_info.grid(row=1, column=0, columnspan=7, sticky="w", pady=(4,0))
+        self._after_clientes = None
 
         # Buscar y autocompletado
         frm_find = ttk.Frame(parent); frm_find.pack(fill="x", padx=10, pady=6)
         ttk.Label(frm_find, text="Buscar producto (artículo o nombre):").pack(side="left")
         self.ent_buscar = ttk.Combobox(frm_find, width=60)
         self.ent_buscar.pack(side="left", padx=6)
-        self.ent_buscar.bind("<KeyRelease>", self._on_type_filter_products)
+        self.ent_buscar.bind("<KeyRelease>", self._programar_filtro_productos)
         ttk.Button(frm_find, text="Agregar al carrito", command=self._agregar_seleccion_al_carrito).pack(side="left", padx=6)
         ttk.Button(frm_find, text="Limpiar lista búsqueda", command=self._refresh_productos_venta).pack(side="left", padx=6)
 
@@ -309,8 +640,11 @@ class GestorRopaInterior:
         headers = [("fecha","Fecha"),("cliente","Cliente"),("dni","DNI"),("articulo","Artículo"),("nombre","Producto"),("marca","Marca"),("cantidad","Cant."),("total_line","Total $")]
         for c,h in headers:
             self.tree_hist.heading(c, text=h); self.tree_hist.column(c, width=120 if c in ("fecha","dni","cantidad","total_line") else 200)
+        sb_hist = ttk.Scrollbar(frm_hist, orient="vertical")
+        sb_hist.pack(side="right", fill="y")
         self.tree_hist.pack(fill="both", expand=True)
-        self._refresh_historial()
+        # each row = (n, venta, line item); only visible rows are materialized
+        self.tabla_hist = TablaVirtual(self.tree_hist, self._valores_linea_hist, lambda fila: f"h{fila[0]}", scrollbar=sb_hist)
 
         # Reporte frame (fecha inicio/fin + generar)
         frm_report = ttk.LabelFrame(parent, text="Reporte por rango de fechas", padding=8)
@@ -321,25 +655,25 @@ class GestorRopaInterior:
         self.ent_ff = ttk.Entry(frm_report, width=14); self.ent_ff.grid(row=0,column=3,padx=6)
         ttk.Button(frm_report, text="Generar Reporte", command=self._abrir_reporte_ventana).grid(row=0,column=4,padx=6)
 
-        # initialize search combobox contents
-        self._refresh_productos_venta()
-
     # -------------------- Productos -> Venta helpers --------------------
+    @medido("ui_refresh_busqueda")
     def _refresh_productos_venta(self):
-        # set combobox values to "articulo - nombre (marca)" strings
-        vals = [f"{p['articulo']} - {p['nombre']} ({p['marca']})" for p in self.productos]
-        self.ent_buscar['values'] = vals
+        # show first "articulo - nombre (marca)" strings (search index is rebuilt lazily by the engine)
+        self.ent_buscar['values'] = self.motor.indice_busqueda.etiquetas()
         # clear cart product selection not necessary
 
-    def _on_type_filter_products(self, event):
-        text = self.ent_buscar.get().strip().lower()
-        vals = []
-        if text == "":
-            vals = [f"{p['articulo']} - {p['nombre']} ({p['marca']})" for p in self.productos]
-        else:
-            for p in self.productos:
-                if text in p['articulo'].lower() or text in p['nombre'].lower():
-                    vals.append(f"{p['articulo']} - {p['nombre']} ({p['marca']})")
+    def _programar_filtro_productos(self, event=None):
+        # debounce: only filter once typing pauses
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self._after_busqueda is not None:
+            self.root.after_cancel(self._after_busqueda)
+        self._after_busqueda = self.root.after(BUSQUEDA_DEMORA_MS, self._on_type_filter_products)
+
+    @medido("ui_filtro_productos")
+    def _on_type_filter_products(self, event=None):
+        self._after_busqueda = None
+        vals, _total = self.motor.buscar(self.ent_buscar.get())
         self.ent_buscar['values'] = vals
         # optionally auto-open dropdown:
         try:
@@ -354,7 +688,7 @@ class GestorRopaInterior:
             return
         # parse articulo
         art = sel.split(" - ")[0].strip()
-        p = next((x for x in self.productos if x['articulo']==art), None)
+        p = self.repo.get(art)
         if not p:
             messagebox.showerror("Error", "Producto no encontrado.")
             return
@@ -365,44 +699,50 @@ class GestorRopaInterior:
             qty = None
         if not qty:
             return
-        # if product already in cart, increase quantity
-        for iid in self.tree_cart.get_children():
-            vals = self.tree_cart.item(iid, "values")
-            if vals[0] == p['articulo']:
-                new_q = int(vals[4]) + qty
-                if new_q > p['stock']:
-                    messagebox.showerror("Error", "No hay stock suficiente para sumar esa cantidad.")
-                    return
-                subtotal = round(new_q * p['precio'], 2)
-                self.tree_cart.item(iid, values=(p['articulo'], p['nombre'], p['marca'], f"${p['precio']:.2f}", new_q, f"${subtotal:.2f}", p['stock']))
-                self._update_total_label()
-                return
-        # else add new line
-        subtotal = round(qty * p['precio'], 2)
-        self.tree_cart.insert("", tk.END, values=(p['articulo'], p['nombre'], p['marca'], f"${p['precio']:.2f}", qty, f"${subtotal:.2f}", p['stock']))
+        # if product already in cart, the model sums the quantity (stock checked there)
+        try:
+            linea = self.motor.agregar_al_carrito(self.carrito, p, qty)
+        except StockInsuficiente as e:
+            self._aplicar_cambios_remotos()
+            messagebox.showerror("Error", str(e))
+            return
+        self._pintar_linea_carrito(linea, p['stock'])
         self._update_total_label()
 
+    # cart Treeview is only a view of self.carrito (iid = "c" + articulo)
+    @staticmethod
+    def _iid_cart(articulo):
+        return "c" + articulo
+
+    def _pintar_linea_carrito(self, linea, stock):
+        iid = self._iid_cart(linea.articulo)
+        vals = (linea.articulo, linea.nombre, linea.marca, formato_pesos(linea.precio_cent), linea.cantidad, formato_pesos(linea.subtotal_cent), stock)
+        if self.tree_cart.exists(iid):
+            self.tree_cart.item(iid, values=vals)
+        else:
+            self.tree_cart.insert("", tk.END, iid=iid, values=vals)
+
     def _edit_cart_quantity(self, event):
         # double-click a row -> prompt new quantity (with stock check)
         iid = self.tree_cart.identify_row(event.y)
         if not iid: return
-        vals = self.tree_cart.item(iid, "values")
-        articulo = vals[0]
-        p = next((x for x in self.productos if x['articulo']==articulo), None)
-        if not p: return
-        try:
-            current_q = int(vals[4])
-        except:
-            current_q = 0
+        articulo = self.tree_cart.item(iid, "values")[0]
+        p = self.repo.get(articulo)
+        if not p or articulo not in self.carrito: return
         q = simpledialog.askinteger("Editar cantidad", f"Ingrese nueva cantidad para {p['nombre']} (stock {p['stock']}):", minvalue=0, maxvalue=p['stock'])
         if q is None:
             return
-        if q == 0:
+        try:
+            linea = self.motor.fijar_cantidad_carrito(self.carrito, articulo, q)
+        except StockInsuficiente as e:
+            self._aplicar_cambios_remotos()
+            messagebox.showerror("Error", str(e))
+            return
+        if linea is None:
             # remove row
             self.tree_cart.delete(iid)
         else:
-            subtotal = round(q * p['precio'], 2)
-            self.tree_cart.item(iid, values=(p['articulo'], p['nombre'], p['marca'], f"${p['precio']:.2f}", q, f"${subtotal:.2f}", p['stock']))
+            self._pintar_linea_carrito(linea, p['stock'])
         self._update_total_label()
 
     def _quitar_items_carrito(self):
@@ -411,101 +751,159 @@ class GestorRopaInterior:
             messagebox.showwarning("Seleccionar", "Seleccione ítem(s) para quitar.")
             return
         for iid in sel:
+            self.motor.quitar_del_carrito(self.carrito, self.tree_cart.item(iid, "values")[0])
             self.tree_cart.delete(iid)
         self._update_total_label()
 
     def _vaciar_carrito(self):
-        if not self.tree_cart.get_children():
+        if not len(self.carrito):
             return
         if not messagebox.askyesno("Confirmar", "Vaciar todo el carrito?"):
             return
+        self._limpiar_carrito()
+
+    def _limpiar_carrito(self):
+        self.motor.vaciar_carrito(self.carrito)
         self.tree_cart.delete(*self.tree_cart.get_children())
         self._update_total_label()
 
     def _update_total_label(self):
-        total = 0.0
-        for iid in self.tree_cart.get_children():
-            vals = self.tree_cart.item(iid, "values")
-            # subtotal stored as string like '$12.50'
-            try:
-                subtotal = float(str(vals[5]).replace("$","").replace(",",""))
-            except:
-                subtotal = 0.0
-            total += subtotal
-        self.lbl_total.config(text=f"Total: ${total:.2f}")
+        # running total kept by the model (integer cents)
+        self.lbl_total.config(text=f"Total: {formato_pesos(self.carrito.total_cent)}")
 
     # -------------------- Registrar venta --------------------
     def _confirmar_registrar_venta(self):
-        # validations
+        # validations (engine)
         nombre = self.ent_cli_nombre.get().strip()
         dni = self.ent_cli_dni.get().strip()
         tel = self.ent_cli_tel.get().strip()
-        if not nombre:
-            messagebox.showerror("Error", "El nombre del cliente es obligatorio.")
-            return
-        if not dni.isdigit():
-            messagebox.showerror("Error", "DNI inválido (solo números).")
-            return
-        # build productos_vendidos
-        items = []
-        for iid in self.tree_cart.get_children():
-            vals = self.tree_cart.item(iid, "values")
-            articulo = vals[0]; nombre_p = vals[1]; marca = vals[2]
-            cantidad = int(vals[4])
-            precio_unit = float(str(vals[3]).replace("$",""))
-            if cantidad <= 0:
-                messagebox.showerror("Error", f"Cantidad inválida para {nombre_p}.")
-                return
-            # check stock again
-            p = next((x for x in self.productos if x['articulo']==articulo), None)
-            if not p or p['stock'] < cantidad:
-                messagebox.showerror("Error", f"No hay stock suficiente para {nombre_p}.")
-                return
-            items.append({"articulo":articulo,"nombre":nombre_p,"marca":marca,"cantidad":cantidad,"precio":precio_unit})
-        if not items:
-            messagebox.showwarning("Carrito vacío", "No hay productos para vender.")
+        try:
+            self.motor.validar_venta(self.carrito, nombre, dni)
+        except CarritoVacio as e:
+            messagebox.showwarning("Carrito vacío", str(e))
+            return
+        except ErrorNegocio as e:
+            messagebox.showerror("Error", str(e))
             return
         # confirm total
-        total = sum(it["cantidad"]*it["precio"] for it in items)
-        if not messagebox.askyesno("Confirmar venta", f"Registrar venta por ${total:.2f} para cliente {nombre}?"):
+        if not messagebox.askyesno("Confirmar venta", f"Registrar venta por {formato_pesos(self.carrito.total_cent)} para cliente {nombre}?"):
+            return
+        # apply stock update + register
+        try:
+            venta, cambiados = self.motor.registrar_venta(self.carrito, nombre, dni, tel)
+        except ErrorNegocio as e:
+            # another register sold it first: show real stock, the cart stays for editing
+            self._aplicar_cambios_remotos()
+            messagebox.showerror("Error", str(e))
             return
-        # apply stock update
-        for it in items:
-            p = next((x for x in self.productos if x['articulo']==it['articulo']), None)
-            if p:
-                p['stock'] -= it['cantidad']
-        venta = {
-            "fecha": datetime.now().strftime("%d/%m/%Y %H:%M"),
-            "cliente": nombre,
-            "dni": dni,
-            "tel": tel,
-            "productos": items,
-            "total": round(total,2)
-        }
-        self.ventas.append(venta)
-        self.guardar_ventas()
-        self.guardar_datos()
         # refresh UI
-        self._refresh_productos_venta()
-        self._refresh_tree_prod()
-        self._refresh_historial()
-        self.tree_cart.delete(*self.tree_cart.get_children())
-        self._update_total_label()
+        self._refresh_tree_prod(cambiados)
+        self._refresh_historial([venta])
+        self._limpiar_carrito()
         # clear client
         self.ent_cli_nombre.delete(0, tk.END); self.ent_cli_dni.delete(0, tk.END); self.ent_cli_tel.delete(0, tk.END)
+        self.lbl_cli_info.config(text="")
         messagebox.showinfo("Venta registrada", f"Venta registrada por ${venta['total']:.2f}.")
 
+    # -------------------- Clientes --------------------
+    def _programar_filtro_clientes(self, event=None):
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self._after_clientes is not None:
+            self.root.after_cancel(self._after_clientes)
+        self._after_clientes = self.root.after(BUSQUEDA_DEMORA_MS, self._filtrar_clientes)
+
+    @medido("ui_filtro_clientes")
+    def _filtrar_clientes(self):
+        self._after_clientes = None
+        clientes = self.motor.buscar_clientes(self.ent_cli_nombre.get())
+        self.ent_cli_nombre['values'] = [c.etiqueta() for c in clientes]
+        if clientes:
+            try:
+                self.ent_cli_nombre.event_generate('<Down>')
+            except Exception:
+                pass
+
+    def _llenar_cliente(self, c):
+        self.ent_cli_nombre.delete(0, tk.END); self.ent_cli_nombre.insert(0, c.nombre)
+        self.ent_cli_dni.delete(0, tk.END); self.ent_cli_dni.insert(0, c.dni)
+        self.ent_cli_tel.delete(0, tk.END); self.ent_cli_tel.insert(0, c.tel)
+        self._mostrar_info_cliente(c)
+
+    def _mostrar_info_cliente(self, c):
+        self.lbl_cli_info.config(text=f"Cliente registrado: {c.visitas} compras, total ${c.gastado:,.2f}, última {c.fecha_ultima()}")
+
+    def _cliente_elegido(self, event=None):
+        # label "nombre - DNI 123": the DNI identifies the customer
+        dni = self.ent_cli_nombre.get().rpartition(" - DNI ")[2]
+        c = self.motor.cliente(dni)
+        if c is not None:
+            self._llenar_cliente(c)
+
+    def _completar_por_dni(self, event=None):
+        c = self.motor.cliente(self.ent_cli_dni.get())
+        if c is None:
+            self.lbl_cli_info.config(text="")
+            return
+        # a name already typed is kept (the customer may have updated it)
+        if not self.ent_cli_nombre.get().strip():
+            self.ent_cli_nombre.insert(0, c.nombre)
+        if not self.ent_cli_tel.get().strip():
+            self.ent_cli_tel.insert(0, c.tel)
+        self._mostrar_info_cliente(c)
+
+    def _abrir_historial_cliente(self):
+        c = self.motor.cliente(self.ent_cli_dni.get())
+        if c is None:
+            messagebox.showinfo("Historial", "Ingrese el DNI de un cliente con compras registradas.")
+            return
+        try:
+            ventas = self.motor.historial_cliente(c.dni)  # reads the archived months where they bought
+        except ErrorNegocio as e:
+            messagebox.showerror("Error", str(e))
+            return
+        w = tk.Toplevel(self.root)
+        w.title(f"Historial - {c.nombre} (DNI {c.dni})")
+        w.geometry("900x480")
+        ttk.Label(w, text=f"{c.nombre}   DNI {c.dni}   Tel. {c.tel or '-'}\n"
+                          f"Compras: {c.visitas}   Total gastado: ${c.gastado:,.2f}   Última compra: {c.fecha_ultima()}").pack(anchor="w", padx=10, pady=8)
+        frm = ttk.Frame(w); frm.pack(fill="both", expand=True, padx=10, pady=(0,10))
+        cols = ("fecha","articulo","nombre","marca","cantidad","total_line")
+        tree = ttk.Treeview(frm, columns=cols, show="headings")
+        for col, t in zip(cols, ("Fecha","Artículo","Producto","Marca","Cant.","Total $")):
+            tree.heading(col, text=t); tree.column(col, width=260 if col == "nombre" else 110)
+        sb = ttk.Scrollbar(frm, orient="vertical"); sb.pack(side="right", fill="y")
+        tree.pack(side="left", fill="both", expand=True)
+        # only this customer's sales (DNI index + its archived months), most recent first
+        def valores(f):
+            vals = self._valores_linea_hist(f)
+            return vals[:1] + vals[3:]  # without customer name / DNI
+        tabla = TablaVirtual(tree, valores, lambda f: f"c{f[0]}", scrollbar=sb)
+        tabla.set_filas(self._lineas_hist(ventas))
+
     # -------------------- Historial --------------------
-    def _refresh_historial(self):
-        self.tree_hist.delete(*self.tree_hist.get_children())
+    def _lineas_hist(self, ventas, inicio=0):
         # each row = line item (venta x producto)
-        for v in self.ventas:
-            fecha = v.get("fecha","")
-            cliente = v.get("cliente","")
-            dni = v.get("dni","")
+        filas = []
+        n = inicio
+        for v in ventas:
             for prod in v.get("productos", []):
-                total_line = round(prod["precio"]*prod["cantidad"],2)
-                self.tree_hist.insert("", tk.END, values=(fecha, cliente, dni, prod["articulo"], prod["nombre"], prod["marca"], prod["cantidad"], f"${total_line:.2f}"))
+                filas.append((n, v, prod)); n += 1
+        return filas
+
+    @staticmethod
+    def _valores_linea_hist(fila):
+        _n, v, prod = fila
+        total_line = round(prod["precio"]*prod["cantidad"],2)
+        return (v.get("fecha",""), v.get("cliente",""), v.get("dni",""), prod["articulo"], prod["nombre"], prod["marca"], prod["cantidad"], f"${total_line:.2f}")
+
+    @medido("ui_refresh_historial")
+    def _refresh_historial(self, nuevas=None):
+        # nuevas: sales just registered -> append their lines; None = rebuild from self.ventas
+        if nuevas is None:
+            self.tabla_hist.set_filas(self._lineas_hist(self.ventas))
+        else:
+            self.tabla_hist.agregar_filas(self._lineas_hist(nuevas, len(self.tabla_hist.filas)))
 
     # -------------------- Reporte --------------------
     def _abrir_reporte_ventana(self):
@@ -518,90 +916,209 @@ class GestorRopaInterior:
             messagebox.showerror("Error", "Formato de fecha inválido. Use dd/mm/yyyy")
             return
 
-        ventas_filtradas = []
-        total_gan = 0.0
-        for v in self.ventas:
-            try:
-                fv = datetime.strptime(v["fecha"], "%d/%m/%Y %H:%M")
-            except Exception:
-                continue
-            # compare by date (ignore time)
-            if fecha_inicio <= fv.date() <= fecha_fin.date() if isinstance(fv, datetime) else False:
-                ventas_filtradas.append(v)
-                for prod in v.get("productos", []):
-                    total_gan += prod["precio"]*prod["cantidad"]
+        # binary search on the date index + precomputed daily totals (compare by date, ignore time)
+        # closed months in the range come from the archive the first time
+        try:
+            ventas_filtradas, totales = self.motor.reporte(fecha_inicio.date(), fecha_fin.date())
+        except ErrorNegocio as e:
+            messagebox.showerror("Error", str(e))
+            return
         if not ventas_filtradas:
             messagebox.showinfo("Reporte", "No se encontraron ventas en ese período.")
             return
 
-        # build report window
+        # build report window: header + totals first, rows streamed in batches with after()
         w = tk.Toplevel(self.root)
         w.title(f"Reporte {fi} -> {ff}")
         w.geometry("1000x600")
-        txt = tk.Text(w, wrap="none")
-        txt.pack(fill="both", expand=True)
-        # header
-        header = f"{'Fecha':20} {'Cliente':20} {'DNI':10} {'Tel':12} {'Artículo':10} {'Producto':25} {'Marca':12} {'Cant':4} {'Total $':8}\n"
-        txt.insert(tk.END, header)
-        txt.insert(tk.END, "-"*140 + "\n")
-        for v in ventas_filtradas:
-            fecha = v["fecha"]; cliente = v["cliente"]; dni=v["dni"]; tel = v.get("tel","")
-            for prod in v["productos"]:
-                line_total = prod["precio"]*prod["cantidad"]
-                txt.insert(tk.END, f"{fecha:20} {cliente:20} {dni:10} {tel:12} {prod['articulo']:10} {prod['nombre'][:25]:25} {prod['marca'][:12]:12} {prod['cantidad']:4} ${line_total:8.2f}\n")
-        txt.insert(tk.END, "\nGanancia total periodo: ${:.2f}\n".format(total_gan))
-        txt.config(state="disabled")
+        frm_opts = ttk.Frame(w); frm_opts.pack(fill="x", padx=6, pady=4)
+        ttk.Label(frm_opts, text="Ordenar por:").pack(side="left")
+        cb_orden = ttk.Combobox(frm_opts, values=list(reportes.ORDENES), state="readonly", width=24)
+        cb_orden.current(0); cb_orden.pack(side="left", padx=6)
+        ttk.Label(frm_opts, text="Agrupar por:").pack(side="left")
+        cb_grupo = ttk.Combobox(frm_opts, values=list(reportes.AGRUPACIONES), state="readonly", width=14)
+        cb_grupo.current(0); cb_grupo.pack(side="left", padx=6)
+        lbl_estado = ttk.Label(frm_opts, text="", foreground="gray")
+        lbl_estado.pack(side="right")
+        frm_txt = ttk.Frame(w); frm_txt.pack(fill="both", expand=True)
+        txt = tk.Text(frm_txt, wrap="none")
+        sb_txt = ttk.Scrollbar(frm_txt, orient="vertical", command=txt.yview)
+        txt.configure(yscrollcommand=sb_txt.set)
+        sb_txt.pack(side="right", fill="y")
+        txt.pack(side="left", fill="both", expand=True)
+        with medir("reporte_lineas"):
+            lineas = reportes.lineas_reporte(ventas_filtradas)
+        resumen = reportes.texto_resumen(fi, ff, totales)
+        estado = {"gen": 0}
+
+        def renderizar(event=None):
+            # a new render cancels the batches still pending from the previous one
+            estado["gen"] += 1
+            gen = estado["gen"]
+            orden = reportes.ordenar(lineas, cb_orden.get())
+            por = cb_grupo.get() if reportes.AGRUPACIONES.get(cb_grupo.get()) else None
+            bloques = reportes.bloques_texto(orden, por, REPORTE_BLOQUE)
+            txt.config(state="normal"); txt.delete("1.0", tk.END)
+            txt.insert(tk.END, resumen)
+            txt.config(state="disabled")
+
+            def siguiente():
+                if gen != estado["gen"] or not txt.winfo_exists():
+                    return
+                bloque = next(bloques, None)
+                if bloque is None:
+                    lbl_estado.config(text=f"{len(lineas)} líneas")
+                    return
+                txt.config(state="normal"); txt.insert(tk.END, bloque); txt.config(state="disabled")
+                lbl_estado.config(text="Cargando...")
+                w.after(1, siguiente)
+            w.after(1, siguiente)
+        cb_orden.bind("<<ComboboxSelected>>", renderizar)
+        cb_grupo.bind("<<ComboboxSelected>>", renderizar)
+        renderizar()
 
         # export buttons
         frm = ttk.Frame(w); frm.pack(pady=6)
-        if Workbook:
+        if exportar.HAY_EXCEL:
             ttk.Button(frm, text="Exportar a Excel", command=lambda:self._exportar_excel_reporte(ventas_filtradas)).pack(side="left", padx=6)
         else:
             ttk.Button(frm, text="Exportar a Excel (openpyxl falta)", state="disabled").pack(side="left", padx=6)
-        if SimpleDocTemplate:
+        ttk.Button(frm, text="Exportar a CSV", command=lambda:self._exportar_csv_reporte(ventas_filtradas)).pack(side="left", padx=6)
+        if exportar.HAY_PDF:
             ttk.Button(frm, text="Exportar a PDF", command=lambda:self._exportar_pdf_reporte(ventas_filtradas)).pack(side="left", padx=6)
         else:
             ttk.Button(frm, text="Exportar a PDF (reportlab falta)", state="disabled").pack(side="left", padx=6)
 
+    # -------------------- Análisis --------------------
+    def _ui_analisis(self, parent):
+        frm = ttk.LabelFrame(parent, text="Análisis de ventas", padding=8)
+        frm.pack(fill="x", padx=10, pady=6)
+        hoy = datetime.now()
+        ttk.Label(frm, text="Desde (dd/mm/yyyy):").grid(row=0, column=0, sticky="w")
+        self.ent_an_desde = ttk.Entry(frm, width=12); self.ent_an_desde.grid(row=0, column=1, padx=6)
+        self.ent_an_desde.insert(0, (hoy - timedelta(days=ANALISIS_DIAS - 1)).strftime("%d/%m/%Y"))
+        ttk.Label(frm, text="Hasta:").grid(row=0, column=2, sticky="w")
+        self.ent_an_hasta = ttk.Entry(frm, width=12); self.ent_an_hasta.grid(row=0, column=3, padx=6)
+        self.ent_an_hasta.insert(0, hoy.strftime("%d/%m/%Y"))
+        ttk.Label(frm, text="Vista:").grid(row=0, column=4, sticky="w")
+        self.cb_an_vista = ttk.Combobox(frm, values=VISTAS_ANALISIS, state="readonly", width=28)
+        self.cb_an_vista.current(0); self.cb_an_vista.grid(row=0, column=5, padx=6)
+        self.cb_an_vista.bind("<<ComboboxSelected>>", lambda e: self._calcular_analisis())
+        ttk.Button(frm, text="Calcular", command=self._calcular_analisis).grid(row=0, column=6, padx=6)
+        ttk.Label(frm, text="Plazo de entrega (días):").grid(row=1, column=0, sticky="w")
+        self.ent_an_plazo = ttk.Entry(frm, width=6); self.ent_an_plazo.grid(row=1, column=1, sticky="w", padx=6, pady=2)
+        self.ent_an_plazo.insert(0, str(analitica.PLAZO_REPOSICION))
+        ttk.Label(frm, text="Cubrir (días):").grid(row=1, column=2, sticky="w")
+        self.ent_an_cobertura = ttk.Entry(frm, width=6); self.ent_an_cobertura.grid(row=1, column=3, sticky="w", padx=6)
+        self.ent_an_cobertura.insert(0, str(analitica.COBERTURA))
+
+        frm_tabla = ttk.Frame(parent); frm_tabla.pack(fill="both", expand=True, padx=10, pady=6)
+        self.tree_an = ttk.Treeview(frm_tabla, show="headings")
+        sb = ttk.Scrollbar(frm_tabla, orient="vertical"); sb.pack(side="right", fill="y")
+        self.tree_an.pack(side="left", fill="both", expand=True)
+        # rows are (n, formatted values); columns change with the view
+        self.tabla_an = TablaVirtual(self.tree_an, lambda f: f[1], lambda f: f"a{f[0]}", scrollbar=sb)
+        self.lbl_an = ttk.Label(parent, text="", foreground="gray")
+        self.lbl_an.pack(anchor="w", padx=10, pady=(0,8))
+
+    @medido("ui_analisis")
+    def _calcular_analisis(self):
+        try:
+            desde = datetime.strptime(self.ent_an_desde.get().strip(), "%d/%m/%Y").date()
+            hasta = datetime.strptime(self.ent_an_hasta.get().strip(), "%d/%m/%Y").date()
+        except ValueError:
+            messagebox.showerror("Error", "Formato de fecha inválido. Use dd/mm/yyyy")
+            return
+        try:
+            plazo = int(self.ent_an_plazo.get().strip() or 0)
+            cobertura = int(self.ent_an_cobertura.get().strip() or 0)
+        except ValueError:
+            messagebox.showerror("Error", "Plazo y días a cubrir deben ser números enteros.")
+            return
+        t0 = time.perf_counter()
+        try:
+            an = self.motor.analisis(desde, hasta)
+        except ErrorNegocio as e:
+            messagebox.showerror("Error", str(e))
+            return
+        vista = self.cb_an_vista.get()
+
+        def dias(d):
+            return "sin ventas" if d is None else f"{d:.0f}"
+
+        if vista == "Más vendidos (unidades)" or vista == "Más vendidos (importe)":
+            cols = ("Artículo", "Nombre", "Marca", "Unidades", "Importe $")
+            filas = [(a, n, m, u, f"${i:,.2f}") for a, n, m, u, i in an.mas_vendidos(desde, hasta, ANALISIS_TOP, vista.endswith("(importe)"))]
+        elif vista == "Ingresos por marca":
+            cols = ("Marca", "Unidades", "Importe $")
+            filas = [(m, u, f"${i:,.2f}") for m, u, i in an.por_marca(desde, hasta)]
+        elif vista == "Ingresos por mes":
+            cols = ("Mes", "Unidades", "Importe $")
+            filas = [(m, u, f"${i:,.2f}") for m, u, i in an.por_mes(desde, hasta)]
+        elif vista == "Rotación y días de stock":
+            cols = ("Artículo", "Nombre", "Marca", "Stock", "Vendidas", "Sell-through", "Por día", "Días de stock")
+            inds = an.por_producto(desde, hasta, self.productos)
+            inds.sort(key=lambda ind: (ind.dias_stock is None, ind.dias_stock or 0))
+            filas = [(ind.producto["articulo"], ind.producto["nombre"], ind.producto["marca"], ind.producto["stock"], ind.vendidas,
+                      f"{ind.sell_through:.0%}", f"{ind.por_dia:.2f}", dias(ind.dias_stock)) for ind in inds]
+        else:
+            cols = ("Artículo", "Nombre", "Marca", "Stock", "Por día", "Días de stock", "Pedir")
+            filas = [(ind.producto["articulo"], ind.producto["nombre"], ind.producto["marca"], ind.producto["stock"],
+                      f"{ind.por_dia:.2f}", dias(ind.dias_stock), ind.pedir)
+                     for ind in an.sugerencias_reposicion(desde, hasta, self.productos, plazo, cobertura)]
+        self.tabla_an.set_filas([])
+        self.tree_an["columns"] = cols
+        for c in cols:
+            self.tree_an.heading(c, text=c)
+            self.tree_an.column(c, width=260 if c == "Nombre" else 110, anchor="w" if c in ("Artículo", "Nombre", "Marca", "Mes") else "e")
+        self.tabla_an.set_filas(list(enumerate(filas)))
+        motor_np = "NumPy" if analitica.np is not None else "Python"
+        self.lbl_an.config(text=f"{len(filas)} filas - {len(an)} líneas de venta analizadas en {time.perf_counter() - t0:.2f}s ({motor_np})")
+
     def _exportar_excel_reporte(self, ventas_filtradas):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files","*.xlsx")], initialfile="reporte_ventas.xlsx")
         if not path: return
-        try:
-            wb = Workbook(); ws = wb.active; ws.title = "Reporte Ventas"
-            ws.append(["Fecha","Cliente","DNI","Tel","Artículo","Producto","Marca","Cantidad","Total"])
-            for v in ventas_filtradas:
-                for prod in v["productos"]:
-                    ws.append([v["fecha"], v["cliente"], v["dni"], v.get("tel",""), prod["articulo"], prod["nombre"], prod["marca"], prod["cantidad"], prod["precio"]*prod["cantidad"]])
-            wb.save(path)
-            messagebox.showinfo("Exportado", f"Reporte guardado en {path}")
-        except Exception as e:
-            messagebox.showerror("Error exportando", str(e))
+        self._exportar_en_segundo_plano(exportar.exportar_excel, path, ventas_filtradas, "Exportando a Excel")
+
+    def _exportar_csv_reporte(self, ventas_filtradas):
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files","*.csv")], initialfile="reporte_ventas.csv")
+        if not path: return
+        self._exportar_en_segundo_plano(exportar.exportar_csv, path, ventas_filtradas, "Exportando a CSV")
+
+    def _exportar_en_segundo_plano(self, exportador, path, ventas_filtradas, titulo, error_titulo="Error exportando"):
+        # worker thread + progress window with cancel; polled with after()
+        tarea = exportar.ExportacionEnSegundoPlano(exportador, path, ventas_filtradas)
+        w = tk.Toplevel(self.root)
+        w.title(titulo)
+        w.resizable(False, False)
+        lbl = ttk.Label(w, text=f"0 / {tarea.total} líneas")
+        lbl.pack(padx=12, pady=(12,4))
+        barra = ttk.Progressbar(w, length=320, mode="determinate", maximum=max(1, tarea.total))
+        barra.pack(padx=12, pady=4)
+        ttk.Button(w, text="Cancelar", command=tarea.cancelar).pack(pady=(4,12))
+        w.protocol("WM_DELETE_WINDOW", tarea.cancelar)
+
+        def revisar():
+            barra["value"] = tarea.hechas
+            lbl.config(text=f"{tarea.hechas} / {tarea.total} líneas")
+            if not tarea.terminado:
+                w.after(PROGRESO_MS, revisar)
+                return
+            w.destroy()
+            if tarea.error is not None:
+                messagebox.showerror(error_titulo, str(tarea.error))
+            elif tarea.cancelada:
+                messagebox.showinfo("Exportación", "Exportación cancelada.")
+            else:
+                messagebox.showinfo("Exportado", f"Reporte guardado en {path}")
+        tarea.start()
+        w.after(PROGRESO_MS, revisar)
 
     def _exportar_pdf_reporte(self, ventas_filtradas):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files","*.pdf")], initialfile="reporte_ventas.pdf")
         if not path: return
-        try:
-            doc = SimpleDocTemplate(path, pagesize=A4)
-            elements = []
-            styles = getSampleStyleSheet()
-            elements.append(Paragraph("Reporte de Ventas", styles["Title"]))
-            elements.append(Spacer(1,12))
-            data = [["Fecha","Cliente","DNI","Tel","Artículo","Producto","Marca","Cantidad","Total"]]
-            for v in ventas_filtradas:
-                for prod in v["productos"]:
-                    data.append([v["fecha"], v["cliente"], v["dni"], v.get("tel",""), prod["articulo"], prod["nombre"], prod["marca"], str(prod["cantidad"]), f"{prod['precio']*prod['cantidad']:.2f}"])
-            table = Table(data, repeatRows=1)
-            table.setStyle(TableStyle([
-                ('BACKGROUND',(0,0),(-1,0),colors.gray),
-                ('TEXTCOLOR',(0,0),(-1,0),colors.whitesmoke),
-                ('GRID',(0,0),(-1,-1),0.4,colors.black),
-                ('FONTSIZE',(0,0),(-1,-1),8),
-            ]))
-            elements.append(table)
-            doc.build(elements)
-            messagebox.showinfo("Exportado", f"PDF guardado en {path}")
-        except Exception as e:
-            messagebox.showerror("Error exportando PDF", str(e))
+        # bounded tables per page + summary, built off the Tk thread
+        self._exportar_en_segundo_plano(exportar.exportar_pdf, path, ventas_filtradas, "Exportando a PDF", "Error exportando PDF")
 
 # -------------------- RUN --------------------
 if __name__ == "__main__":
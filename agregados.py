@@ -0,0 +1,146 @@
+"""
+agregados.py
+Índice de ventas por fecha y totales diarios precalculados.
+
+- Cada fecha se parsea una sola vez (al cargar o al registrar la venta).
+- Ventas ordenadas por día: un rango de fechas se resuelve con búsqueda
+  binaria (bisect) en lugar de recorrer todo el historial.
+- Ventas compactas (compacto.Venta): la fecha ya es un entero, no se parsea.
+- Totales por día (ingresos, unidades, cantidad de ventas, por marca y por
+  artículo) mantenidos al registrar cada venta: un reporte mensual o anual
+  suma como mucho un agregado por día del rango.
+"""
+
+from bisect import bisect_left, bisect_right
+
+from compacto import EPOCA, Venta, parse_fecha
+
+
+class AgregadoDia:
+    __slots__ = ("ingresos", "unidades", "ventas", "por_marca", "por_articulo")
+
+    def __init__(self):
+        self.ingresos = 0.0
+        self.unidades = 0
+        self.ventas = 0
+        self.por_marca = {}     # marca -> [unidades, ingresos]
+        self.por_articulo = {}  # articulo -> [unidades, ingresos]
+
+    def sumar_venta(self, venta):
+        self.ventas += 1
+        for prod in venta.get("productos", []):
+            cant = prod["cantidad"]
+            imp = prod["precio"] * cant
+            self.ingresos += imp
+            self.unidades += cant
+            for d, k in ((self.por_marca, prod.get("marca", "")), (self.por_articulo, prod.get("articulo", ""))):
+                acc = d.get(k)
+                if acc is None:
+                    d[k] = [cant, imp]
+                else:
+                    acc[0] += cant; acc[1] += imp
+
+
+_ORD_EPOCA = EPOCA.toordinal()
+
+
+def clave_fecha(v):
+    """(día ordinal, segundos del día) o None si la fecha no se entiende."""
+    if isinstance(v, Venta):
+        ts = v.ts
+        return None if ts is None else (ts // 86400 + _ORD_EPOCA, ts % 86400)
+    fv = parse_fecha(v.get("fecha", ""))
+    return None if fv is None else (fv.date().toordinal(), fv.hour * 3600 + fv.minute * 60 + fv.second)
+
+
+class IndiceVentasPorFecha:
+    def __init__(self, ventas=None):
+        self.cargar(ventas or [])
+
+    def cargar(self, ventas):
+        claves = []
+        for i, v in enumerate(ventas):
+            kf = clave_fecha(v)
+            if kf is not None:
+                claves.append(((kf[0], kf[1], i), v))
+        claves.sort(key=lambda kv: kv[0])
+        self._claves = [k for k, _ in claves]
+        self._ventas = [v for _, v in claves]
+        self._dias = [k[0] for k in self._claves]
+        self._seq = len(ventas)
+        self.por_dia = {}
+        for k, v in claves:
+            self._agregado(k[0]).sumar_venta(v)
+
+    def _agregado(self, dia):
+        ag = self.por_dia.get(dia)
+        if ag is None:
+            ag = self.por_dia[dia] = AgregadoDia()
+        return ag
+
+    def agregar(self, venta):
+        """Incorpora una venta nueva (append O(1) si es la más reciente)."""
+        kf = clave_fecha(venta)
+        if kf is None:
+            return False
+        k = (kf[0], kf[1], self._seq)
+        self._seq += 1
+        if not self._claves or k >= self._claves[-1]:
+            self._claves.append(k); self._ventas.append(venta); self._dias.append(k[0])
+        else:
+            pos = bisect_right(self._claves, k)
+            self._claves.insert(pos, k); self._ventas.insert(pos, venta); self._dias.insert(pos, k[0])
+        self._agregado(k[0]).sumar_venta(venta)
+        return True
+
+    def incorporar(self, ventas):
+        """Suma un lote de ventas de cualquier fecha (meses traídos del archivo) con un solo reordenamiento."""
+        nuevas = []
+        for v in ventas:
+            kf = clave_fecha(v)
+            if kf is not None:
+                nuevas.append(((kf[0], kf[1], self._seq), v))
+                self._seq += 1
+        if not nuevas:
+            return 0
+        claves = list(zip(self._claves, self._ventas)) + nuevas
+        claves.sort(key=lambda kv: kv[0])  # two sorted runs: timsort merges them in linear time
+        self._claves = [k for k, _ in claves]
+        self._ventas = [v for _, v in claves]
+        self._dias = [k[0] for k in self._claves]
+        for k, v in nuevas:
+            self._agregado(k[0]).sumar_venta(v)
+        return len(nuevas)
+
+    def __len__(self):
+        return len(self._ventas)
+
+    def rango(self, desde, hasta):
+        """Ventas con fecha entre desde y hasta (date, inclusive), en orden cronológico."""
+        lo = bisect_left(self._dias, desde.toordinal())
+        hi = bisect_right(self._dias, hasta.toordinal())
+        return self._ventas[lo:hi]
+
+    def totales(self, desde, hasta):
+        """Suma los agregados diarios del rango. Devuelve dict con totales y desgloses."""
+        res = {"ingresos": 0.0, "unidades": 0, "ventas": 0, "por_marca": {}, "por_articulo": {}, "por_dia": {}}
+        d0, d1 = desde.toordinal(), hasta.toordinal()
+        # itera los días con ventas, o el rango si es más corto
+        dias = range(d0, d1 + 1) if d1 - d0 < len(self.por_dia) else sorted(d for d in self.por_dia if d0 <= d <= d1)
+        for d in dias:
+            ag = self.por_dia.get(d)
+            if ag is None:
+                continue
+            res["ingresos"] += ag.ingresos
+            res["unidades"] += ag.unidades
+            res["ventas"] += ag.ventas
+            res["por_dia"][d] = ag.ingresos
+            for nombre in ("por_marca", "por_articulo"):
+                dest = res[nombre]
+                for k, (cant, imp) in getattr(ag, nombre).items():
+                    acc = dest.get(k)
+                    if acc is None:
+                        dest[k] = [cant, imp]
+                    else:
+                        acc[0] += cant; acc[1] += imp
+        return res
@@ -0,0 +1,80 @@
+"""
+alertas.py
+Productos con stock bajo (a reponer), mantenidos al día sin recorrer el catálogo.
+
+- Cada producto puede tener su propio mínimo ("minimo"); sin él se usa
+  STOCK_MINIMO. Está bajo cuando stock <= mínimo.
+- Índice por baldes: faltante (mínimo - stock) -> productos. Una venta o un
+  ajuste de stock mueve solo ese producto de balde; el panel "Para reponer"
+  y su exportación recorren solo los k productos bajos (más urgentes primero).
+- version cambia con cada alta, baja o cambio de balde: la interfaz solo
+  redibuja el panel cuando hace falta.
+"""
+
+from exportar import escribir_csv
+
+STOCK_MINIMO = 2  # mínimo por defecto para productos sin mínimo propio
+
+
+def minimo_de(p):
+    m = p.get("minimo")
+    return STOCK_MINIMO if m is None else m
+
+
+class IndiceStockBajo:
+    def __init__(self, productos=None):
+        self.version = 0
+        self.cargar(productos or [])
+
+    def cargar(self, productos):
+        self._baldes = {}  # faltante -> {id(p): p}
+        self._faltante = {}  # id(p) -> faltante (solo productos bajos)
+        self.version += 1
+        for p in productos:
+            self._ubicar(p)
+
+    def _ubicar(self, p):
+        faltante = minimo_de(p) - p["stock"]
+        if faltante >= 0:
+            self._baldes.setdefault(faltante, {})[id(p)] = p
+            self._faltante[id(p)] = faltante
+
+    def quitar(self, p):
+        faltante = self._faltante.pop(id(p), None)
+        if faltante is None:
+            return False
+        balde = self._baldes[faltante]
+        balde.pop(id(p), None)
+        if not balde:
+            del self._baldes[faltante]
+        self.version += 1
+        return True
+
+    def actualizar(self, productos):
+        """Reubica esos productos después de un cambio de stock o de mínimo."""
+        for p in productos:
+            previo = self._faltante.get(id(p))
+            faltante = minimo_de(p) - p["stock"]
+            if previo == faltante or (previo is None and faltante < 0):
+                continue
+            if previo is not None:
+                self.quitar(p)
+            self._ubicar(p)
+            self.version += 1
+
+    def __len__(self):
+        return len(self._faltante)
+
+    def listar(self):
+        """Productos bajos, de mayor a menor faltante (y por artículo dentro del mismo faltante)."""
+        res = []
+        for faltante in sorted(self._baldes, reverse=True):
+            res.extend(sorted(self._baldes[faltante].values(), key=lambda p: p["articulo"]))
+        return res
+
+
+def exportar_reponer(path, productos):
+    """Lista "para reponer" a CSV. productos: salida de IndiceStockBajo.listar()."""
+    filas = ([p["articulo"], p["nombre"], p["marca"], p["stock"], minimo_de(p), minimo_de(p) - p["stock"]]
+             for p in productos)
+    return escribir_csv(path, ["Artículo", "Nombre", "Marca", "Stock", "Mínimo", "Faltante"], filas)
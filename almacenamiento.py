@@ -0,0 +1,703 @@
+"""
+almacenamiento.py
+Capa de almacenamiento intercambiable para productos y ventas.
+
+- AlmacenJSON: productos.json + ventas.json con diario append-only (por defecto,
+  compatible con los comercios que ya usan los JSON). Junto a cada JSON
+  guarda una copia binaria (productos.bin / ventas.bin, ver binario.py) que
+  se carga mucho más rápido; ENCANTO_BINARIO=0 la desactiva. Los meses
+  cerrados pasan a un archivo por mes (ventas_archivo/, ver archivo.py) que
+  se lee recién cuando un reporte lo toca; ENCANTO_ARCHIVO=0 lo desactiva y
+  ENCANTO_ARCHIVO_GZIP=1 comprime los meses que se archiven.
+- AlmacenSQLite: una base SQLite en modo WAL con tablas indexadas de
+  productos, ventas y líneas de venta. Un cambio de stock o una venta es una
+  única escritura transaccional a nivel de fila, y varias cajas pueden
+  compartir el mismo archivo.
+- importar_json_a_sqlite: migración única desde los JSON existentes.
+
+Varias cajas:
+- AlmacenJSON toma un bloqueo exclusivo (productos.json.lock): una segunda
+  instancia sobre los mismos archivos no arranca en vez de pisar el stock.
+- AlmacenSQLite es el modo compartido. Cada fila de productos lleva una
+  versión (secuencia global): las ediciones solo se aplican si nadie tocó la
+  fila desde que se leyó (ConflictoVersion). Las ventas descuentan stock de
+  forma relativa y con control de disponibilidad dentro de la transacción,
+  las reservas cortas del carrito (tabla reservas) descuentan disponibilidad
+  para las otras cajas, y sincronizar() trae lo que cambiaron las demás.
+
+Selección: variable de entorno ENCANTO_ALMACEN=json|sqlite (ver crear_almacen).
+
+Uso desde consola:
+    python almacenamiento.py importar [encanto.db]
+"""
+
+import json, os, sqlite3, sys, threading, time
+
+import binario
+from archivo import ArchivoVentas, MANIFIESTO, inicio_mes
+from diario import DiarioVentas, escribir_json_atomico
+from bloqueo import BloqueoArchivo
+from compacto import Producto, Venta, parse_fecha
+
+DATA_FILE = "productos.json"
+VENTAS_FILE = "ventas.json"
+VENTAS_DIARIO = "ventas.jsonl"
+ARCHIVO_DIR = "ventas_archivo"
+DB_FILE = "encanto.db"
+
+
+def normalizar_producto(p):
+    try: p["precio"] = float(p.get("precio", 0) or 0)
+    except Exception: p["precio"] = 0.0
+    try: p["stock"] = int(p.get("stock", 0) or 0)
+    except Exception: p["stock"] = 0
+    p["articulo"] = str(p.get("articulo","")).strip()
+    p["nombre"] = str(p.get("nombre","")).strip()
+    p["marca"] = str(p.get("marca","")).strip()
+    if p.get("minimo") is not None:
+        # mínimo de stock propio (alertas.py); vacío o inválido = el mínimo general
+        try: p["minimo"] = int(p["minimo"])
+        except Exception: p.pop("minimo", None)
+    return p
+
+
+def normalizar_venta(v):
+    """Convierte registros viejos (una línea suelta, sin 'productos') al formato actual."""
+    if "productos" in v:
+        return v
+    cantidad = int(v.get("cantidad", 0) or 0)
+    total = float(v.get("total", 0) or 0)
+    precio = float(v.get("precio") or (total / cantidad if cantidad else 0))
+    return {
+        "fecha": v.get("fecha", ""),
+        "cliente": v.get("cliente", ""),
+        "dni": v.get("dni", ""),
+        "tel": v.get("tel", ""),
+        "productos": [{"articulo": v.get("articulo", ""), "nombre": v.get("nombre", ""),
+                       "marca": v.get("marca", ""), "cantidad": cantidad, "precio": precio}],
+        "total": round(total or precio * cantidad, 2),
+    }
+
+
+class ConflictoVersion(RuntimeError):
+    """Otra caja cambió el producto (o no alcanza el stock) desde que se leyó."""
+
+
+def _copiar(productos):
+    return [(p, dict(p)) for p in productos]
+
+
+def combinar_instantaneas(a, b):
+    """Fusiona dos instantáneas de productos pendientes (la más nueva gana). None = no combinables."""
+    tipo_a, filas_a = a
+    tipo_b, filas_b = b
+    if tipo_b == "total":
+        return b
+    if tipo_a == "baja" or tipo_b == "baja":
+        return None
+    pos = {id(p): i for i, (p, _v) in enumerate(filas_a)}
+    filas = list(filas_a)
+    for p, v in filas_b:
+        i = pos.get(id(p))
+        if i is None:
+            pos[id(p)] = len(filas)
+            filas.append((p, v))
+        else:
+            filas[i] = (p, v)
+    return (tipo_a, filas)
+
+
+# -------------------- JSON --------------------
+class AlmacenJSON:
+    nombre = "json"
+    compartido = False
+
+    def __init__(self, data_file=DATA_FILE, ventas_file=VENTAS_FILE, diario_file=VENTAS_DIARIO, compactar_cada=500, copia_binaria=True,
+                 archivo=None):
+        self.data_file = data_file
+        self.carpeta = os.path.dirname(os.path.abspath(data_file))  # logs and side files go here
+        self.archivo = archivo  # ArchivoVentas: closed months out of ventas.json; None = everything in ventas.json
+        self.avisos_archivo = []  # problems with the archive in the last cargar_ventas
+        self.diario = DiarioVentas(ventas_file, diario_file, compactar_cada=compactar_cada)
+        self._bloqueo = BloqueoArchivo(data_file + ".lock")
+        # binary copy next to each JSON (binario.py); None = JSON only
+        self.bin_productos = binario.ruta_binario(data_file) if copia_binaria else None
+        self.bin_ventas = binario.ruta_binario(ventas_file) if copia_binaria else None
+
+    def bloquear(self):
+        """Uso exclusivo de los archivos. Lanza ArchivoBloqueado si hay otra instancia."""
+        self._bloqueo.adquirir()
+
+    def cargar_productos(self):
+        """Productos ya normalizados: de la copia binaria si está al día, si no del JSON (y rehace la copia)."""
+        if not os.path.exists(self.data_file):
+            return []
+        if self.bin_productos:
+            productos = binario.leer_productos(self.bin_productos, self.data_file)
+            if productos is not None:
+                return productos
+        with open(self.data_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        productos = [normalizar_producto(Producto.desde(p)) for p in data] if isinstance(data, list) else []
+        self._copia_productos(productos)
+        return productos
+
+    def _copia_productos(self, productos):
+        if self.bin_productos:
+            binario.escribir_productos(self.bin_productos, productos, self.data_file)
+
+    # Las instantáneas copian los datos en el hilo de la UI; escribir_* puede
+    # correr en otro hilo (ver escritor.py).
+    def instantanea_productos(self, productos, cambiados=None):
+        # JSON no tiene escrituras parciales: siempre el archivo completo
+        return ("total", _copiar(productos))
+
+    def instantanea_baja(self, productos, eliminados):
+        return ("total", _copiar(productos))
+
+    def escribir_productos(self, inst):
+        filas = [v for _p, v in inst[1]]
+        escribir_json_atomico(self.data_file, filas)
+        self._copia_productos(filas)
+
+    def cargar_ventas(self):
+        """(ventas, avisos): snapshot + diario. Con archivo, solo el mes en curso (los cerrados se archivan acá)."""
+        path = self.diario.path_snapshot
+        self.diario.recuperar()
+        snapshot = None
+        if self.bin_ventas and os.path.exists(path):
+            snapshot = binario.leer_ventas(self.bin_ventas, path)
+            if snapshot is None:
+                # stale or missing copy: parse the JSON once and rebuild it
+                snapshot = [Venta.desde(normalizar_venta(v)) for v in self.diario.leer_snapshot()]
+                binario.escribir_ventas(self.bin_ventas, snapshot, path)
+        self.avisos_archivo = []
+        if self.archivo is None:
+            return self.diario.cargar(snapshot)
+        if snapshot is None:
+            snapshot = [Venta.desde(normalizar_venta(v)) for v in self.diario.leer_snapshot()]
+        try:
+            snapshot = self.archivo.sin_archivadas(snapshot, path)
+        except ValueError as e:
+            # damaged manifest: never archive on top of it
+            self.archivo = None
+            self.avisos_archivo.append(f"No se pudo leer el archivo de ventas: {e}")
+            return self.diario.cargar(snapshot)
+        ventas, avisos = self.diario.cargar(snapshot)
+        ventas = [Venta.desde(normalizar_venta(v)) for v in ventas]
+        try:
+            ventas = self._archivar(ventas)
+        except (OSError, ValueError) as e:
+            self.avisos_archivo.append(f"No se pudieron archivar los meses cerrados: {e}")
+        return ventas, avisos
+
+    def _archivar(self, ventas):
+        """Pasa al archivo las ventas de meses cerrados. Devuelve las que quedan en ventas.json."""
+        corte = inicio_mes()
+        viejas = [v for v in ventas if v.ts is not None and v.ts < corte]
+        if viejas:
+            # when the manifest is written the archived sales must be in ventas.json only (not in the journal)
+            if self.diario.pendientes or not os.path.exists(self.diario.path_snapshot):
+                self._compactar(ventas)
+            self.archivo.archivar(viejas, corte, self.diario.path_snapshot)
+            ventas = [v for v in ventas if v.ts is None or v.ts >= corte]
+        elif not self.archivo.manifiesto.get("pendiente"):
+            self.archivo.limpiar()
+            return ventas
+        self._compactar(ventas)
+        self.archivo.confirmar()
+        return ventas
+
+    # -------------------- Archivo por mes --------------------
+    def meses_archivados(self, desde=None, hasta=None):
+        return self.archivo.meses(desde, hasta) if self.archivo is not None else []
+
+    def leer_mes(self, mes):
+        return self.archivo.leer(mes)
+
+    def clientes_archivados(self):
+        return self.archivo.clientes() if self.archivo is not None else {}
+
+    def _compactar(self, ventas):
+        self.diario.compactar(ventas)
+        if self.bin_ventas:
+            binario.escribir_ventas(self.bin_ventas, ventas, self.diario.path_snapshot)
+
+    def guardar_ventas(self, ventas):
+        self._compactar(ventas)
+
+    def escribir_venta(self, venta, inst, ventas=None, n_ventas=None):
+        """Agrega la venta al diario y guarda el stock. Compacta cuando corresponde.
+        ventas[:n_ventas] es el historial al momento de la venta (la lista solo crece)."""
+        self.diario.agregar(venta)
+        self.escribir_productos(inst)
+        if ventas is not None and self.diario.necesita_compactar():
+            self._compactar(ventas[:n_ventas] if n_ventas is not None else ventas)
+
+    def necesita_compactar(self):
+        return self.diario.necesita_compactar()
+
+    def cerrar(self):
+        self._bloqueo.liberar()
+
+
+# -------------------- SQLite --------------------
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY,
+    articulo TEXT NOT NULL,
+    nombre TEXT NOT NULL DEFAULT '',
+    marca TEXT NOT NULL DEFAULT '',
+    precio REAL NOT NULL DEFAULT 0,
+    stock INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_productos_articulo ON productos(articulo);
+CREATE INDEX IF NOT EXISTS ix_productos_marca ON productos(marca COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS ventas (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    ts INTEGER,
+    cliente TEXT NOT NULL DEFAULT '',
+    dni TEXT NOT NULL DEFAULT '',
+    tel TEXT NOT NULL DEFAULT '',
+    total REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_ventas_ts ON ventas(ts);
+CREATE INDEX IF NOT EXISTS ix_ventas_dni ON ventas(dni);
+CREATE TABLE IF NOT EXISTS venta_lineas (
+    id INTEGER PRIMARY KEY,
+    venta_id INTEGER NOT NULL REFERENCES ventas(id) ON DELETE CASCADE,
+    articulo TEXT NOT NULL,
+    nombre TEXT NOT NULL DEFAULT '',
+    marca TEXT NOT NULL DEFAULT '',
+    cantidad INTEGER NOT NULL,
+    precio REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_lineas_venta ON venta_lineas(venta_id);
+CREATE INDEX IF NOT EXISTS ix_lineas_articulo ON venta_lineas(articulo);
+"""
+
+# después de migrar bases sin columna version
+ESQUEMA_CAJAS = """
+CREATE INDEX IF NOT EXISTS ix_productos_version ON productos(version);
+CREATE TABLE IF NOT EXISTS productos_bajas (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_bajas_version ON productos_bajas(version);
+CREATE TABLE IF NOT EXISTS reservas (
+    producto_id INTEGER NOT NULL,
+    caja TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    vence REAL NOT NULL,
+    PRIMARY KEY (producto_id, caja)
+);
+CREATE TABLE IF NOT EXISTS secuencia (n INTEGER NOT NULL);
+INSERT INTO secuencia(n) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM secuencia);
+"""
+
+# stock - reservas vigentes de otras cajas
+SQL_DISPONIBLE = """
+SELECT p.stock - COALESCE((SELECT SUM(r.cantidad) FROM reservas r
+                           WHERE r.producto_id = p.id AND r.caja <> ? AND r.vence > ?), 0)
+FROM productos p WHERE p.id = ?
+"""
+
+
+class AlmacenSQLite:
+    nombre = "sqlite"
+    compartido = True
+    avisos_archivo = ()
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self.carpeta = os.path.dirname(os.path.abspath(db_file))
+        self.con = sqlite3.connect(db_file, timeout=10, isolation_level=None, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute("PRAGMA foreign_keys=ON")
+        self.con.executescript(ESQUEMA)
+        columnas = [r[1] for r in self.con.execute("PRAGMA table_info(productos)")]
+        if "version" not in columnas:
+            self.con.execute("ALTER TABLE productos ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if "minimo" not in columnas:
+            self.con.execute("ALTER TABLE productos ADD COLUMN minimo INTEGER")
+        self.con.executescript(ESQUEMA_CAJAS)
+        # la conexión se comparte entre la UI y el hilo de guardado
+        self._lock = threading.RLock()
+        # id(dict) -> (dict, rowid). Se guarda el dict para que su id no se reutilice.
+        self._filas = {}
+        self._por_id = {}      # rowid -> dict
+        self._versiones = {}   # rowid -> versión leída / escrita por esta caja
+        self._version_tx = None
+        self._tx_hechos = []    # cambios de los mapas en memoria, se aplican al hacer COMMIT
+        self.version_vista = 0  # última versión global sincronizada
+        self._ultima_venta = 0
+        self._ventas_propias = set()
+
+    def _transaccion(self):
+        return _Transaccion(self)
+
+    def bloquear(self):
+        pass  # varias cajas pueden compartir la base
+
+    def _siguiente_version(self):
+        # una versión por transacción, en orden de commit (BEGIN IMMEDIATE serializa)
+        if self._version_tx is None:
+            self.con.execute("UPDATE secuencia SET n = n + 1")
+            self._version_tx = self.con.execute("SELECT n FROM secuencia").fetchone()[0]
+        return self._version_tx
+
+    def _registrar_fila(self, p, rid, version):
+        self._filas[id(p)] = (p, rid)
+        self._por_id[rid] = p
+        self._versiones[rid] = version
+
+    def _olvidar_fila(self, p):
+        fila = self._filas.pop(id(p), None)
+        if fila and fila[0] is p:
+            self._por_id.pop(fila[1], None)
+            self._versiones.pop(fila[1], None)
+            return fila[1]
+        return None
+
+    def _rowid(self, p):
+        fila = self._filas.get(id(p))
+        if not fila or fila[0] is not p:
+            raise ConflictoVersion(f"El artículo {p['articulo']} no está guardado en la base.")
+        return fila[1]
+
+    def vacio(self):
+        cur = self.con.execute("SELECT (SELECT COUNT(*) FROM productos) + (SELECT COUNT(*) FROM ventas)")
+        return cur.fetchone()[0] == 0
+
+    # -------------------- Productos --------------------
+    def cargar_productos(self):
+        with self._lock:
+            self._filas = {}; self._por_id = {}; self._versiones = {}
+            productos = []
+            self.version_vista = self.con.execute("SELECT n FROM secuencia").fetchone()[0]
+            for rid, art, nom, mar, pre, sto, ver, mini in self.con.execute(
+                    "SELECT id, articulo, nombre, marca, precio, stock, version, minimo FROM productos ORDER BY id"):
+                p = Producto(art, nom, mar, pre, sto)
+                if mini is not None:
+                    p["minimo"] = mini
+                productos.append(normalizar_producto(p))
+                self._registrar_fila(p, rid, ver)
+            return productos
+
+    def _upsert(self, p, v=None):
+        # p identifica la fila; v (copia) aporta los valores si se escribe desde otro hilo
+        v = p if v is None else v
+        fila = self._filas.get(id(p))
+        vals = (v["articulo"], v["nombre"], v["marca"], v["precio"], v["stock"], v.get("minimo"))
+        version = self._siguiente_version()
+        if fila and fila[0] is p:
+            rid = fila[1]
+            # optimistic: only if no other register touched the row since we read it
+            cur = self.con.execute(
+                "UPDATE productos SET articulo=?, nombre=?, marca=?, precio=?, stock=?, minimo=?, version=? WHERE id=? AND version=?",
+                vals + (version, rid, self._versiones.get(rid, 0)))
+            if cur.rowcount == 0:
+                raise ConflictoVersion(f"El artículo {v['articulo']} fue modificado o eliminado en otra caja.")
+            self._tx_hechos.append(lambda: self._versiones.__setitem__(rid, version))
+        else:
+            cur = self.con.execute("INSERT INTO productos(articulo, nombre, marca, precio, stock, minimo, version) VALUES (?,?,?,?,?,?,?)", vals + (version,))
+            rid = cur.lastrowid
+            self._tx_hechos.append(lambda: self._registrar_fila(p, rid, version))
+
+    def instantanea_productos(self, productos, cambiados=None):
+        if cambiados is None:
+            return ("total", _copiar(productos))
+        return ("delta", _copiar(cambiados))
+
+    def instantanea_baja(self, productos, eliminados):
+        return ("baja", [(p, None) for p in eliminados])
+
+    def _borrar(self, p):
+        fila = self._filas.get(id(p))
+        rid = fila[1] if fila and fila[0] is p else None
+        if rid is not None:
+            self._tx_hechos.append(lambda: self._olvidar_fila(p))
+            self.con.execute("DELETE FROM productos WHERE id=?", (rid,))
+            self.con.execute("DELETE FROM reservas WHERE producto_id=?", (rid,))
+            self.con.execute("INSERT OR REPLACE INTO productos_bajas(id, version) VALUES (?,?)", (rid, self._siguiente_version()))
+
+    def _escribir(self, inst):
+        tipo, filas = inst
+        if tipo == "baja":
+            for p, _v in filas:
+                self._borrar(p)
+            return
+        if tipo == "total":
+            # only rows this register knows about: other registers' new rows survive
+            vivos = {id(p) for p, _v in filas}
+            for k, (p, _rid) in list(self._filas.items()):
+                if k not in vivos:
+                    self._borrar(p)
+        for p, v in filas:
+            self._upsert(p, v)
+
+    def escribir_productos(self, inst):
+        """Total: sincroniza la tabla; delta: solo las filas cambiadas; baja: borra filas."""
+        with self._transaccion():
+            self._escribir(inst)
+
+    # -------------------- Ventas --------------------
+    def _leer_ventas(self, desde_id=0):
+        ventas = {}
+        orden = []
+        for vid, fecha, cli, dni, tel, total in self.con.execute(
+                "SELECT id, fecha, cliente, dni, tel, total FROM ventas WHERE id > ? ORDER BY id", (desde_id,)):
+            v = {"fecha": fecha, "cliente": cli, "dni": dni, "tel": tel, "productos": [], "total": total}
+            ventas[vid] = v
+            orden.append((vid, v))
+        for vid, art, nom, mar, cant, pre in self.con.execute(
+                "SELECT venta_id, articulo, nombre, marca, cantidad, precio FROM venta_lineas WHERE venta_id > ? ORDER BY venta_id, id", (desde_id,)):
+            v = ventas.get(vid)
+            if v is not None:
+                v["productos"].append({"articulo": art, "nombre": nom, "marca": mar, "cantidad": cant, "precio": pre})
+        return orden
+
+    def cargar_ventas(self):
+        with self._lock:
+            orden = self._leer_ventas()
+            self._ultima_venta = orden[-1][0] if orden else 0
+            self._ventas_propias = set()
+            return [v for _vid, v in orden], []
+
+    # indexed by date already: no monthly archive
+    def meses_archivados(self, desde=None, hasta=None):
+        return []
+
+    def clientes_archivados(self):
+        return {}
+
+    def _insertar_venta(self, venta):
+        venta = normalizar_venta(venta)
+        fv = parse_fecha(venta.get("fecha", ""))
+        cur = self.con.execute(
+            "INSERT INTO ventas(fecha, ts, cliente, dni, tel, total) VALUES (?,?,?,?,?,?)",
+            (venta.get("fecha", ""), int(fv.timestamp()) if fv else None, venta.get("cliente", ""),
+             venta.get("dni", ""), venta.get("tel", ""), float(venta.get("total", 0) or 0)))
+        vid = cur.lastrowid
+        self.con.executemany(
+            "INSERT INTO venta_lineas(venta_id, articulo, nombre, marca, cantidad, precio) VALUES (?,?,?,?,?,?)",
+            [(vid, it["articulo"], it["nombre"], it["marca"], int(it["cantidad"]), float(it["precio"]))
+             for it in venta.get("productos", [])])
+        self._ventas_propias.add(vid)
+        return vid
+
+    def guardar_ventas(self, ventas):
+        with self._transaccion():
+            self.con.execute("DELETE FROM venta_lineas")
+            self.con.execute("DELETE FROM ventas")
+            for v in ventas:
+                self._insertar_venta(v)
+
+    def escribir_venta(self, venta, inst, ventas=None, n_ventas=None):
+        """Venta + líneas + descuento de stock en una sola transacción."""
+        with self._transaccion():
+            self._insertar_venta(venta)
+            self._escribir(inst)
+
+    def necesita_compactar(self):
+        return False
+
+    # -------------------- Varias cajas --------------------
+    def _disponible(self, rid, caja):
+        fila = self.con.execute(SQL_DISPONIBLE, (caja, time.time(), rid)).fetchone()
+        return fila[0] if fila else None
+
+    def _sumar_stock(self, rid, cantidad):
+        """UPDATE relativo; devuelve el stock resultante o None si la fila no existe."""
+        fila = self.con.execute("SELECT version FROM productos WHERE id=?", (rid,)).fetchone()
+        if fila is None:
+            return None
+        version = self._siguiente_version()
+        self.con.execute("UPDATE productos SET stock = stock + ?, version = ? WHERE id = ?", (int(cantidad), version, rid))
+        if fila[0] == self._versiones.get(rid):
+            # nobody else touched the row: our copy stays current. Otherwise the
+            # next sincronizar() brings the other register's change.
+            self._tx_hechos.append(lambda: self._versiones.__setitem__(rid, version))
+        return self.con.execute("SELECT stock FROM productos WHERE id=?", (rid,)).fetchone()[0]
+
+    def confirmar_venta(self, venta, lineas, caja):
+        """Venta con descuento relativo de stock, controlando lo disponible (stock menos
+        reservas de otras cajas) dentro de la transacción. lineas: [(producto, cantidad)].
+        Libera las reservas de esta caja para esos productos. Devuelve {id(producto): stock actual}.
+        Lanza ConflictoVersion (nada se escribe) si algo no alcanza."""
+        with self._transaccion():
+            faltantes = []
+            for p, cantidad in lineas:
+                disp = self._disponible(self._rowid(p), caja)
+                if disp is None:
+                    faltantes.append(f"{p['articulo']}: eliminado en otra caja")
+                elif disp < cantidad:
+                    faltantes.append(f"{p['articulo']}: pedido {cantidad}, disponible {max(0, disp)}")
+            if faltantes:
+                raise ConflictoVersion("Stock insuficiente (vendido o reservado en otra caja):\n" + "\n".join(faltantes))
+            stocks = {}
+            for p, cantidad in lineas:
+                stocks[id(p)] = self._sumar_stock(self._rowid(p), -cantidad)
+            self._insertar_venta(venta)
+            self.con.executemany("DELETE FROM reservas WHERE producto_id=? AND caja=?",
+                                 [(self._rowid(p), caja) for p, _q in lineas])
+            return stocks
+
+    def ajustar_stock(self, p, cantidad):
+        """Suma (o resta) stock de forma relativa. Devuelve el stock resultante."""
+        with self._transaccion():
+            stock = self._sumar_stock(self._rowid(p), cantidad)
+            if stock is None:
+                raise ConflictoVersion(f"El artículo {p['articulo']} fue eliminado en otra caja.")
+            return stock
+
+    def reservar(self, p, cantidad, caja, segundos):
+        """Reserva cantidad (total de la línea del carrito) por unos segundos; 0 libera.
+        Devuelve lo disponible para esta caja. Lanza ConflictoVersion si no alcanza."""
+        with self._transaccion():
+            rid = self._rowid(p)
+            ahora = time.time()
+            self.con.execute("DELETE FROM reservas WHERE vence <= ?", (ahora,))
+            disp = self._disponible(rid, caja)
+            if disp is None:
+                raise ConflictoVersion(f"El artículo {p['articulo']} fue eliminado en otra caja.")
+            if cantidad > disp:
+                raise ConflictoVersion(f"Solo hay {max(0, disp)} disponibles de {p['articulo']} (el resto está vendido o reservado en otra caja).")
+            if cantidad > 0:
+                self.con.execute("INSERT OR REPLACE INTO reservas(producto_id, caja, cantidad, vence) VALUES (?,?,?,?)",
+                                 (rid, caja, int(cantidad), ahora + segundos))
+            else:
+                self.con.execute("DELETE FROM reservas WHERE producto_id=? AND caja=?", (rid, caja))
+            return disp
+
+    def renovar_reservas(self, caja, segundos):
+        with self._transaccion():
+            self.con.execute("UPDATE reservas SET vence=? WHERE caja=?", (time.time() + segundos, caja))
+
+    def liberar_reservas(self, caja):
+        with self._transaccion():
+            self.con.execute("DELETE FROM reservas WHERE caja=?", (caja,))
+
+    def sincronizar(self):
+        """Cambios de otras cajas desde la última lectura:
+        (actualizados [(producto, valores)], nuevos [producto], bajas [producto], ventas nuevas)."""
+        with self._lock:
+            tope = self.con.execute("SELECT n FROM secuencia").fetchone()[0]
+            actualizados = []; nuevos = []; bajas = []
+            if tope > self.version_vista:
+                for rid, art, nom, mar, pre, sto, ver, mini in self.con.execute(
+                        "SELECT id, articulo, nombre, marca, precio, stock, version, minimo FROM productos WHERE version > ? ORDER BY id",
+                        (self.version_vista,)):
+                    if self._versiones.get(rid) == ver:
+                        continue  # our own write
+                    vals = {"articulo": art, "nombre": nom, "marca": mar, "precio": pre, "stock": sto, "minimo": mini}
+                    p = self._por_id.get(rid)
+                    if p is None:
+                        p = Producto(art, nom, mar, pre, sto)
+                        if mini is not None:
+                            p["minimo"] = mini
+                        nuevos.append(p)
+                        self._registrar_fila(p, rid, ver)
+                    else:
+                        actualizados.append((p, vals))
+                        self._versiones[rid] = ver
+                for (rid,) in self.con.execute("SELECT id FROM productos_bajas WHERE version > ?", (self.version_vista,)):
+                    p = self._por_id.get(rid)
+                    if p is not None:
+                        self._olvidar_fila(p)
+                        bajas.append(p)
+                self.version_vista = tope
+            ventas = [v for vid, v in self._leer_ventas(self._ultima_venta) if vid not in self._ventas_propias]
+            ultima = self.con.execute("SELECT COALESCE(MAX(id), 0) FROM ventas").fetchone()[0]
+            self._ventas_propias = {vid for vid in self._ventas_propias if vid > ultima}
+            self._ultima_venta = max(self._ultima_venta, ultima)
+            return actualizados, nuevos, bajas, ventas
+
+    def cerrar(self):
+        try:
+            self.con.close()
+        except Exception:
+            pass
+
+
+class _Transaccion:
+    def __init__(self, almacen):
+        self.almacen = almacen
+        self.con = almacen.con
+
+    def __enter__(self):
+        self.almacen._lock.acquire()
+        try:
+            self.con.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.almacen._lock.release()
+            raise
+        self.almacen._version_tx = None
+        self.almacen._tx_hechos = []
+        return self.con
+
+    def __exit__(self, tipo, valor, tb):
+        a = self.almacen
+        try:
+            if tipo:
+                self.con.execute("ROLLBACK")
+            else:
+                self.con.execute("COMMIT")
+                for hecho in a._tx_hechos:
+                    hecho()
+        finally:
+            a._version_tx = None
+            a._tx_hechos = []
+            a._lock.release()
+        return False
+
+
+# -------------------- Importación / selección --------------------
+def importar_json_a_sqlite(almacen, data_file=DATA_FILE, ventas_file=VENTAS_FILE, diario_file=VENTAS_DIARIO, archivo_dir=ARCHIVO_DIR):
+    """Copia productos y ventas (archivo por mes + snapshot + diario) de los JSON a la base. Devuelve (n_prod, n_ventas)."""
+    origen = AlmacenJSON(data_file, ventas_file, diario_file, compactar_cada=0, copia_binaria=False)
+    productos = [normalizar_producto(p) for p in origen.cargar_productos()]
+    ventas, _avisos = origen.cargar_ventas()
+    if os.path.exists(os.path.join(archivo_dir, MANIFIESTO)):
+        # read only: the JSON files are left as they are
+        archivo = ArchivoVentas(archivo_dir)
+        archivadas = [v for mes in archivo.meses() for v in archivo.leer(mes)]
+        ventas = archivadas + archivo.sin_archivadas([Venta.desde(normalizar_venta(v)) for v in ventas], ventas_file)
+    almacen._filas = {}; almacen._por_id = {}; almacen._versiones = {}
+    with almacen._transaccion():
+        almacen.con.execute("DELETE FROM venta_lineas")
+        almacen.con.execute("DELETE FROM ventas")
+        almacen.con.execute("DELETE FROM productos")
+        for p in productos:
+            almacen._upsert(p)
+        for v in ventas:
+            almacen._insertar_venta(v)
+    return len(productos), len(ventas)
+
+
+def crear_almacen(tipo=None, compactar_cada=500):
+    """Crea el almacén configurado. SQLite vacío + JSON existentes => importación única."""
+    tipo = (tipo or os.environ.get("ENCANTO_ALMACEN", "json")).lower()
+    if tipo == "sqlite":
+        db = os.environ.get("ENCANTO_DB", DB_FILE)
+        almacen = AlmacenSQLite(db)
+        if almacen.vacio() and (os.path.exists(DATA_FILE) or os.path.exists(VENTAS_FILE)):
+            importar_json_a_sqlite(almacen)
+        return almacen
+    copia = os.environ.get("ENCANTO_BINARIO", "1").strip() not in ("0", "no", "false")
+    archivo = None
+    if os.environ.get("ENCANTO_ARCHIVO", "1").strip() not in ("0", "no", "false"):
+        archivo = ArchivoVentas(ARCHIVO_DIR, comprimir=os.environ.get("ENCANTO_ARCHIVO_GZIP", "").strip() in ("1", "si", "true"))
+    return AlmacenJSON(compactar_cada=compactar_cada, copia_binaria=copia, archivo=archivo)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "importar":
+        destino = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+        n_prod, n_ventas = importar_json_a_sqlite(AlmacenSQLite(destino))
+        print(f"Importados {n_prod} productos y {n_ventas} ventas en {destino}")
+    else:
+        print(__doc__)
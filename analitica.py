@@ -0,0 +1,308 @@
+"""
+analitica.py
+Análisis del historial de ventas sobre columnas (NumPy opcional).
+
+- Las líneas de venta se pasan una sola vez a columnas (array.array): día,
+  mes, artículo, marca, cantidad e importe. La carga va en bloque (columnas
+  enteras con comprensiones y extend); las ventas nuevas se agregan al
+  final sin reconstruir nada.
+- Con NumPy cada consulta es vectorizada (máscara del rango + bincount);
+  sin NumPy, una sola pasada en Python puro sobre las mismas columnas.
+- Más vendidos, ingresos por marca o por mes, sell-through, días de stock
+  y sugerencias de reposición para un rango de fechas.
+- Varias listas de ventas a la vez (meses traídos del archivo + historial
+  activo), cada una incremental.
+"""
+
+import math
+from array import array
+from datetime import date
+from heapq import nlargest
+from itertools import chain, islice
+from operator import attrgetter, le, mul
+
+from agregados import clave_fecha
+from compacto import _ORD_EPOCA, LineaVenta, Venta
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+PLAZO_REPOSICION = 14  # días que tarda en llegar un pedido
+COBERTURA = 30         # días de venta que debe cubrir el pedido
+
+
+def texto_mes(mes):
+    """mes codificado (año*12 + mes-1) -> 'mm/yyyy'."""
+    return f"{mes % 12 + 1:02d}/{mes // 12}"
+
+
+class IndicadorProducto:
+    __slots__ = ("producto", "vendidas", "importe", "sell_through", "por_dia", "dias_stock", "pedir")
+
+    def __init__(self, producto, vendidas, importe, dias):
+        self.producto = producto
+        self.vendidas = vendidas
+        self.importe = importe
+        stock = max(producto["stock"], 0)
+        # stock at the start of the period ~ what is left + what was sold (ignores restocks)
+        inicial = vendidas + stock
+        self.sell_through = vendidas / inicial if inicial else 0.0
+        self.por_dia = vendidas / dias
+        self.dias_stock = stock / self.por_dia if self.por_dia else None
+        self.pedir = 0
+
+
+class AnaliticaVentas:
+    def __init__(self):
+        self._reiniciar(())
+
+    def _reiniciar(self, listas):
+        self._fuentes = listas
+        self._n_ventas = [0] * len(listas)
+        self.articulos = []   # código -> artículo
+        self.lineas = []      # código -> última línea vendida (nombre y marca actuales)
+        self._dia_linea = array("i")  # código -> día de esa línea
+        self.marcas = []      # código -> marca
+        self._cod_art = {}
+        self._cod_marca = {}
+        self._meses = {}      # día ordinal -> mes codificado
+        self.dia = array("i")
+        self.mes = array("i")
+        self.art = array("i")
+        self.marca = array("i")
+        self.cant = array("i")
+        self.imp = array("d")
+        self.dia_min = None
+        self._np = None       # (n líneas, columnas NumPy)
+        self._cache = None    # (clave, sumas) de la última consulta
+
+    def __len__(self):
+        return len(self.dia)
+
+    # -------------------- Carga --------------------
+    def sincronizar(self, *listas):
+        """Incorpora las ventas agregadas a cada lista desde la última llamada (otras listas: reconstruye)."""
+        if len(listas) != len(self._fuentes) or any(
+                a is not b or len(a) < n for a, b, n in zip(listas, self._fuentes, self._n_ventas)):
+            self._reiniciar(listas)
+        for i, ventas in enumerate(listas):
+            if len(ventas) > self._n_ventas[i]:
+                nuevas = ventas[self._n_ventas[i]:]
+                if not self._agregar_bloque(nuevas):
+                    for v in nuevas:
+                        self._agregar(v)
+                self._n_ventas[i] = len(ventas)
+        return self
+
+    def _codigo(self, codigos, lista, valor):
+        c = codigos.get(valor)
+        if c is None:
+            c = codigos[valor] = len(lista)
+            lista.append(valor)
+        return c
+
+    def _agregar(self, v):
+        kf = clave_fecha(v)
+        if kf is None:
+            return
+        dia = kf[0]
+        mes = self._meses.get(dia)
+        if mes is None:
+            d = date.fromordinal(dia)
+            mes = self._meses[dia] = d.year * 12 + d.month - 1
+        if self.dia_min is None or dia < self.dia_min:
+            self.dia_min = dia
+        cod_art = self._cod_art; cod_marca = self._cod_marca
+        for prod in (v.productos if type(v) is Venta else v.get("productos", ())):
+            if type(prod) is LineaVenta:
+                # attribute access: the dict view costs about as much as the rest of the loop
+                art, marca, cant, precio = prod.articulo, prod.marca, prod.cantidad, prod.precio
+            else:
+                art, marca, cant, precio = prod.get("articulo", ""), prod.get("marca", ""), prod["cantidad"], prod["precio"]
+            a = cod_art.get(art)
+            if a is None:
+                a = self._codigo(cod_art, self.articulos, art)
+                self.lineas.append(prod)
+                self._dia_linea.append(dia)
+            elif dia >= self._dia_linea[a]:
+                # archived months can arrive after newer sales: keep the newest name
+                self.lineas[a] = prod
+                self._dia_linea[a] = dia
+            m = cod_marca.get(marca)
+            if m is None:
+                m = self._codigo(cod_marca, self.marcas, marca)
+            self.dia.append(dia)
+            self.mes.append(mes)
+            self.art.append(a)
+            self.marca.append(m)
+            self.cant.append(cant)
+            self.imp.append(precio * cant)
+
+    def _agregar_bloque(self, ventas):
+        """Columnas de muchas ventas de una vez (comprensiones y extend, sin un append por
+        campo y línea). Solo Venta con LineaVenta; False si hay dicts (van de a una)."""
+        if not set(map(type, ventas)) <= {Venta}:
+            return False
+        ventas = [v for v in ventas if v.ts is not None]
+        productos = list(map(attrgetter("productos"), ventas))
+        lineas = list(chain.from_iterable(productos))
+        if not set(map(type, lineas)) <= {LineaVenta}:
+            return False
+        if not lineas:
+            return True
+        dias_venta = [ts // 86400 + _ORD_EPOCA for ts in map(attrgetter("ts"), ventas)]
+        dias = [d for d, lv in zip(dias_venta, productos) for _ in lv]
+        meses = self._meses
+        for d in set(dias_venta).difference(meses):
+            f = date.fromordinal(d)
+            meses[d] = f.year * 12 + f.month - 1
+        cod_art = self._cod_art; cod_marca = self._cod_marca
+        n_art, n_marca = len(cod_art), len(cod_marca)
+        arts = list(map(attrgetter("articulo"), lineas))
+        marcas = list(map(attrgetter("marca"), lineas))
+        for codigos, valores in ((cod_art, arts), (cod_marca, marcas)):
+            for x in dict.fromkeys(valores):
+                if x not in codigos:
+                    codigos[x] = len(codigos)
+        arts = list(map(cod_art.__getitem__, arts))
+        marcas = list(map(cod_marca.__getitem__, marcas))
+        self.articulos.extend(islice(cod_art, n_art, None))
+        self.marcas.extend(islice(cod_marca, n_marca, None))
+        # newest line of each article (the later one within a day), as in _agregar
+        if all(map(le, dias, islice(dias, 1, None))):
+            ultima = dict(zip(arts, range(len(arts))))
+        else:
+            orden = sorted(range(len(dias)), key=dias.__getitem__)
+            ultima = dict(zip(map(arts.__getitem__, orden), orden))
+        self.lineas.extend([None] * (len(cod_art) - n_art))
+        self._dia_linea.extend([0] * (len(cod_art) - n_art))
+        for a, k in ultima.items():
+            if a >= n_art or dias[k] >= self._dia_linea[a]:
+                self.lineas[a] = lineas[k]
+                self._dia_linea[a] = dias[k]
+        d0 = min(dias_venta)
+        if self.dia_min is None or d0 < self.dia_min:
+            self.dia_min = d0
+        cant = list(map(attrgetter("cantidad"), lineas))
+        # fromlist: one C loop per column (extend goes item by item)
+        self.dia.fromlist(dias)
+        self.mes.fromlist(list(map(meses.__getitem__, dias)))
+        self.art.fromlist(arts)
+        self.marca.fromlist(marcas)
+        self.cant.fromlist(cant)
+        self.imp.fromlist(list(map(mul, map(attrgetter("precio"), lineas), cant)))
+        return True
+
+    def _columnas_np(self):
+        n = len(self.dia)
+        if self._np is None or self._np[0] != n:
+            # copies: the array.array columns must stay resizable
+            cols = tuple(np.frombuffer(c, dtype=np.float64 if c.typecode == "d" else np.intc).copy()
+                         for c in (self.dia, self.mes, self.art, self.marca, self.cant, self.imp))
+            self._np = (n, cols)
+        return self._np[1]
+
+    # -------------------- Sumas por rango --------------------
+    def _sumas(self, desde, hasta):
+        """{"art": ([unid], [importe]) por código, "marca": idem, "mes": {mes: [unid, importe]}}."""
+        lo, hi = desde.toordinal(), hasta.toordinal()
+        clave = (lo, hi, len(self.dia))
+        if self._cache is not None and self._cache[0] == clave:
+            return self._cache[1]
+        sumas = self._sumas_np(lo, hi) if np is not None else self._sumas_py(lo, hi)
+        self._cache = (clave, sumas)
+        return sumas
+
+    def _sumas_np(self, lo, hi):
+        dia, mes, art, marca, cant, imp = self._columnas_np()
+        m = (dia >= lo) & (dia <= hi)
+        cant = cant[m]; imp = imp[m]
+        res = {}
+        for nombre, col, n in (("art", art, len(self.articulos)), ("marca", marca, len(self.marcas))):
+            c = col[m]
+            res[nombre] = (np.bincount(c, weights=cant, minlength=n).astype(np.int64).tolist(),
+                           np.bincount(c, weights=imp, minlength=n).tolist())
+        meses = {}
+        ms = mes[m]
+        if ms.size:
+            base = int(ms.min())
+            ms = ms - base
+            unid = np.bincount(ms, weights=cant).astype(np.int64)
+            ing = np.bincount(ms, weights=imp)
+            for k in np.flatnonzero(np.bincount(ms)).tolist():
+                meses[base + k] = [int(unid[k]), float(ing[k])]
+        res["mes"] = meses
+        return res
+
+    def _sumas_py(self, lo, hi):
+        u_art = [0] * len(self.articulos); i_art = [0.0] * len(self.articulos)
+        u_marca = [0] * len(self.marcas); i_marca = [0.0] * len(self.marcas)
+        meses = {}
+        for d, ms, a, mc, c, i in zip(self.dia, self.mes, self.art, self.marca, self.cant, self.imp):
+            if d < lo or d > hi:
+                continue
+            u_art[a] += c; i_art[a] += i
+            u_marca[mc] += c; i_marca[mc] += i
+            acc = meses.get(ms)
+            if acc is None:
+                meses[ms] = [c, i]
+            else:
+                acc[0] += c; acc[1] += i
+        return {"art": (u_art, i_art), "marca": (u_marca, i_marca), "mes": meses}
+
+    def _dias(self, desde, hasta):
+        # days actually covered: not before the first sale nor after today
+        d0 = desde.toordinal()
+        if self.dia_min is not None:
+            d0 = max(d0, self.dia_min)
+        d1 = min(hasta.toordinal(), date.today().toordinal())
+        return max(1, d1 - d0 + 1)
+
+    # -------------------- Consultas --------------------
+    def mas_vendidos(self, desde, hasta, n=20, por_importe=False):
+        """[(artículo, nombre, marca, unidades, importe)] de los n más vendidos."""
+        unid, imp = self._sumas(desde, hasta)["art"]
+        clave = imp.__getitem__ if por_importe else unid.__getitem__
+        top = nlargest(n, (a for a in range(len(unid)) if unid[a]), key=clave)
+        return [(self.articulos[a], self.lineas[a]["nombre"], self.lineas[a]["marca"], unid[a], round(imp[a], 2)) for a in top]
+
+    def por_marca(self, desde, hasta):
+        """[(marca, unidades, importe)] de mayor a menor importe."""
+        unid, imp = self._sumas(desde, hasta)["marca"]
+        filas = [(self.marcas[m], unid[m], round(imp[m], 2)) for m in range(len(unid)) if unid[m]]
+        filas.sort(key=lambda f: -f[2])
+        return filas
+
+    def por_mes(self, desde, hasta):
+        """[('mm/yyyy', unidades, importe)] en orden cronológico."""
+        meses = self._sumas(desde, hasta)["mes"]
+        return [(texto_mes(m), u, round(i, 2)) for m, (u, i) in sorted(meses.items())]
+
+    def por_producto(self, desde, hasta, productos):
+        """IndicadorProducto de cada producto del catálogo (sell-through, ventas por día, días de stock)."""
+        unid, imp = self._sumas(desde, hasta)["art"]
+        dias = self._dias(desde, hasta)
+        cod = self._cod_art
+        res = []
+        for p in productos:
+            a = cod.get(p["articulo"])
+            if a is None:
+                res.append(IndicadorProducto(p, 0, 0.0, dias))
+            else:
+                res.append(IndicadorProducto(p, unid[a], round(imp[a], 2), dias))
+        return res
+
+    def sugerencias_reposicion(self, desde, hasta, productos, plazo=PLAZO_REPOSICION, cobertura=COBERTURA):
+        """Productos que se quedan sin stock antes de plazo+cobertura días, con la cantidad a pedir (más urgentes primero)."""
+        horizonte = plazo + cobertura
+        res = []
+        for ind in self.por_producto(desde, hasta, productos):
+            if not ind.por_dia or ind.dias_stock >= horizonte:
+                continue
+            ind.pedir = math.ceil(ind.por_dia * horizonte - max(ind.producto["stock"], 0))
+            if ind.pedir > 0:
+                res.append(ind)
+        res.sort(key=lambda ind: ind.dias_stock)
+        return res
@@ -0,0 +1,214 @@
+"""
+archivo.py
+Archivo de ventas por mes: los meses cerrados salen del historial activo.
+
+- Al abrir, las ventas de meses anteriores al actual pasan de ventas.json a
+  una partición por mes (carpeta ventas_archivo/, AAAA-MM.<gen>.json, o
+  .json.gz con compresión). ventas.json queda con el mes en curso: la
+  carga y la memoria no crecen a medida que pasan los meses.
+- manifiesto.json: por mes, archivo, primera y última fecha, ventas,
+  líneas, unidades e importe. Un reporte o análisis que toca un mes
+  archivado lo trae al pedirlo (MotorEncanto.cargar_periodo).
+- Resumen por DNI de las compras archivadas (nombre, teléfono, compras,
+  total, última compra y meses): el autocompletado de clientes sigue
+  conociendo a todos sin leer las particiones.
+- Seguro ante cortes: las particiones nuevas llevan otro número de
+  generación y recién cuentan cuando el manifiesto (escrito con fsync) las
+  nombra. El manifiesto anota además el corte y la firma del ventas.json
+  del que salieron: si se corta antes de reescribirlo, al abrir se
+  descartan las que ya están archivadas (sin_archivadas).
+- Las particiones que ninguna entrada del manifiesto nombra (generaciones
+  reemplazadas, o escritas antes de un corte) se borran al abrir (limpiar).
+"""
+
+import gzip, json, os, re
+from datetime import datetime
+
+from compacto import Venta, a_json, a_segundos, desde_segundos, parse_fecha
+from diario import escribir_json_atomico
+
+MANIFIESTO = "manifiesto.json"
+VERSION = 1
+_PROPIOS = re.compile(r"^(\d{4}-\d{2}|clientes)\.\d+\.json(\.gz)?(\.tmp)?$")
+
+
+def inicio_mes(hoy=None):
+    """ts del primer instante del mes en curso: lo anterior son meses cerrados."""
+    hoy = hoy or datetime.now()
+    return a_segundos(datetime(hoy.year, hoy.month, 1))
+
+
+def firma(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _escribir_fsync(path, datos):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class ArchivoVentas:
+    def __init__(self, carpeta, comprimir=False):
+        self.carpeta = carpeta
+        self.comprimir = comprimir  # gzip for the months archived from now on
+        self._manifiesto = None
+        self._clientes = None
+
+    def _ruta(self, nombre):
+        return os.path.join(self.carpeta, nombre)
+
+    @property
+    def manifiesto(self):
+        """Lanza ValueError si está dañado o es de una versión más nueva (no se archiva encima)."""
+        if self._manifiesto is None:
+            path = self._ruta(MANIFIESTO)
+            m = {"version": VERSION, "generacion": 0, "particiones": {}, "clientes": None}
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    try:
+                        m = json.load(f)
+                    except ValueError as e:
+                        raise ValueError(f"{path} dañado: {e}")
+                if not isinstance(m, dict) or m.get("version", 0) > VERSION:
+                    raise ValueError(f"{path}: formato desconocido")
+            self._manifiesto = m
+        return self._manifiesto
+
+    def __len__(self):
+        return len(self.manifiesto["particiones"])
+
+    def meses(self, desde=None, hasta=None):
+        """Meses archivados ('AAAA-MM') que tienen ventas entre desde y hasta (date, inclusive)."""
+        res = []
+        for mes, p in sorted(self.manifiesto["particiones"].items()):
+            if desde is not None and parse_fecha(p["hasta"]).date() < desde:
+                continue
+            if hasta is not None and parse_fecha(p["desde"]).date() > hasta:
+                continue
+            res.append(mes)
+        return res
+
+    def leer(self, mes):
+        """Ventas (registros Venta) de un mes archivado."""
+        path = self._ruta(self.manifiesto["particiones"][mes]["archivo"])
+        abrir = gzip.open if path.endswith(".gz") else open
+        with abrir(path, "rt", encoding="utf-8") as f:
+            return [Venta.desde(v) for v in json.load(f)]
+
+    def clientes(self):
+        """{dni: {nombre, tel, visitas, gastado, ultima, meses}} de las compras archivadas."""
+        if self._clientes is None:
+            nombre = self.manifiesto.get("clientes")
+            datos = {}
+            if nombre:
+                with open(self._ruta(nombre), "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+            self._clientes = datos
+        return self._clientes
+
+    # -------------------- Archivar --------------------
+    def sin_archivadas(self, ventas, path_snapshot):
+        """Quita del snapshot las ventas que ya se archivaron si un corte dejó ventas.json sin reescribir."""
+        pendiente = self.manifiesto.get("pendiente")
+        if not pendiente or not os.path.exists(path_snapshot) or firma(path_snapshot) != pendiente["firma"]:
+            return ventas
+        corte = pendiente["corte"]
+        return [v for v in ventas if v.ts is None or v.ts >= corte]
+
+    def archivar(self, viejas, corte, path_snapshot):
+        """Escribe las ventas de meses cerrados (ts < corte) en sus particiones y el manifiesto.
+        Después hay que sacarlas de ventas.json y llamar a confirmar()."""
+        m = self.manifiesto
+        os.makedirs(self.carpeta, exist_ok=True)
+        gen = m["generacion"] + 1
+        por_mes = {}
+        cache_mes = {}
+        for v in viejas:
+            dia = v.ts // 86400
+            mes = cache_mes.get(dia)
+            if mes is None:
+                mes = cache_mes[dia] = desde_segundos(v.ts).strftime("%Y-%m")
+            por_mes.setdefault(mes, []).append(v)
+        particiones = dict(m["particiones"])
+        for mes, nuevas in sorted(por_mes.items()):
+            previa = particiones.get(mes)
+            # late sales for a month already archived: merged into a new generation of it
+            ventas = (self.leer(mes) if previa else []) + nuevas
+            ventas.sort(key=lambda v: v.ts)
+            nombre = f"{mes}.{gen}.json" + (".gz" if self.comprimir else "")
+            texto = "[\n" + ",\n".join(json.dumps(v, ensure_ascii=False, separators=(",", ":"), default=a_json)
+                                       for v in ventas) + "\n]\n"
+            datos = texto.encode("utf-8")
+            _escribir_fsync(self._ruta(nombre), gzip.compress(datos) if self.comprimir else datos)
+            particiones[mes] = {
+                "archivo": nombre,
+                "desde": ventas[0].fecha,
+                "hasta": ventas[-1].fecha,
+                "ventas": len(ventas),
+                "lineas": sum(len(v.productos) for v in ventas),
+                "unidades": sum(it.cantidad for v in ventas for it in v.productos),
+                "total": round(sum(v.total for v in ventas), 2),
+            }
+        clientes = self._sumar_clientes(viejas, cache_mes)
+        nombre_clientes = f"clientes.{gen}.json"
+        escribir_json_atomico(self._ruta(nombre_clientes), clientes)
+        nuevo = {"version": VERSION, "generacion": gen, "particiones": particiones, "clientes": nombre_clientes,
+                 "pendiente": {"corte": corte, "firma": firma(path_snapshot)}}
+        escribir_json_atomico(self._ruta(MANIFIESTO), nuevo)
+        self._manifiesto = nuevo
+        self._clientes = clientes
+
+    def _sumar_clientes(self, viejas, cache_mes):
+        clientes = {dni: dict(c, meses=list(c["meses"])) for dni, c in self.clientes().items()}
+        ultimas = {}  # dni -> ts of its last archived purchase
+        for v in viejas:
+            dni = str(v.dni or "").strip()
+            if not dni:
+                continue
+            c = clientes.get(dni)
+            if c is None:
+                c = clientes[dni] = {"nombre": "", "tel": "", "visitas": 0, "gastado": 0.0, "ultima": None, "meses": []}
+            c["visitas"] += 1
+            c["gastado"] = round(c["gastado"] + (v.total or 0.0), 2)
+            mes = cache_mes[v.ts // 86400]
+            if mes not in c["meses"]:
+                c["meses"].append(mes)
+            ts_ultima = ultimas.get(dni)
+            if ts_ultima is None and c["ultima"]:
+                dt = parse_fecha(c["ultima"])
+                ts_ultima = a_segundos(dt) if dt is not None else None
+            if ts_ultima is None or v.ts >= ts_ultima:
+                ultimas[dni] = v.ts
+                c["ultima"] = v.fecha
+                c["nombre"] = str(v.cliente or "").strip()
+                c["tel"] = str(v.tel or "").strip() or c["tel"]
+        for c in clientes.values():
+            c["meses"].sort()
+        return clientes
+
+    def confirmar(self):
+        """ventas.json ya no tiene las archivadas: borra la marca de pendiente y las particiones reemplazadas."""
+        m = dict(self.manifiesto)
+        if m.pop("pendiente", None) is not None:
+            escribir_json_atomico(self._ruta(MANIFIESTO), m)
+            self._manifiesto = m
+        self.limpiar()
+
+    def limpiar(self):
+        """Borra particiones y resúmenes que el manifiesto no nombra (nunca con una marca de pendiente)."""
+        m = self.manifiesto
+        if m.get("pendiente") or not os.path.isdir(self.carpeta):
+            return
+        vigentes = {p["archivo"] for p in m["particiones"].values()}
+        vigentes.add(m.get("clientes"))
+        for nombre in os.listdir(self.carpeta):
+            if _PROPIOS.match(nombre) and nombre not in vigentes:
+                try:
+                    os.remove(self._ruta(nombre))
+                except OSError:
+                    pass
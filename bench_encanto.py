@@ -0,0 +1,415 @@
+"""
+bench_encanto.py
+Benchmarks de ENCANTO con datos sintéticos (mismo formato que productos.json / ventas.json).
+
+Uso:
+    python bench_encanto.py                       # todos, escala rápida
+    python bench_encanto.py carga busqueda        # solo algunos
+    python bench_encanto.py --escala completa     # 1k-500k productos, millones de líneas
+    python bench_encanto.py --salida resultados.jsonl
+
+Benchmarks: arranque (import de la interfaz, import diferido de los
+exportadores y carga inicial en segundo plano), carga (cargar desde el
+JSON y desde la copia binaria, guardar productos y ventas), busqueda
+(artículo y filtro del autocompletado), venta (registrar venta con
+guardado), reporte (filtro por rango de fechas), analisis, archivo
+(primera apertura que archiva los meses cerrados, apertura con solo el mes
+en curso y reporte anual que trae los meses archivados, sin comprimir y
+con gzip), exportar (Excel y CSV) y pdf.
+
+Cada resultado es una línea JSON (bench, tamaño, segundos, ...), para poder
+comparar corridas y detectar regresiones. Los archivos se generan en un
+directorio temporal; los datos reales no se tocan (el log de operaciones
+lentas también va al directorio temporal del sistema).
+"""
+
+import argparse, json, os, random, subprocess, sys, tempfile, time
+from datetime import date, datetime, timedelta
+
+import analitica
+import exportar
+import metricas
+import reportes
+from almacenamiento import AlmacenJSON
+from archivo import ArchivoVentas
+from carrito import Carrito
+from nucleo import CargaEnSegundoPlano, MotorEncanto
+
+ESCALAS = {
+    "rapida": {"productos": (1000, 10000), "lineas": (10000, 100000), "exportar": (1000, 10000), "pdf": (1000, 5000)},
+    "completa": {"productos": (1000, 10000, 100000, 500000), "lineas": (100000, 1000000, 2000000),
+                 "exportar": (10000, 100000), "pdf": (1000, 5000, 20000)},
+}
+LINEAS_POR_VENTA = 2.17  # promedio de generar_ventas
+CONSULTAS = ["c", "co", "cor", "corp", "corpi", "encaje", "push up", "1234"]  # tipeo en el buscador
+
+MARCAS = ["KAURY", "FRASHE", "LODY", "MK", "ZAPANET", "SWEET", "LUPO", "DUFOUR", "PEOPLE", "SIGRY"]
+PRENDAS = ["CORPIÑO", "CULOTTE", "BOMBACHA", "CONJUNTO", "SOSTÉN", "BOXER", "CALZONCILLO", "MEDIAS", "PIJAMA", "BODY"]
+DETALLES = ["ENCAJE", "ALGODÓN", "TRIANGULITO", "PUSH UP", "SIN COSTURA", "LYCRA", "TIRO ALTO", "VEDETINA", "DEPORTIVO", "MICROFIBRA"]
+
+
+# -------------------- Datos sintéticos --------------------
+def generar_catalogo(n, seed=1):
+    rnd = random.Random(seed)
+    return [{
+        "articulo": str(1000 + i),
+        "nombre": f"{rnd.choice(PRENDAS)} {rnd.choice(DETALLES)}",
+        "marca": rnd.choice(MARCAS),
+        "precio": float(rnd.randrange(1500, 40000, 50)),
+        "stock": rnd.randint(0, 60),
+    } for i in range(n)]
+
+
+def iter_ventas(productos, n_ventas, seed=2, desde=datetime(2025, 1, 1), dias=365):
+    """Genera las ventas de a una (para escribir historiales grandes sin tenerlos en memoria)."""
+    rnd = random.Random(seed)
+    paso = dias * 86400 / max(1, n_ventas)
+    for i in range(n_ventas):
+        fecha = desde + timedelta(seconds=int(i * paso))
+        items = []
+        for p in rnd.sample(productos, min(len(productos), rnd.choice((1, 1, 2, 2, 3, 4)))):
+            items.append({"articulo": p["articulo"], "nombre": p["nombre"], "marca": p["marca"],
+                          "cantidad": rnd.randint(1, 3), "precio": p["precio"]})
+        dni = str(rnd.randint(20000000, 45000000))
+        yield {
+            "fecha": fecha.strftime("%d/%m/%Y %H:%M"),
+            "cliente": f"cliente {dni[-4:]}",
+            "dni": dni,
+            "tel": "",
+            "productos": items,
+            "total": round(sum(it["cantidad"]*it["precio"] for it in items), 2),
+        }
+
+
+def generar_ventas(productos, n_ventas, seed=2, desde=datetime(2025, 1, 1), dias=365):
+    return list(iter_ventas(productos, n_ventas, seed, desde, dias))
+
+
+def ventas_para_lineas(lineas):
+    return max(1, int(lineas / LINEAS_POR_VENTA))
+
+
+def ventas_con_lineas(productos, lineas, seed=2):
+    """Ventas sintéticas con aproximadamente esa cantidad de líneas."""
+    return generar_ventas(productos, ventas_para_lineas(lineas), seed)
+
+
+def escribir_datos(directorio, productos, lineas=0, seed=2, desde=datetime(2025, 1, 1)):
+    """productos.json y ventas.json (escrito en streaming, un año desde `desde`) en directorio. Devuelve el almacén JSON."""
+    almacen = AlmacenJSON(os.path.join(directorio, "productos.json"), os.path.join(directorio, "ventas.json"),
+                          os.path.join(directorio, "ventas.jsonl"))
+    almacen.escribir_productos(almacen.instantanea_productos(productos))
+    with open(almacen.diario.path_snapshot, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, v in enumerate(iter_ventas(productos, ventas_para_lineas(lineas) if lineas else 0, seed, desde)):
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(v, ensure_ascii=False))
+        f.write("\n]")
+    return almacen
+
+
+def motor_con_datos(directorio, productos, lineas=0):
+    """MotorEncanto con guardado sincrónico sobre datos sintéticos ya cargados."""
+    motor = MotorEncanto(almacen=escribir_datos(directorio, productos, lineas), caja="bench")
+    motor.cargar()
+    return motor
+
+
+# -------------------- Medición --------------------
+def medir(fn, repeticiones=1):
+    """Mejor tiempo (segundos) de varias ejecuciones."""
+    mejor = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        t = time.perf_counter() - t0
+        mejor = t if mejor is None or t < mejor else mejor
+    return mejor
+
+
+def _archivo_temporal(sufijo):
+    fd, path = tempfile.mkstemp(suffix=sufijo)
+    os.close(fd)
+    return path
+
+
+# -------------------- Benchmarks --------------------
+def _mb(path):
+    return round(os.path.getsize(path) / 1e6, 2)
+
+
+def _importar(modulos, repeticiones=3):
+    """Mejor tiempo de importar esos módulos en un intérprete nuevo (sin caché de sys.modules)."""
+    codigo = f"import time; t0 = time.perf_counter(); import {', '.join(modulos)}; print(time.perf_counter() - t0)"
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    mejor = None
+    for _ in range(repeticiones):
+        r = subprocess.run([sys.executable, "-c", codigo], cwd=carpeta, capture_output=True, text=True)
+        if r.returncode != 0:
+            return None
+        t = float(r.stdout.strip().splitlines()[-1])
+        mejor = t if mejor is None or t < mejor else mejor
+    return mejor
+
+
+def bench_arranque(escala):
+    """Import de la interfaz (hasta poder mostrar la ventana), import diferido de los exportadores
+    y carga en segundo plano hasta que las tablas tienen datos."""
+    res = []
+    for nombre, modulos in (("importar_interfaz", ["ENCANTO"]), ("importar_exportadores", ["openpyxl", "reportlab.platypus"])):
+        seg = _importar(modulos)
+        if seg is None:
+            res.append({"bench": nombre, "omitido": "no se pudo importar " + ", ".join(modulos)})
+        else:
+            res.append({"bench": nombre, "ms": round(seg * 1000, 1)})
+    for n, lineas in zip(escala["productos"], escala["lineas"]):
+        with tempfile.TemporaryDirectory() as d:
+            almacen = escribir_datos(d, generar_catalogo(n), lineas)
+
+            def cargar():
+                carga = CargaEnSegundoPlano(MotorEncanto(almacen=almacen, caja="bench"))
+                carga.start()
+                carga.join()
+            seg = medir(cargar)
+            res.append({"bench": "carga_inicial", "productos": n, "lineas": lineas, "segundos": round(seg, 4)})
+    return res
+
+
+def bench_carga(escala):
+    """cargar / guardar productos y ventas (JSON) según el tamaño del catálogo y del historial."""
+    res = []
+    for n in escala["productos"]:
+        with tempfile.TemporaryDirectory() as d:
+            almacen = escribir_datos(d, generar_catalogo(n))
+            motor = MotorEncanto(almacen=almacen, caja="bench")
+            # JSON (rebuilding the binary copy), then from the binary copy
+            os.remove(almacen.bin_productos)
+            seg = medir(motor.cargar_productos)
+            res.append({"bench": "cargar_productos", "formato": "json", "productos": n, "segundos": round(seg, 4), "mb": _mb(almacen.data_file)})
+            seg = medir(motor.cargar_productos)
+            res.append({"bench": "cargar_productos", "formato": "binario", "productos": n, "segundos": round(seg, 4), "mb": _mb(almacen.bin_productos)})
+            seg = medir(motor.guardar_productos)
+            res.append({"bench": "guardar_productos", "productos": n, "segundos": round(seg, 4)})
+    for lineas in escala["lineas"]:
+        with tempfile.TemporaryDirectory() as d:
+            almacen = escribir_datos(d, generar_catalogo(2000), lineas)
+            mb = _mb(almacen.diario.path_snapshot)
+            motor = MotorEncanto(almacen=almacen, caja="bench")
+            seg = medir(motor.cargar_ventas)
+            filas = exportar.contar_lineas(motor.ventas)
+            res.append({"bench": "cargar_ventas", "formato": "json", "lineas": filas, "ventas": len(motor.ventas), "segundos": round(seg, 4), "mb": mb})
+            motor = MotorEncanto(almacen=almacen, caja="bench")
+            seg = medir(motor.cargar_ventas)
+            res.append({"bench": "cargar_ventas", "formato": "binario", "lineas": filas, "ventas": len(motor.ventas), "segundos": round(seg, 4),
+                        "mb": _mb(almacen.bin_ventas)})
+            seg = medir(lambda: almacen.guardar_ventas(motor.ventas))
+            res.append({"bench": "guardar_ventas", "lineas": filas, "segundos": round(seg, 4)})
+            motor = None  # free the history before generating the next one
+    return res
+
+
+def bench_busqueda(escala):
+    """Búsqueda por artículo (repositorio) y filtro del autocompletado mientras se tipea."""
+    res = []
+    for n in escala["productos"]:
+        with tempfile.TemporaryDirectory() as d:
+            motor = motor_con_datos(d, generar_catalogo(n))
+            rnd = random.Random(3)
+            articulos = [str(1000 + rnd.randrange(n)) for _ in range(10000)]
+            seg = medir(lambda: [motor.producto(a) for a in articulos], 3)
+            res.append({"bench": "buscar_articulo", "productos": n, "segundos": round(seg, 4),
+                        "us_por_busqueda": round(seg / len(articulos) * 1e6, 3)})
+            motor.catalogo_cambiado()
+            seg = medir(lambda: motor.buscar(""))
+            res.append({"bench": "indice_busqueda", "productos": n, "segundos": round(seg, 4)})
+            # one keystroke at a time: each query may reuse the previous one's results
+            for q in CONSULTAS:
+                total = []
+                seg = medir(lambda: total.append(motor.buscar(q)[1]))
+                res.append({"bench": "filtro_busqueda", "productos": n, "consulta": q,
+                            "resultados": total[-1], "ms": round(seg * 1000, 3)})
+    return res
+
+
+def bench_venta(escala, n_ventas=50):
+    """registrar_venta con guardado sincrónico (diario + productos.json) según el tamaño del catálogo."""
+    res = []
+    lineas = escala["lineas"][0]
+    for n in escala["productos"]:
+        with tempfile.TemporaryDirectory() as d:
+            motor = motor_con_datos(d, generar_catalogo(n), lineas)
+            rnd = random.Random(4)
+            con_stock = [p for p in motor.productos if p["stock"] >= 10]
+            ventas = n_ventas if n <= 10000 else max(5, n_ventas // 10)
+
+            def vender():
+                for _ in range(ventas):
+                    carrito = Carrito()
+                    for p in rnd.sample(con_stock, 2):
+                        carrito.agregar(p, 1)
+                    motor.registrar_venta(carrito, "cliente bench", "30111222")
+            seg = medir(vender)
+            res.append({"bench": "registrar_venta", "productos": n, "lineas_historial": lineas,
+                        "ventas": ventas, "ms_por_venta": round(seg / ventas * 1000, 3)})
+    return res
+
+
+def _historiales(escala):
+    """(lineas, motor) con cada tamaño de historial, uno a la vez (se libera al pedir el siguiente)."""
+    for lineas in escala["lineas"]:
+        with tempfile.TemporaryDirectory() as d:
+            motor = motor_con_datos(d, generar_catalogo(2000), lineas)
+            yield exportar.contar_lineas(motor.ventas), motor
+            motor = None
+
+
+RANGOS = {"mes": (date(2025, 6, 1), date(2025, 6, 30)), "anio": (date(2025, 1, 1), date(2025, 12, 31))}
+
+
+def bench_reporte(escala):
+    """Filtro del reporte por rango de fechas (índice + totales) y armado de sus líneas."""
+    res = []
+    for lineas, motor in _historiales(escala):
+        for nombre, (d0, d1) in RANGOS.items():
+            ventas = []
+            seg = medir(lambda: ventas.append(motor.reporte(d0, d1)[0]), 3)
+            res.append({"bench": "reporte_filtro", "lineas": lineas, "rango": nombre,
+                        "ventas": len(ventas[-1]), "ms": round(seg * 1000, 3)})
+            seg = medir(lambda: reportes.lineas_reporte(ventas[-1]))
+            res.append({"bench": "reporte_lineas", "lineas": lineas, "rango": nombre, "segundos": round(seg, 4)})
+    return res
+
+
+def bench_analisis(escala):
+    """Columnas de análisis (una vez) y consultas sobre todo el año."""
+    res = []
+    d0, d1 = RANGOS["anio"]
+    for lineas, motor in _historiales(escala):
+        seg = medir(motor.analisis)
+        an = motor.analisis()
+        res.append({"bench": "analisis_columnas", "lineas": lineas, "segundos": round(seg, 4)})
+        seg = medir(lambda: an.mas_vendidos(d0, d1))
+        res.append({"bench": "analisis_consulta", "lineas": lineas, "segundos": round(seg, 4),
+                    "numpy": analitica.np is not None})
+        seg = medir(lambda: an.sugerencias_reposicion(d0, d1, motor.productos))
+        res.append({"bench": "analisis_reposicion", "lineas": lineas, "segundos": round(seg, 4)})
+    return res
+
+
+def _mb_carpeta(path):
+    return round(sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6, 2)
+
+
+def bench_archivo(escala):
+    """Historial de un año hasta hoy: la primera apertura archiva los meses cerrados, las siguientes
+    cargan solo el mes en curso y un reporte del año trae los meses archivados la primera vez."""
+    res = []
+    hoy = datetime.now()
+    d0, d1 = (hoy - timedelta(days=365)).date(), hoy.date()
+    for lineas in escala["lineas"]:
+        for comprimir in (False, True):
+            with tempfile.TemporaryDirectory() as d:
+                almacen = escribir_datos(d, generar_catalogo(2000), lineas, desde=hoy - timedelta(days=365))
+                carpeta = os.path.join(d, "ventas_archivo")
+                almacen.archivo = ArchivoVentas(carpeta, comprimir)
+                formato = "gzip" if comprimir else "json"
+                motor = MotorEncanto(almacen=almacen, caja="bench")
+                seg = medir(motor.cargar_ventas)
+                res.append({"bench": "archivar_meses", "formato": formato, "lineas": lineas, "meses": len(almacen.archivo),
+                            "segundos": round(seg, 4), "mb": _mb_carpeta(carpeta)})
+                almacen.archivo = ArchivoVentas(carpeta, comprimir)
+                motor = MotorEncanto(almacen=almacen, caja="bench")
+                seg = medir(motor.cargar_ventas)
+                res.append({"bench": "cargar_mes_en_curso", "formato": formato, "lineas": lineas, "ventas": len(motor.ventas),
+                            "segundos": round(seg, 4), "mb": _mb(almacen.diario.path_snapshot)})
+                ventas = []
+                seg = medir(lambda: ventas.append(motor.reporte(d0, d1)[0]))
+                res.append({"bench": "reporte_anio_archivado", "formato": formato, "lineas": lineas, "ventas": len(ventas[-1]),
+                            "segundos": round(seg, 4)})
+                seg = medir(lambda: motor.reporte(d0, d1), 3)
+                res.append({"bench": "reporte_anio_en_memoria", "formato": formato, "lineas": lineas, "ms": round(seg * 1000, 3)})
+                motor = None
+    return res
+
+
+def bench_exportar(escala):
+    """exportar_csv y exportar_excel del reporte."""
+    productos = generar_catalogo(2000)
+    exportadores = [("exportar_csv", exportar.exportar_csv, ".csv")]
+    if exportar.HAY_EXCEL:
+        exportadores.append(("exportar_excel", exportar.exportar_excel, ".xlsx"))
+    res = [] if exportar.HAY_EXCEL else [{"bench": "exportar_excel", "omitido": "openpyxl no instalado"}]
+    for n in escala["exportar"]:
+        ventas = ventas_con_lineas(productos, n)
+        filas = exportar.contar_lineas(ventas)
+        for nombre, fn, ext in exportadores:
+            path = _archivo_temporal(ext)
+            try:
+                seg = medir(lambda: fn(path, ventas))
+            finally:
+                os.remove(path)
+            res.append({"bench": nombre, "filas": filas, "segundos": round(seg, 4),
+                        "us_por_fila": round(seg / filas * 1e6, 2)})
+    return res
+
+
+def bench_pdf(escala=ESCALAS["rapida"]):
+    """exportar_pdf: el tiempo por fila debe mantenerse ~constante (crecimiento lineal)."""
+    if not exportar.HAY_PDF:
+        return [{"bench": "exportar_pdf", "omitido": "reportlab no instalado"}]
+    productos = generar_catalogo(2000)
+    res = []
+    for n in escala["pdf"]:
+        ventas = ventas_con_lineas(productos, n)
+        filas = exportar.contar_lineas(ventas)
+        path = _archivo_temporal(".pdf")
+        try:
+            seg = medir(lambda: exportar.exportar_pdf(path, ventas))
+        finally:
+            os.remove(path)
+        res.append({"bench": "exportar_pdf", "filas": filas, "segundos": round(seg, 4),
+                    "us_por_fila": round(seg / filas * 1e6, 2)})
+    return res
+
+
+BENCHMARKS = {
+    "arranque": bench_arranque,
+    "carga": bench_carga,
+    "busqueda": bench_busqueda,
+    "venta": bench_venta,
+    "reporte": bench_reporte,
+    "analisis": bench_analisis,
+    "archivo": bench_archivo,
+    "exportar": bench_exportar,
+    "pdf": bench_pdf,
+}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks de ENCANTO")
+    ap.add_argument("benchmarks", nargs="*", help=f"subconjunto de: {', '.join(BENCHMARKS)}")
+    ap.add_argument("--escala", choices=list(ESCALAS), default="rapida", help="tamaños de catálogo e historial")
+    ap.add_argument("--salida", help="agrega los resultados (JSON Lines) a este archivo")
+    args = ap.parse_args(argv)
+    # not the shop's encanto_lento.log in the current folder
+    metricas.LOG_LENTAS = os.path.join(tempfile.gettempdir(), "encanto_bench_lento.log")
+    nombres = args.benchmarks or list(BENCHMARKS)
+    desconocidos = [n for n in nombres if n not in BENCHMARKS]
+    if desconocidos:
+        ap.error(f"benchmark desconocido: {', '.join(desconocidos)}")
+    corrida = {"fecha": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0], "escala": args.escala}
+    salida = open(args.salida, "a", encoding="utf-8") if args.salida else None
+    try:
+        for nombre in nombres:
+            for r in BENCHMARKS[nombre](ESCALAS[args.escala]):
+                linea = json.dumps(dict(corrida, **r), ensure_ascii=False)
+                print(linea, flush=True)
+                if salida:
+                    salida.write(linea + "\n")
+    finally:
+        if salida:
+            salida.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+binario.py
+Copia binaria de productos.json y ventas.json para cargar rápido.
+
+- Formato columnar: encabezado fijo (struct), tabla de strings sin repetir
+  (un solo bloque UTF-8 + offsets) y un array.array por campo. Se lee con
+  mmap y se pasa directo a registros de compacto.py: sin parsear texto,
+  sin convertir fechas y sin normalizar tipos campo por campo.
+- Versionado, con CRC32 de todo el contenido y con el tamaño y mtime del
+  JSON del que salió. Si falta, es de otra versión u otra plataforma, está
+  corrupto o el JSON cambió después, leer_* devuelve None y el almacén lo
+  vuelve a armar desde el JSON, que sigue siendo el formato legible de
+  intercambio.
+- Se escribe (temporal + os.replace) después de cada JSON. Es una caché:
+  si algo no se puede representar, no se escribe y se usa el JSON.
+"""
+
+import json, mmap, os, struct, sys, zlib
+from array import array
+
+from compacto import LineaVenta, Producto, Registro, Venta, a_json
+
+MAGIC = b"ENCB"
+VERSION = 1
+PRODUCTOS, VENTAS = 1, 2
+ORDEN = 1 if sys.byteorder == "little" else 2  # las columnas van en el orden de bytes nativo
+# magic, versión, tipo, orden de bytes, tamaño y mtime_ns del JSON,
+# registros, líneas de venta, strings, bytes de texto, crc32
+ENCABEZADO = struct.Struct("<4sHBBqqQQQQI")
+NULO = 0xFFFFFFFF  # índice de string ausente (extra, fecha que no es ts)
+TS_NULO = -(1 << 63)
+
+
+def ruta_binario(path_json):
+    return os.path.splitext(path_json)[0] + ".bin"
+
+
+def _firma(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class _Strings:
+    def __init__(self):
+        self.indices = {}
+        self.lista = []
+
+    def indice(self, s):
+        i = self.indices.get(s)
+        if i is None:
+            if type(s) is not str:
+                raise TypeError(f"se esperaba texto: {s!r}")
+            i = self.indices[s] = len(self.lista)
+            self.lista.append(s)
+        return i
+
+    def extra(self, reg, claves):
+        # uncommon keys (e.g. "minimo") as a JSON text, like in the JSON files
+        if isinstance(reg, Registro):
+            extra = reg._extra
+        else:
+            extra = {k: v for k, v in reg.items() if k not in claves}
+        if not extra:
+            return NULO
+        return self.indice(json.dumps(extra, ensure_ascii=False, sort_keys=True, default=a_json))
+
+
+# -------------------- Escritura --------------------
+def _escribir(path, tipo, fuente, n, n_lineas, strings, columnas):
+    offsets = array("I", [0])
+    acumulado = 0
+    for s in strings.lista:
+        acumulado += len(s)
+        offsets.append(acumulado)
+    texto = "".join(strings.lista).encode("utf-8")
+    partes = [offsets.tobytes(), texto] + [c.tobytes() for c in columnas]
+    crc = 0
+    for b in partes:
+        crc = zlib.crc32(b, crc)
+    tam, mtime = _firma(fuente)
+    encabezado = ENCABEZADO.pack(MAGIC, VERSION, tipo, ORDEN, tam, mtime, n, n_lineas, len(strings.lista), len(texto), crc)
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(encabezado)
+            for b in partes:
+                f.write(b)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def escribir_productos(path, productos, fuente):
+    """Copia binaria de productos (Producto o dicts ya normalizados) al día con el JSON fuente. False si no se pudo."""
+    try:
+        st = _Strings()
+        idx = st.indice
+        claves = Producto._CLAVES
+        art = array("I"); nom = array("I"); mar = array("I"); ext = array("I")
+        precio = array("d"); stock = array("q")
+        for p in productos:
+            art.append(idx(p["articulo"])); nom.append(idx(p["nombre"])); mar.append(idx(p["marca"]))
+            ext.append(st.extra(p, claves))
+            precio.append(p["precio"]); stock.append(p["stock"])
+        _escribir(path, PRODUCTOS, fuente, len(art), 0, st, (art, nom, mar, ext, precio, stock))
+        return True
+    except (OSError, ValueError, TypeError, OverflowError):
+        return False
+
+
+def escribir_ventas(path, ventas, fuente):
+    """Copia binaria de las ventas (registros Venta) al día con el JSON fuente. False si no se pudo."""
+    try:
+        st = _Strings()
+        idx = st.indice
+        ts = array("q"); ftxt = array("I"); cli = array("I"); dni = array("I"); tel = array("I")
+        ext = array("I"); nl = array("I"); total = array("d")
+        l_art = array("I"); l_nom = array("I"); l_mar = array("I"); l_ext = array("I")
+        l_cant = array("q"); l_precio = array("d")
+        for v in ventas:
+            if type(v) is not Venta:
+                raise TypeError("solo registros Venta")
+            ts.append(TS_NULO if v.ts is None else v.ts)
+            ftxt.append(NULO if v._fecha_txt is None else idx(v._fecha_txt))
+            cli.append(idx(v.cliente)); dni.append(idx(v.dni)); tel.append(idx(v.tel))
+            ext.append(st.extra(v, Venta._CLAVES))
+            nl.append(len(v.productos))
+            total.append(v.total)
+            for it in v.productos:
+                l_art.append(idx(it.articulo)); l_nom.append(idx(it.nombre)); l_mar.append(idx(it.marca))
+                l_ext.append(st.extra(it, LineaVenta._CLAVES))
+                l_cant.append(it.cantidad); l_precio.append(it.precio)
+        _escribir(path, VENTAS, fuente, len(ts), len(l_art), st,
+                  (ts, ftxt, cli, dni, tel, ext, nl, total, l_art, l_nom, l_mar, l_ext, l_cant, l_precio))
+        return True
+    except (OSError, ValueError, TypeError, OverflowError):
+        return False
+
+
+# -------------------- Lectura --------------------
+class _Lector:
+    """Columnas del binario, en orden, con el CRC acumulado."""
+
+    def __init__(self, mm, encabezado):
+        self.mm = mm
+        self.pos = ENCABEZADO.size
+        self.crc = 0
+        (_magic, _version, _tipo, _orden, _tam, _mtime, self.n, self.n_lineas,
+         self.n_strings, self.bytes_texto, self.crc_esperado) = encabezado
+
+    def bytes(self, n):
+        b = self.mm[self.pos:self.pos + n]
+        if len(b) != n:
+            raise ValueError("binario truncado")
+        self.pos += n
+        self.crc = zlib.crc32(b, self.crc)
+        return b
+
+    def columna(self, tipo, n):
+        a = array(tipo)
+        a.frombytes(self.bytes(n * a.itemsize))
+        return a.tolist()
+
+    def strings(self):
+        offsets = self.columna("I", self.n_strings + 1)
+        texto = self.bytes(self.bytes_texto).decode("utf-8")
+        intern = sys.intern
+        return [intern(texto[offsets[i]:offsets[i + 1]]) for i in range(self.n_strings)]
+
+    def verificar(self):
+        if self.pos != len(self.mm) or self.crc != self.crc_esperado:
+            raise ValueError("binario corrupto")
+
+
+def _leer(path, tipo, fuente, armar):
+    try:
+        firma = _firma(fuente)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) < ENCABEZADO.size:
+                return None
+            encabezado = ENCABEZADO.unpack_from(mm, 0)
+            if encabezado[:4] != (MAGIC, VERSION, tipo, ORDEN) or encabezado[4:6] != firma:
+                return None  # other format, other platform or stale
+            return armar(_Lector(mm, encabezado))
+    except (OSError, ValueError, IndexError, UnicodeDecodeError):
+        return None  # missing, empty or corrupt: the caller goes back to the JSON
+
+
+def _extra(tabla, i):
+    return json.loads(tabla[i])
+
+
+def leer_productos(path, fuente):
+    """Productos del binario, o None si falta, está corrupto o no corresponde al JSON fuente actual."""
+    def armar(lec):
+        tabla = lec.strings()
+        n = lec.n
+        art, nom, mar, ext = (lec.columna("I", n) for _ in range(4))
+        precio = lec.columna("d", n)
+        stock = lec.columna("q", n)
+        lec.verificar()
+        return [Producto.crudo(tabla[a], tabla[no], tabla[m], pr, s, _extra(tabla, e) if e != NULO else None)
+                for a, no, m, e, pr, s in zip(art, nom, mar, ext, precio, stock)]
+    return _leer(path, PRODUCTOS, fuente, armar)
+
+
+def leer_ventas(path, fuente):
+    """Ventas (registros Venta) del binario, o None si falta, está corrupto o no corresponde al JSON fuente actual."""
+    def armar(lec):
+        tabla = lec.strings()
+        n, nl_total = lec.n, lec.n_lineas
+        ts = lec.columna("q", n)
+        ftxt, cli, dni, tel, ext, nl = (lec.columna("I", n) for _ in range(6))
+        total = lec.columna("d", n)
+        l_art, l_nom, l_mar, l_ext = (lec.columna("I", nl_total) for _ in range(4))
+        l_cant = lec.columna("q", nl_total)
+        l_precio = lec.columna("d", nl_total)
+        lec.verificar()
+        lineas = [LineaVenta.crudo(tabla[a], tabla[no], tabla[m], c, pr, _extra(tabla, e) if e != NULO else None)
+                  for a, no, m, e, c, pr in zip(l_art, l_nom, l_mar, l_ext, l_cant, l_precio)]
+        if sum(nl) != nl_total:
+            raise ValueError("binario corrupto")
+        ventas = []
+        j = 0
+        for t, ft, c, d, te, e, k, tot in zip(ts, ftxt, cli, dni, tel, ext, nl, total):
+            ventas.append(Venta.crudo(None if t == TS_NULO else t, None if ft == NULO else tabla[ft],
+                                      tabla[c], tabla[d], tabla[te], tuple(lineas[j:j + k]), tot,
+                                      _extra(tabla, e) if e != NULO else None))
+            j += k
+        return ventas
+    return _leer(path, VENTAS, fuente, armar)
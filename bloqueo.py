@@ -0,0 +1,59 @@
+"""
+bloqueo.py
+Bloqueo exclusivo de archivo entre procesos (Windows y POSIX).
+
+Con el almacén JSON cada instancia reescribe productos.json completo, así
+que dos cajas sobre los mismos archivos se pisarían el stock: la segunda
+instancia no puede tomar el bloqueo y se le informa. Para varias cajas se
+usa el almacén SQLite (ver almacenamiento.py).
+"""
+
+import os
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+class ArchivoBloqueado(RuntimeError):
+    pass
+
+
+class BloqueoArchivo:
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def adquirir(self):
+        """Toma el bloqueo sin esperar. Lanza ArchivoBloqueado si otro proceso lo tiene."""
+        if self._f is not None:
+            return
+        f = open(self.path, "a+")
+        try:
+            if msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            raise ArchivoBloqueado(f"{self.path} está en uso por otra instancia.")
+        # pid for whoever finds the lock file
+        f.seek(0); f.truncate(); f.write(str(os.getpid())); f.flush()
+        self._f = f
+
+    def liberar(self):
+        if self._f is None:
+            return
+        try:
+            if msvcrt is not None:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+        self._f.close()
+        self._f = None
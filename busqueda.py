@@ -0,0 +1,152 @@
+"""
+busqueda.py
+Índice de búsqueda incremental para el autocompletado de productos.
+
+- Campos normalizados una sola vez: minúsculas y sin acentos
+  ("sosten" encuentra "sostén").
+- Índice de trigramas: una consulta de 3+ letras intersecta listas de
+  candidatos en lugar de recorrer todo el catálogo.
+- Búsqueda incremental: si la consulta nueva extiende la anterior, se
+  filtra sobre los resultados previos en vez de empezar de cero.
+- Resultados limitados (LIMITE) para no llenar el combobox con miles de filas.
+- Ediciones: solo se reindexan los productos tocados, y nada si no cambió
+  artículo, nombre ni marca (precio o stock). Las bajas reconstruyen todo.
+"""
+
+import unicodedata
+from bisect import insort
+
+LIMITE = 200
+N = 3  # tamaño de n-grama
+_SEP = "\x00"  # separa artículo y nombre: ninguna consulta cruza el límite
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos/diacríticos."""
+    texto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def etiqueta_producto(p):
+    return f"{p['articulo']} - {p['nombre']} ({p['marca']})"
+
+
+def _clave(p):
+    return normalizar(p.get("articulo", "")) + _SEP + normalizar(p.get("nombre", ""))
+
+
+def _gramas_de(clave):
+    return {g for g in (clave[j:j+N] for j in range(len(clave) - N + 1)) if _SEP not in g}
+
+
+class IndiceBusqueda:
+    def __init__(self, productos=None, limite=LIMITE):
+        self.limite = limite
+        self._claves = []
+        self._etiquetas = []
+        self._gramas = {}
+        self._pos = {}  # id(producto) -> posición en la lista
+        self._ultima = None  # (consulta, ids que coinciden)
+        self.sucio = True
+        self._productos = productos if productos is not None else []
+
+    def invalidar(self, productos=None):
+        """Marca el índice para reconstruir en la próxima búsqueda."""
+        if productos is not None:
+            self._productos = productos
+        self.sucio = True
+        self._ultima = None
+
+    def _construir(self):
+        self._claves = []
+        self._etiquetas = []
+        self._gramas = {}
+        self._pos = {}
+        for p in self._productos:
+            self._agregar(p)
+        self.sucio = False
+        self._ultima = None
+
+    def _agregar(self, p):
+        i = len(self._claves)
+        clave = _clave(p)
+        self._claves.append(clave)
+        self._etiquetas.append(etiqueta_producto(p))
+        self._pos[id(p)] = i
+        for g in _gramas_de(clave):
+            self._gramas.setdefault(g, []).append(i)
+
+    def actualizar(self, productos):
+        """Reindexa productos editados o agregados al final de la lista, sin reconstruir todo."""
+        if self.sucio:
+            return
+        if len(self._productos) < len(self._claves):
+            return self.invalidar()  # bajas: las posiciones se corren
+        cambio = len(self._productos) > len(self._claves)
+        for p in self._productos[len(self._claves):]:
+            self._agregar(p)
+        for p in productos:
+            i = self._pos.get(id(p))
+            if i is None or self._productos[i] is not p:
+                return self.invalidar()
+            clave = _clave(p)
+            if clave != self._claves[i]:
+                viejos, nuevos = _gramas_de(self._claves[i]), _gramas_de(clave)
+                for g in viejos - nuevos:
+                    lst = self._gramas[g]
+                    lst.remove(i)
+                    if not lst:
+                        del self._gramas[g]
+                for g in nuevos - viejos:
+                    insort(self._gramas.setdefault(g, []), i)
+                self._claves[i] = clave
+                cambio = True
+            etiqueta = etiqueta_producto(p)
+            if etiqueta != self._etiquetas[i]:
+                self._etiquetas[i] = etiqueta
+                cambio = True
+        if cambio:
+            self._ultima = None
+
+    def etiquetas(self, limite=None):
+        """Primeras etiquetas del catálogo (consulta vacía)."""
+        if self.sucio:
+            self._construir()
+        lim = self.limite if limite is None else limite
+        return self._etiquetas[:lim] if lim else list(self._etiquetas)
+
+    def _candidatos(self, q):
+        # 1) refinamiento incremental sobre la consulta anterior
+        if self._ultima and self._ultima[0] and self._ultima[0] in q:
+            return self._ultima[1]
+        # 2) intersección de trigramas (empezando por la lista más corta)
+        if len(q) >= N:
+            listas = []
+            for g in {q[j:j+N] for j in range(len(q) - N + 1)}:
+                lst = self._gramas.get(g)
+                if not lst:
+                    return []
+                listas.append(lst)
+            listas.sort(key=len)
+            ids = set(listas[0])
+            for lst in listas[1:]:
+                ids.intersection_update(lst)
+                if not ids:
+                    return []
+            return sorted(ids)
+        # 3) consultas cortas: recorrido de las claves ya normalizadas
+        return range(len(self._claves))
+
+    def buscar(self, texto):
+        """Devuelve (etiquetas hasta el límite, total de coincidencias)."""
+        if self.sucio:
+            self._construir()
+        q = normalizar(texto).strip()
+        if not q:
+            self._ultima = None
+            return self.etiquetas(), len(self._etiquetas)
+        claves = self._claves
+        ids = [i for i in self._candidatos(q) if q in claves[i]]
+        self._ultima = (q, ids)
+        lim = self.limite
+        return [self._etiquetas[i] for i in (ids[:lim] if lim else ids)], len(ids)
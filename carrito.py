@@ -0,0 +1,122 @@
+"""
+carrito.py
+Modelo del carrito de venta, independiente de Tkinter.
+
+- Líneas indexadas por artículo (agregar el mismo artículo suma cantidad).
+- Precios en centavos enteros: sin errores de redondeo de float.
+- Total acumulado actualizado en cada cambio (O(1) por edición); el
+  Treeview del carrito solo muestra este modelo.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+
+class StockInsuficiente(ValueError):
+    pass
+
+
+def a_centavos(valor):
+    """Importe (float/str/Decimal) -> centavos enteros, redondeo comercial."""
+    return int((Decimal(str(valor)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def desde_centavos(cent):
+    return cent / 100.0
+
+
+def formato_pesos(cent):
+    signo = "-" if cent < 0 else ""
+    cent = abs(cent)
+    return f"{signo}${cent // 100}.{cent % 100:02d}"
+
+
+class LineaCarrito:
+    __slots__ = ("articulo", "nombre", "marca", "precio_cent", "cantidad")
+
+    def __init__(self, articulo, nombre, marca, precio_cent, cantidad):
+        self.articulo = articulo
+        self.nombre = nombre
+        self.marca = marca
+        self.precio_cent = precio_cent
+        self.cantidad = cantidad
+
+    @property
+    def subtotal_cent(self):
+        return self.precio_cent * self.cantidad
+
+    def item_venta(self):
+        """Formato de línea que se guarda en ventas.json."""
+        return {"articulo": self.articulo, "nombre": self.nombre, "marca": self.marca,
+                "cantidad": self.cantidad, "precio": desde_centavos(self.precio_cent)}
+
+
+class Carrito:
+    def __init__(self):
+        self.lineas = {}  # articulo -> LineaCarrito (orden de carga)
+        self.total_cent = 0
+
+    def __len__(self):
+        return len(self.lineas)
+
+    def __iter__(self):
+        return iter(list(self.lineas.values()))
+
+    def __contains__(self, articulo):
+        return articulo in self.lineas
+
+    def get(self, articulo):
+        return self.lineas.get(articulo)
+
+    @property
+    def total(self):
+        return desde_centavos(self.total_cent)
+
+    @property
+    def unidades(self):
+        return sum(l.cantidad for l in self.lineas.values())
+
+    def agregar(self, p, cantidad):
+        """Agrega cantidad del producto p (dict). Si ya está, suma. Controla stock."""
+        if cantidad <= 0:
+            raise ValueError("Cantidad inválida.")
+        linea = self.lineas.get(p["articulo"])
+        nueva = cantidad + (linea.cantidad if linea else 0)
+        if nueva > p.get("stock", nueva):
+            raise StockInsuficiente("No hay stock suficiente para sumar esa cantidad.")
+        if linea is None:
+            linea = LineaCarrito(p["articulo"], p["nombre"], p["marca"], a_centavos(p["precio"]), cantidad)
+            self.lineas[p["articulo"]] = linea
+            self.total_cent += linea.subtotal_cent
+        else:
+            self.total_cent += linea.precio_cent * cantidad
+            linea.cantidad = nueva
+        return linea
+
+    def fijar_cantidad(self, articulo, cantidad, stock=None):
+        """Nueva cantidad para una línea; 0 la quita. Devuelve la línea o None si se quitó."""
+        linea = self.lineas.get(articulo)
+        if linea is None:
+            raise KeyError(articulo)
+        if cantidad < 0:
+            raise ValueError("Cantidad inválida.")
+        if stock is not None and cantidad > stock:
+            raise StockInsuficiente("No hay stock suficiente.")
+        if cantidad == 0:
+            self.quitar(articulo)
+            return None
+        self.total_cent += linea.precio_cent * (cantidad - linea.cantidad)
+        linea.cantidad = cantidad
+        return linea
+
+    def quitar(self, articulo):
+        linea = self.lineas.pop(articulo, None)
+        if linea is not None:
+            self.total_cent -= linea.subtotal_cent
+        return linea
+
+    def vaciar(self):
+        self.lineas.clear()
+        self.total_cent = 0
+
+    def items_venta(self):
+        return [l.item_venta() for l in self.lineas.values()]
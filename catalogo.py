@@ -0,0 +1,160 @@
+"""
+catalogo.py
+Importación / exportación masiva del catálogo (CSV o XLSX).
+
+- Lectura en streaming (csv / openpyxl read-only), una fila a la vez.
+- Encabezados flexibles: "Artículo", "codigo", "Descripción", "Precio $"...
+- Validación y normalización por fila, igual que normalizar_producto; los
+  errores se informan por número de fila y no frenan el resto.
+- Las filas válidas se aplican en un solo lote (alta o actualización por
+  artículo) con un único guardado: ver MotorEncanto.upsert_productos.
+"""
+
+import csv, os
+
+from busqueda import normalizar
+from exportar import HAY_EXCEL, escribir_csv, escribir_excel
+
+ALIAS = {
+    "articulo": "articulo", "art": "articulo", "codigo": "articulo", "cod": "articulo", "sku": "articulo",
+    "nombre": "nombre", "descripcion": "nombre", "producto": "nombre", "detalle": "nombre",
+    "marca": "marca",
+    "precio": "precio", "precio $": "precio", "precio unitario": "precio", "pvp": "precio",
+    "stock": "stock", "cantidad": "stock", "existencia": "stock",
+    "minimo": "minimo", "stock minimo": "minimo", "punto de pedido": "minimo", "reponer en": "minimo",
+}
+
+
+class ErrorFila(ValueError):
+    pass
+
+
+def _campo(encabezado):
+    return ALIAS.get(normalizar(encabezado).strip().rstrip(":").strip())
+
+
+def parse_numero(valor):
+    """Acepta 1234.5, '1234,50', '$ 1.234,50', '1,234.50'."""
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    t = str(valor or "").replace("$", "").replace(" ", "").strip()
+    if not t:
+        raise ValueError("vacío")
+    if "," in t and "." in t:
+        # el último separador es el decimal
+        if t.rfind(",") > t.rfind("."):
+            t = t.replace(".", "").replace(",", ".")
+        else:
+            t = t.replace(",", "")
+    elif "," in t:
+        t = t.replace(",", ".")
+    return float(t)
+
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # códigos numéricos leídos de Excel
+    return str(valor).strip()
+
+
+def leer_filas(path):
+    """Genera dicts {campo: valor crudo} por fila, con su número de fila (1 = encabezado)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        if not HAY_EXCEL:
+            raise RuntimeError("openpyxl no está instalado (pip install openpyxl).")
+        from openpyxl import load_workbook  # lazy: only XLSX needs it
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            filas = wb.active.iter_rows(values_only=True)
+            encabezado = next(filas, None) or ()
+            campos = [_campo(_texto(h)) for h in encabezado]
+            for n, fila in enumerate(filas, 2):
+                yield n, {c: v for c, v in zip(campos, fila) if c}
+        finally:
+            wb.close()
+        return
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        muestra = f.read(4096)
+        f.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=";,\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(f, dialecto)
+        encabezado = next(lector, None) or []
+        campos = [_campo(h) for h in encabezado]
+        for n, fila in enumerate(lector, 2):
+            if not any(c.strip() for c in fila):
+                continue
+            yield n, {c: v for c, v in zip(campos, fila) if c}
+
+
+def validar_fila(crudo):
+    """Fila cruda -> dict parcial normalizado (solo los campos presentes). Lanza ErrorFila."""
+    art = _texto(crudo.get("articulo"))
+    if not art:
+        raise ErrorFila("Falta el artículo.")
+    p = {"articulo": art}
+    for c in ("nombre", "marca"):
+        if c in crudo and _texto(crudo[c]):
+            p[c] = _texto(crudo[c])
+    if "precio" in crudo and _texto(crudo["precio"]):
+        try:
+            p["precio"] = round(parse_numero(crudo["precio"]), 2)
+        except ValueError:
+            raise ErrorFila(f"Precio inválido: {crudo['precio']!r}.")
+        if p["precio"] < 0:
+            raise ErrorFila("Precio negativo.")
+    if "stock" in crudo and _texto(crudo["stock"]):
+        try:
+            stock = parse_numero(crudo["stock"])
+        except ValueError:
+            raise ErrorFila(f"Stock inválido: {crudo['stock']!r}.")
+        if not float(stock).is_integer():
+            raise ErrorFila(f"Stock no entero: {crudo['stock']!r}.")
+        p["stock"] = int(stock)
+    if "minimo" in crudo and _texto(crudo["minimo"]):
+        try:
+            minimo = parse_numero(crudo["minimo"])
+        except ValueError:
+            raise ErrorFila(f"Mínimo inválido: {crudo['minimo']!r}.")
+        if not float(minimo).is_integer() or minimo < 0:
+            raise ErrorFila(f"Mínimo debe ser un entero >= 0: {crudo['minimo']!r}.")
+        p["minimo"] = int(minimo)
+    return p
+
+
+def importar_catalogo(motor, path):
+    """Lee, valida y aplica el archivo en un lote. Devuelve (nuevos, actualizados, errores[(fila, msg)])."""
+    validas = {}
+    errores = []
+    for n, crudo in leer_filas(path):
+        try:
+            p = validar_fila(crudo)
+        except ErrorFila as e:
+            errores.append((n, str(e)))
+            continue
+        # mismo artículo repetido en el archivo: la última fila gana
+        previo = validas.get(p["articulo"])
+        if previo is not None:
+            previo[1].update(p)
+        else:
+            validas[p["articulo"]] = (n, p)
+    nuevos, actualizados, errores_lote = motor.upsert_productos([p for _n, p in validas.values()])
+    filas = {art: n for art, (n, _p) in validas.items()}
+    errores.extend((filas.get(art, 0), msg) for art, msg in errores_lote)
+    errores.sort()
+    return nuevos, actualizados, errores
+
+
+def exportar_catalogo(path, productos):
+    """Catálogo completo a CSV o XLSX según la extensión."""
+    encabezado = ["Artículo", "Nombre", "Marca", "Precio", "Stock", "Stock mínimo"]
+    # sin mínimo propio la celda queda vacía (se usa el general)
+    filas = ([p["articulo"], p["nombre"], p["marca"], p["precio"], p["stock"], p.get("minimo")] for p in productos)
+    if os.path.splitext(path)[1].lower() == ".xlsx":
+        return escribir_excel(path, "Productos", encabezado, filas)
+    return escribir_csv(path, encabezado, filas)
@@ -0,0 +1,134 @@
+"""
+clientes.py
+Registro de clientes armado a partir de las ventas.
+
+- Índice hash por DNI: datos del cliente (nombre y teléfono de su última
+  compra), cantidad de compras, total gastado, última compra y la lista de
+  sus ventas. El historial de un cliente no recorre todas las ventas.
+- Se mantiene solo: cada venta nueva (propia o de otra caja) actualiza los
+  agregados de su cliente en O(1); no hay un archivo aparte que sincronizar.
+- Los clientes de meses archivados (archivo.py) arrancan desde el resumen
+  del archivo (compras, total, última compra y meses en que compró); sus
+  ventas viejas se leen recién al pedir el historial.
+- Autocompletado por prefijo del nombre (o de cualquiera de sus palabras,
+  sin mayúsculas ni acentos) con bisect sobre claves ordenadas, que se
+  arman solas la primera vez que se piden (y se descartan con altas o
+  cambios de nombre).
+"""
+
+from bisect import bisect_left
+
+from agregados import clave_fecha
+from busqueda import normalizar
+
+LIMITE = 20  # sugerencias del autocompletado
+
+
+class Cliente:
+    __slots__ = ("dni", "nombre", "tel", "visitas", "gastado", "ultima", "_clave_ultima", "_fecha_ultima", "ventas", "meses")
+
+    def __init__(self, dni):
+        self.dni = dni
+        self.nombre = ""
+        self.tel = ""
+        self.visitas = 0
+        self.gastado = 0.0
+        self.ultima = None  # venta más reciente (en memoria)
+        self._clave_ultima = None
+        self._fecha_ultima = None  # última compra archivada, si no hay una en memoria
+        self.ventas = []    # en el orden en que se registraron (solo el historial activo)
+        self.meses = []     # meses archivados con compras ('AAAA-MM')
+
+    def etiqueta(self):
+        return f"{self.nombre} - DNI {self.dni}"
+
+    def fecha_ultima(self):
+        if self.ultima is not None:
+            return self.ultima.get("fecha", "")
+        return self._fecha_ultima or "-"
+
+
+class IndiceClientes:
+    def __init__(self):
+        self.archivados = {}  # resumen del archivo por DNI (ArchivoVentas.clientes)
+        self._reiniciar(None)
+
+    def cargar_archivo(self, resumen):
+        """Resumen de las compras archivadas; se aplica en la próxima sincronización."""
+        self.archivados = resumen
+        self._fuente = None
+
+    def _reiniciar(self, ventas):
+        self._fuente = ventas
+        self._n_ventas = 0
+        self._por_dni = {}
+        self._claves = None  # [(nombre o palabra normalizada, dni)] ordenadas (lazy)
+        for dni, r in self.archivados.items():
+            c = self._por_dni[dni] = Cliente(dni)
+            c.nombre = r.get("nombre", ""); c.tel = r.get("tel", "")
+            c.visitas = r.get("visitas", 0); c.gastado = r.get("gastado", 0.0)
+            c._fecha_ultima = r.get("ultima")
+            c._clave_ultima = clave_fecha({"fecha": c._fecha_ultima}) if c._fecha_ultima else None
+            c.meses = r.get("meses", [])
+
+    def sincronizar(self, ventas):
+        """Incorpora las ventas agregadas a la lista desde la última llamada (otra lista: reconstruye)."""
+        if ventas is not self._fuente or len(ventas) < self._n_ventas:
+            self._reiniciar(ventas)
+        if len(ventas) > self._n_ventas:
+            for v in ventas[self._n_ventas:]:
+                self._agregar(v)
+            self._n_ventas = len(ventas)
+        return self
+
+    def _agregar(self, v):
+        dni = str(v.get("dni", "") or "").strip()
+        if not dni:
+            return  # ventas viejas sin DNI
+        c = self._por_dni.get(dni)
+        if c is None:
+            c = self._por_dni[dni] = Cliente(dni)
+            self._claves = None
+        c.visitas += 1
+        c.gastado += v.get("total", 0.0) or 0.0
+        c.ventas.append(v)
+        kf = clave_fecha(v)
+        # an archived last purchase also counts: a late sale older than it does not rename the client
+        if (kf is not None and (c._clave_ultima is None or kf >= c._clave_ultima)) or (c.ultima is None and c._clave_ultima is None):
+            c.ultima = v
+            c._clave_ultima = kf
+            nombre = str(v.get("cliente", "") or "").strip()
+            if nombre != c.nombre:
+                c.nombre = nombre
+                self._claves = None
+            c.tel = str(v.get("tel", "") or "").strip() or c.tel
+
+    def __len__(self):
+        return len(self._por_dni)
+
+    def get(self, dni):
+        return self._por_dni.get(str(dni or "").strip())
+
+    def buscar(self, prefijo, limite=LIMITE):
+        """Clientes cuyo nombre (o alguna palabra del nombre) empieza con prefijo, sin repetir."""
+        prefijo = normalizar(prefijo).strip()
+        if not prefijo:
+            return []
+        if self._claves is None:
+            claves = []
+            for c in self._por_dni.values():
+                palabras = normalizar(c.nombre).split()
+                for i in range(len(palabras)):
+                    claves.append((" ".join(palabras[i:]), c.dni))
+            claves.sort()
+            self._claves = claves
+        claves = self._claves
+        res = []; vistos = set()
+        i = bisect_left(claves, (prefijo,))
+        while i < len(claves) and claves[i][0].startswith(prefijo) and len(res) < limite:
+            dni = claves[i][1]
+            if dni not in vistos:
+                vistos.add(dni)
+                res.append(self._por_dni[dni])
+            i += 1
+        return res
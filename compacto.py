@@ -0,0 +1,267 @@
+"""
+compacto.py
+Representación compacta en memoria de productos y ventas.
+
+- Registros con __slots__ en lugar de dicts: sin tabla de claves repetida
+  por cada producto, venta o línea (de ~350 a ~70 bytes por registro).
+- Strings repetidos (artículo, nombre, marca, cliente, DNI) internados:
+  un millón de líneas de la misma marca comparten un único string.
+- Fecha de venta guardada como entero (segundos desde 1970, hora local
+  sin zona); el texto "dd/mm/yyyy HH:MM" se arma al pedirlo, con caché.
+- Vista compatible con dict (v["fecha"], v.get("productos", []), dict(p),
+  p.update(...), "productos" in v): el resto del código no cambia.
+  json no los serializa solo: usar a_json como default= de json.dump.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+FORMATOS_FECHA = ("%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S")
+FORMATO_FECHA = FORMATOS_FECHA[0]
+EPOCA = datetime(1970, 1, 1)
+
+_intern = sys.intern
+
+
+def _forma_corta(fecha):
+    return type(fecha) is str and len(fecha) == 16 and fecha[2] == "/" and fecha[5] == "/" and fecha[13] == ":"
+
+
+def parse_fecha(fecha):
+    """datetime de una fecha de venta ('dd/mm/yyyy HH:MM[:SS]') o None."""
+    if _forma_corta(fecha):
+        # fast path for the usual format (strptime is ~10x slower)
+        try:
+            return datetime(int(fecha[6:10]), int(fecha[3:5]), int(fecha[0:2]), int(fecha[11:13]), int(fecha[14:16]))
+        except ValueError:
+            pass
+    for fmt in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(fecha, fmt)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+_ORD_EPOCA = EPOCA.toordinal()
+
+
+def a_segundos(dt):
+    return (dt.toordinal() - _ORD_EPOCA) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+def desde_segundos(ts):
+    return EPOCA + timedelta(seconds=ts)
+
+
+@lru_cache(maxsize=8192)
+def formatear_ts(ts):
+    # consecutive lines of one sale (and sales in the same minute) hit the cache
+    return desde_segundos(ts).strftime(FORMATO_FECHA)
+
+
+def _texto(valor):
+    return _intern(str(valor)) if valor is not None else ""
+
+
+def a_json(obj):
+    """default= para json.dump / json.dumps."""
+    if isinstance(obj, Registro):
+        return obj.a_dict()
+    raise TypeError(f"{type(obj).__name__} no es serializable a JSON")
+
+
+class Registro:
+    """Base con vista de dict sobre los slots de CAMPOS (+ claves extra poco comunes)."""
+    __slots__ = ()
+    CAMPOS = ()
+    _CLAVES = frozenset()
+    __hash__ = None  # como dict
+
+    def __getitem__(self, k):
+        if k in self._CLAVES:
+            return getattr(self, k)
+        extra = self._extra
+        if extra and k in extra:
+            return extra[k]
+        raise KeyError(k)
+
+    def __setitem__(self, k, v):
+        if k in self._CLAVES:
+            setattr(self, k, v)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[k] = v
+
+    def get(self, k, default=None):
+        try:
+            return self[k]
+        except KeyError:
+            return default
+
+    def pop(self, k, *default):
+        # only extra keys can be removed; fixed fields always exist
+        if k not in self._CLAVES and self._extra and k in self._extra:
+            return self._extra.pop(k)
+        if default:
+            return default[0]
+        raise KeyError(k)
+
+    def __contains__(self, k):
+        return k in self._CLAVES or bool(self._extra) and k in self._extra
+
+    def keys(self):
+        return list(self.CAMPOS) + list(self._extra or ())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.CAMPOS) + len(self._extra or ())
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def update(self, otro=(), **cambios):
+        for k, v in dict(otro, **cambios).items():
+            self[k] = v
+
+    def a_dict(self):
+        return {k: self[k] for k in self.keys()}
+
+    def __eq__(self, otro):
+        if isinstance(otro, (Registro, dict)):
+            return self.a_dict() == dict(otro)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.a_dict()!r})"
+
+
+class Producto(Registro):
+    __slots__ = ("articulo", "nombre", "marca", "precio", "stock", "_extra")
+    CAMPOS = ("articulo", "nombre", "marca", "precio", "stock")
+    _CLAVES = frozenset(CAMPOS)
+
+    def __init__(self, articulo="", nombre="", marca="", precio=0.0, stock=0):
+        self.articulo = _texto(articulo)
+        self.nombre = _texto(nombre)
+        self.marca = _texto(marca)
+        self.precio = precio
+        self.stock = stock
+        self._extra = None
+
+    @classmethod
+    def crudo(cls, articulo, nombre, marca, precio, stock, extra=None):
+        """Sin conversiones ni internado: los valores ya vienen con su tipo (binario.py)."""
+        r = cls.__new__(cls)
+        r.articulo = articulo; r.nombre = nombre; r.marca = marca
+        r.precio = precio; r.stock = stock; r._extra = extra
+        return r
+
+    @classmethod
+    def desde(cls, p):
+        """Producto a partir de un dict (o devuelve el mismo Producto)."""
+        if isinstance(p, Producto):
+            return p
+        r = cls(p.get("articulo", ""), p.get("nombre", ""), p.get("marca", ""), p.get("precio", 0.0), p.get("stock", 0))
+        if len(p) > len(cls.CAMPOS):
+            for k, v in p.items():
+                if k not in cls._CLAVES:
+                    r[k] = v
+        return r
+
+
+class LineaVenta(Registro):
+    __slots__ = ("articulo", "nombre", "marca", "cantidad", "precio", "_extra")
+    CAMPOS = ("articulo", "nombre", "marca", "cantidad", "precio")
+    _CLAVES = frozenset(CAMPOS)
+
+    def __init__(self, articulo, nombre, marca, cantidad, precio):
+        self.articulo = _texto(articulo)
+        self.nombre = _texto(nombre)
+        self.marca = _texto(marca)
+        self.cantidad = cantidad
+        self.precio = precio
+        self._extra = None
+
+    @classmethod
+    def crudo(cls, articulo, nombre, marca, cantidad, precio, extra=None):
+        r = cls.__new__(cls)
+        r.articulo = articulo; r.nombre = nombre; r.marca = marca
+        r.cantidad = cantidad; r.precio = precio; r._extra = extra
+        return r
+
+    @classmethod
+    def desde(cls, it):
+        if isinstance(it, LineaVenta):
+            return it
+        r = cls(it.get("articulo", ""), it.get("nombre", ""), it.get("marca", ""), it.get("cantidad", 0), it.get("precio", 0.0))
+        if len(it) > len(cls.CAMPOS):
+            for k, v in it.items():
+                if k not in cls._CLAVES:
+                    r[k] = v
+        return r
+
+
+class Venta(Registro):
+    __slots__ = ("ts", "_fecha_txt", "cliente", "dni", "tel", "productos", "total", "_extra")
+    CAMPOS = ("fecha", "cliente", "dni", "tel", "productos", "total")
+    _CLAVES = frozenset(CAMPOS)
+
+    def __init__(self, fecha, cliente="", dni="", tel="", productos=(), total=0.0):
+        self.fecha = fecha
+        self.cliente = _texto(cliente)
+        self.dni = _texto(dni)
+        self.tel = _texto(tel)
+        self.productos = tuple(LineaVenta.desde(it) for it in productos)
+        self.total = total
+        self._extra = None
+
+    @property
+    def fecha(self):
+        if self._fecha_txt is not None:
+            return self._fecha_txt
+        return formatear_ts(self.ts) if self.ts is not None else ""
+
+    @fecha.setter
+    def fecha(self, valor):
+        # ts when the text parses; the text itself is only kept if it would not round-trip
+        if isinstance(valor, datetime):
+            valor = valor.strftime(FORMATO_FECHA)
+        dt = parse_fecha(valor)
+        self.ts = a_segundos(dt) if dt is not None else None
+        if dt is not None and (_forma_corta(valor) or formatear_ts(self.ts) == valor):
+            self._fecha_txt = None
+        else:
+            self._fecha_txt = str(valor or "")
+
+    def fecha_dt(self):
+        return desde_segundos(self.ts) if self.ts is not None else None
+
+    @classmethod
+    def crudo(cls, ts, fecha_txt, cliente, dni, tel, productos, total, extra=None):
+        """ts y el texto de fecha tal como los guarda el registro (sin parsear la fecha)."""
+        r = cls.__new__(cls)
+        r.ts = ts; r._fecha_txt = fecha_txt
+        r.cliente = cliente; r.dni = dni; r.tel = tel
+        r.productos = productos; r.total = total; r._extra = extra
+        return r
+
+    @classmethod
+    def desde(cls, v):
+        """Venta a partir de un dict en formato actual (ver normalizar_venta)."""
+        if isinstance(v, Venta):
+            return v
+        r = cls(v.get("fecha", ""), v.get("cliente", ""), v.get("dni", ""), v.get("tel", ""),
+                v.get("productos", ()), v.get("total", 0.0))
+        if len(v) > len(cls.CAMPOS):
+            for k, val in v.items():
+                if k not in cls._CLAVES:
+                    r[k] = val
+        return r
@@ -0,0 +1,154 @@
+"""
+diario.py
+Diario de ventas append-only (JSON Lines) para ENCANTO.
+
+- ventas.json queda como snapshot compactado (mismo formato de siempre).
+- Cada venta nueva se agrega como una línea al diario, con flush + fsync.
+- Al iniciar: snapshot + replay del diario.
+- Un último registro truncado (corte de luz, crash) se descarta y el
+  archivo se recorta al último registro válido, sin perder el resto.
+- Compactación periódica: reescribe el snapshot de forma atómica
+  (archivo temporal + os.replace) y retira el diario. El diario se retira
+  (ventas.jsonl.compactado) después de escribir el temporal y antes de
+  reemplazar el snapshot: si se corta en el medio, al abrir se sabe qué
+  paso faltó y ninguna venta se cuenta dos veces ni se pierde.
+"""
+
+import json, os
+
+from compacto import a_json
+
+
+def _volcar_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False, default=a_json)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def escribir_json_atomico(path, data):
+    """Escribe JSON en un temporal y lo reemplaza de forma atómica."""
+    tmp = f"{path}.tmp"
+    _volcar_json(tmp, data)
+    os.replace(tmp, path)
+
+
+class DiarioVentas:
+    def __init__(self, path_snapshot, path_diario=None, compactar_cada=500):
+        self.path_snapshot = path_snapshot
+        self.path_diario = path_diario or os.path.splitext(path_snapshot)[0] + ".jsonl"
+        self.path_retirado = self.path_diario + ".compactado"
+        self.compactar_cada = compactar_cada
+        self.pendientes = 0  # registros en el diario desde la última compactación
+
+    # -------------------- Carga --------------------
+    def recuperar(self):
+        """Termina una compactación cortada a la mitad (ver compactar). Llamar antes de leer el snapshot."""
+        tmp = f"{self.path_snapshot}.tmp"
+        if os.path.exists(self.path_retirado):
+            # the journal was retired: the new snapshot (already fsynced) has its sales
+            if os.path.exists(tmp):
+                os.replace(tmp, self.path_snapshot)
+            os.remove(self.path_retirado)
+        elif os.path.exists(tmp):
+            # cut before retiring the journal: old snapshot + journal are still valid
+            os.remove(tmp)
+
+    def leer_snapshot(self):
+        """Ventas de ventas.json (dicts). Lanza ValueError si está corrupto."""
+        if not os.path.exists(self.path_snapshot):
+            return []
+        with open(self.path_snapshot, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"{self.path_snapshot} corrupto: {e}")
+        return data if isinstance(data, list) else []
+
+    def cargar(self, snapshot=None):
+        """Devuelve (ventas, avisos). Lanza ValueError si el snapshot está corrupto.
+        snapshot: ventas del snapshot ya leídas por otro medio (copia binaria); None = leer ventas.json."""
+        avisos = []
+        if snapshot is None:
+            self.recuperar()
+        ventas = self.leer_snapshot() if snapshot is None else snapshot
+        replay, avisos_diario = self._leer_diario()
+        ventas.extend(replay)
+        avisos.extend(avisos_diario)
+        self.pendientes = len(replay)
+        return ventas, avisos
+
+    def _leer_diario(self):
+        ventas, avisos = [], []
+        if not os.path.exists(self.path_diario):
+            return ventas, avisos
+        with open(self.path_diario, "rb") as f:
+            raw = f.read()
+        offset = 0
+        ultimo_ok = 0
+        falta_salto = False
+        n = len(raw)
+        while offset < n:
+            fin = raw.find(b"\n", offset)
+            completa = fin != -1
+            if not completa:
+                fin = n
+            linea = raw[offset:fin].strip()
+            siguiente = fin + 1 if completa else n
+            if linea:
+                try:
+                    rec = json.loads(linea.decode("utf-8"))
+                except ValueError:
+                    rec = None
+                if isinstance(rec, dict):
+                    # registro completo aunque se haya perdido el salto de línea final
+                    ventas.append(rec)
+                    ultimo_ok = siguiente
+                    falta_salto = not completa
+                elif siguiente >= n:
+                    # último registro truncado: se descarta y se recorta el archivo
+                    avisos.append(f"Se descartó un registro incompleto al final de {self.path_diario}.")
+                    break
+                else:
+                    # línea dañada en el medio: se saltea, el resto se conserva
+                    avisos.append(f"Se ignoró una línea dañada en {self.path_diario} (byte {offset}).")
+                    ultimo_ok = siguiente
+            else:
+                ultimo_ok = siguiente
+            offset = siguiente
+        if ultimo_ok < n:
+            with open(self.path_diario, "r+b") as f:
+                f.truncate(ultimo_ok)
+                f.flush()
+                os.fsync(f.fileno())
+        if falta_salto:
+            with open(self.path_diario, "ab") as f:
+                f.write(b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return ventas, avisos
+
+    # -------------------- Escritura --------------------
+    def agregar(self, venta):
+        """Agrega una venta al diario (O(1) en disco, independiente del historial)."""
+        linea = json.dumps(venta, ensure_ascii=False, separators=(",", ":"), default=a_json) + "\n"
+        with open(self.path_diario, "a", encoding="utf-8") as f:
+            f.write(linea)
+            f.flush()
+            os.fsync(f.fileno())
+        self.pendientes += 1
+
+    def necesita_compactar(self):
+        return self.compactar_cada and self.pendientes >= self.compactar_cada
+
+    def compactar(self, ventas):
+        """Vuelca todo el historial al snapshot y retira el diario.
+        Orden: temporal completo (fsync) -> diario retirado -> os.replace del snapshot -> se borra el retirado."""
+        tmp = f"{self.path_snapshot}.tmp"
+        _volcar_json(tmp, ventas)
+        if os.path.exists(self.path_diario):
+            os.replace(self.path_diario, self.path_retirado)
+        os.replace(tmp, self.path_snapshot)
+        if os.path.exists(self.path_retirado):
+            os.remove(self.path_retirado)
+        self.pendientes = 0
@@ -0,0 +1,100 @@
+"""
+escritor.py
+Hilo de persistencia en segundo plano.
+
+- La UI encola tareas (instantáneas o deltas ya copiados en el hilo de Tk)
+  y vuelve enseguida: un disco lento no congela la caja.
+- Ráfagas de escrituras del mismo tipo se combinan: si la última tarea
+  pendiente tiene la misma clave y se puede combinar, se fusiona en lugar
+  de encolar otra (el orden entre claves distintas se respeta).
+- Los errores se guardan en una cola; la UI los consulta con root.after.
+- vaciar() bloquea hasta escribir todo lo pendiente (al cerrar la ventana).
+"""
+
+import threading, time
+from collections import deque
+
+from metricas import medir
+
+
+class Tarea:
+    __slots__ = ("clave", "funcion", "datos", "combinar", "descripcion")
+
+    def __init__(self, clave, funcion, datos, combinar=None, descripcion=""):
+        self.clave = clave
+        self.funcion = funcion
+        self.datos = datos
+        self.combinar = combinar  # (viejos, nuevos) -> datos fusionados o None
+        self.descripcion = descripcion or clave
+
+
+class EscritorSegundoPlano:
+    def __init__(self, demora=0.05):
+        self.demora = demora  # ventana para juntar ráfagas antes de escribir
+        self._pendientes = deque()
+        self._cond = threading.Condition()
+        self._ocupado = False
+        self._detener = False
+        self.errores = deque()
+        self._hilo = threading.Thread(target=self._loop, name="encanto-escritor", daemon=True)
+        self._hilo.start()
+
+    def encolar(self, clave, funcion, datos, combinar=None, descripcion=""):
+        with self._cond:
+            if self._pendientes and combinar is not None:
+                ultima = self._pendientes[-1]
+                if ultima.clave == clave and ultima.combinar is not None:
+                    fusion = combinar(ultima.datos, datos)
+                    if fusion is not None:
+                        ultima.datos = fusion
+                        return
+            self._pendientes.append(Tarea(clave, funcion, datos, combinar, descripcion))
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pendientes and not self._detener:
+                    self._cond.wait()
+                if not self._pendientes and self._detener:
+                    return
+            if self.demora and not self._detener:
+                time.sleep(self.demora)
+            with self._cond:
+                tarea = self._pendientes.popleft()
+                self._ocupado = True
+            try:
+                with medir(f"escribir_{tarea.clave}"):
+                    tarea.funcion(tarea.datos)
+            except Exception as e:
+                self.errores.append(f"{tarea.descripcion}: {e}")
+            finally:
+                with self._cond:
+                    self._ocupado = False
+                    self._cond.notify_all()
+
+    def vaciar(self, timeout=None):
+        """Espera a que se escriba todo lo pendiente. Devuelve True si terminó."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pendientes or self._ocupado:
+                resto = None if limite is None else limite - time.monotonic()
+                if resto is not None and resto <= 0:
+                    return False
+                self._cond.wait(resto)
+        return True
+
+    def detener(self, timeout=None):
+        """Vacía la cola y termina el hilo."""
+        ok = self.vaciar(timeout)
+        with self._cond:
+            self._detener = True
+            self._cond.notify_all()
+        self._hilo.join(timeout)
+        return ok
+
+    def tomar_errores(self):
+        errores = []
+        while self.errores:
+            errores.append(self.errores.popleft())
+        return errores
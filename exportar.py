@@ -0,0 +1,239 @@
+"""
+exportar.py
+Exportación del reporte de ventas (Excel / CSV), pensada para rangos grandes.
+
+- Las filas salen de un generador sobre las ventas filtradas: nunca se arma
+  una lista completa de filas en memoria.
+- Excel en modo write-only de openpyxl (streaming, memoria acotada).
+- CSV como camino rápido (o cuando falta openpyxl): ';' como separador y
+  BOM UTF-8 para que Excel en español lo abra bien.
+- PDF en tablas de tamaño acotado (una por página) con subtotal por página
+  y una página de resumen: reportlab nunca tiene que partir una tabla
+  gigante, así el tiempo crece de forma casi lineal con las filas.
+- ExportacionEnSegundoPlano corre cualquier exportador en un hilo con
+  progreso y cancelación; la UI lo consulta con after().
+- openpyxl y reportlab se importan recién al exportar (tardan más que el
+  resto del arranque); HAY_EXCEL / HAY_PDF solo buscan el paquete
+  (find_spec), sin importarlo.
+"""
+
+import csv, os, threading
+from importlib.util import find_spec
+from itertools import islice
+
+from metricas import medir
+
+
+def disponible(paquete):
+    """True si el paquete está instalado (sin importarlo)."""
+    try:
+        return find_spec(paquete) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+HAY_EXCEL = disponible("openpyxl")
+HAY_PDF = disponible("reportlab")
+
+COLUMNAS = ["Fecha","Cliente","DNI","Tel","Artículo","Producto","Marca","Cantidad","Total"]
+PASO_PROGRESO = 500  # filas entre avisos de progreso / chequeos de cancelación
+FILAS_POR_PAGINA = 36  # filas por tabla PDF (una tabla por página)
+ANCHOS_PDF = [80, 100, 60, 65, 55, 180, 80, 45, 65]  # puntos, A4 apaisado
+
+
+class ExportacionCancelada(Exception):
+    pass
+
+
+def contar_lineas(ventas):
+    return sum(len(v.get("productos", [])) for v in ventas)
+
+
+def filas_reporte(ventas):
+    """Una fila por línea vendida, en el orden de COLUMNAS."""
+    for v in ventas:
+        fecha = v.get("fecha",""); cliente = v.get("cliente",""); dni = v.get("dni",""); tel = v.get("tel","")
+        for prod in v.get("productos", []):
+            yield [fecha, cliente, dni, tel, prod["articulo"], prod["nombre"], prod["marca"], prod["cantidad"], round(prod["precio"]*prod["cantidad"], 2)]
+
+
+def _recorrer(filas, progreso, cancelado):
+    for n, fila in enumerate(filas, 1):
+        if n % PASO_PROGRESO == 0:
+            if cancelado is not None and cancelado():
+                raise ExportacionCancelada()
+            if progreso is not None:
+                progreso(n)
+        yield fila
+
+
+def _escribir_seguro(path, escribir):
+    # write to a temp file; the target only appears when export finished
+    tmp = f"{path}.parcial"
+    try:
+        escribir(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def escribir_excel(path, hoja, encabezado, filas):
+    """Tabla a XLSX (write-only, streaming). Devuelve la cantidad de filas."""
+    if not HAY_EXCEL:
+        raise RuntimeError("openpyxl no está instalado (pip install openpyxl).")
+    from openpyxl import Workbook
+    n = [0]
+
+    def escribir(destino):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(hoja)
+        ws.append(encabezado)
+        for fila in filas:
+            ws.append(fila)
+            n[0] += 1
+        wb.save(destino)
+    _escribir_seguro(path, escribir)
+    return n[0]
+
+
+def escribir_csv(path, encabezado, filas):
+    """Tabla a CSV para Excel en español (';' y BOM UTF-8). Devuelve la cantidad de filas."""
+    n = [0]
+
+    def escribir(destino):
+        with open(destino, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.writer(f, delimiter=";")
+            w.writerow(encabezado)
+            for fila in filas:
+                w.writerow(fila)
+                n[0] += 1
+    _escribir_seguro(path, escribir)
+    return n[0]
+
+
+def exportar_excel(path, ventas, progreso=None, cancelado=None):
+    return escribir_excel(path, "Reporte Ventas", COLUMNAS, _recorrer(filas_reporte(ventas), progreso, cancelado))
+
+
+def exportar_csv(path, ventas, progreso=None, cancelado=None):
+    return escribir_csv(path, COLUMNAS, _recorrer(filas_reporte(ventas), progreso, cancelado))
+
+
+def _estilo_tabla_pdf():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    return TableStyle([
+        ('BACKGROUND',(0,0),(-1,0),colors.gray),
+        ('TEXTCOLOR',(0,0),(-1,0),colors.whitesmoke),
+        ('GRID',(0,0),(-1,-1),0.4,colors.black),
+        ('FONTSIZE',(0,0),(-1,-1),8),
+        ('LEADING',(0,0),(-1,-1),9),
+        ('TOPPADDING',(0,0),(-1,-1),1),
+        ('BOTTOMPADDING',(0,0),(-1,-1),1),
+        ('ALIGN',(7,1),(-1,-1),'RIGHT'),
+        ('FONTNAME',(0,-1),(-1,-1),'Helvetica-Bold'),
+        ('BACKGROUND',(0,-1),(-1,-1),colors.lightgrey),
+    ])
+
+
+def exportar_pdf(path, ventas, progreso=None, cancelado=None, filas_por_tabla=FILAS_POR_PAGINA):
+    """Reporte PDF en tablas de filas_por_tabla filas (una por página) + página de resumen."""
+    if not HAY_PDF:
+        raise RuntimeError("reportlab no está instalado (pip install reportlab).")
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    styles = getSampleStyleSheet()
+    estilo = _estilo_tabla_pdf()
+    elements = [Paragraph("Reporte de Ventas", styles["Title"]), Spacer(1,12)]
+    total_filas = 0
+    total_unidades = 0
+    total_importe = 0.0
+    por_marca = {}
+    filas = filas_reporte(ventas)
+    pagina = 0
+    while True:
+        if cancelado is not None and cancelado():
+            raise ExportacionCancelada()
+        bloque = list(islice(filas, filas_por_tabla))
+        if not bloque:
+            break
+        pagina += 1
+        sub_unidades = 0
+        sub_importe = 0.0
+        data = [COLUMNAS]
+        for fecha, cliente, dni, tel, art, nombre, marca, cant, total in bloque:
+            data.append([fecha, cliente[:18], dni, tel, art[:10], nombre[:34], marca[:14], str(cant), f"{total:.2f}"])
+            sub_unidades += cant; sub_importe += total
+            acc = por_marca.setdefault(marca, [0, 0.0]); acc[0] += cant; acc[1] += total
+        data.append(["", "", "", "", "", f"Subtotal página {pagina}", "", str(sub_unidades), f"{sub_importe:.2f}"])
+        total_filas += len(bloque); total_unidades += sub_unidades; total_importe += sub_importe
+        # fixed widths: reportlab doesn't have to measure every cell
+        table = Table(data, colWidths=ANCHOS_PDF, repeatRows=1)
+        table.setStyle(estilo)
+        elements.append(table)
+        elements.append(PageBreak())
+    # summary page
+    elements.append(Paragraph("Resumen", styles["Heading1"]))
+    resumen = [["Líneas", str(total_filas)], ["Unidades", str(total_unidades)], ["Total período", f"${total_importe:.2f}"]]
+    t = Table(resumen, colWidths=[150, 150])
+    t.setStyle(TableStyle([('GRID',(0,0),(-1,-1),0.4,colors.black), ('FONTSIZE',(0,0),(-1,-1),10), ('ALIGN',(1,0),(1,-1),'RIGHT')]))
+    elements.append(t)
+    elements.append(Spacer(1,12))
+    marcas = [["Marca", "Unidades", "Total"]] + [[m, str(u), f"{imp:.2f}"] for m, (u, imp) in sorted(por_marca.items(), key=lambda kv: -kv[1][1])]
+    marcas.append(["Total", str(total_unidades), f"{total_importe:.2f}"])
+    t = Table(marcas, colWidths=[200, 100, 100], repeatRows=1)
+    t.setStyle(estilo)
+    elements.append(t)
+
+    def en_pagina(canvas, doc):
+        if cancelado is not None and cancelado():
+            raise ExportacionCancelada()
+        if progreso is not None:
+            progreso(min(total_filas, doc.page * filas_por_tabla))
+        canvas.setFont("Helvetica", 7)
+        canvas.drawRightString(doc.pagesize[0] - 36, 20, f"Página {doc.page}")
+
+    def escribir(destino):
+        doc = SimpleDocTemplate(destino, pagesize=landscape(A4), leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36)
+        doc.build(elements, onFirstPage=en_pagina, onLaterPages=en_pagina)
+    _escribir_seguro(path, escribir)
+    return total_filas
+
+
+class ExportacionEnSegundoPlano(threading.Thread):
+    """Corre exportador(path, ventas, progreso, cancelado) en un hilo.
+    Atributos para la UI: hechas/total, terminado, cancelada, error, filas."""
+
+    def __init__(self, exportador, path, ventas, total=None):
+        super().__init__(name="encanto-exportar", daemon=True)
+        self.exportador = exportador
+        self.path = path
+        self.ventas = ventas
+        self.total = contar_lineas(ventas) if total is None else total
+        self.hechas = 0
+        self.filas = 0
+        self.terminado = False
+        self.cancelada = False
+        self.error = None
+        self._cancelar = threading.Event()
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def _progreso(self, n):
+        self.hechas = n
+
+    def run(self):
+        try:
+            with medir(self.exportador.__name__):
+                self.filas = self.exportador(self.path, self.ventas, self._progreso, self._cancelar.is_set)
+            self.hechas = self.total
+        except ExportacionCancelada:
+            self.cancelada = True
+        except Exception as e:
+            self.error = e
+        finally:
+            self.terminado = True
@@ -0,0 +1,182 @@
+"""
+metricas.py
+Tiempos por operación (I/O, refrescos de la UI, búsqueda, reportes) y log de operaciones lentas.
+
+- @medido("nombre") para funciones y métodos, `with medir("nombre"):` para
+  un bloque. Cada operación tiene un histograma de latencias en escala
+  logarítmica (4 baldes por duplicación, de 10 µs a ~3 min): p50/p95/p99 sin
+  guardar cada medición.
+- Las que superan ENCANTO_LENTO_MS (200 ms por defecto; un valor inválido
+  también deja 200) van a un log rotativo (encanto_lento.log, 1 MB x 3) en
+  la carpeta de los datos, o en ENCANTO_LOG_LENTO si está definido. Se
+  crea recién con la primera.
+- ENCANTO_METRICAS=0 lo apaga: los decoradores devuelven la función sin
+  envolver y medir() un contexto vacío compartido, así el costo es nulo.
+- Se ve en la ventana oculta de diagnóstico (Ctrl+Shift+D en la caja).
+"""
+
+import logging, math, os, threading, time
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+UMBRAL_MS = 200.0
+NOMBRE_LOG = "encanto_lento.log"
+
+
+def umbral_segundos(valor, defecto=UMBRAL_MS):
+    """ENCANTO_LENTO_MS a segundos; vacío, inválido ("200ms") o negativo => defecto."""
+    try:
+        ms = float(valor)
+    except (TypeError, ValueError):
+        ms = defecto
+    if not 0 <= ms < math.inf:
+        ms = defecto
+    return ms / 1000.0
+
+
+ACTIVO = os.environ.get("ENCANTO_METRICAS", "1").strip() not in ("0", "no", "false")
+UMBRAL_LENTO = umbral_segundos(os.environ.get("ENCANTO_LENTO_MS"))
+LOG_LENTAS = os.environ.get("ENCANTO_LOG_LENTO") or None  # None: carpeta de datos (ubicar_log)
+LOG_BYTES = 1_000_000
+LOG_COPIAS = 3
+
+BASE = 1e-5         # límite superior del primer balde (10 µs)
+POR_DUPLICACION = 4
+BALDES = 96         # hasta BASE * 2**(96/4) ~ 168 s
+
+
+class Histograma:
+    __slots__ = ("baldes", "n", "total", "maximo")
+
+    def __init__(self):
+        self.baldes = [0] * (BALDES + 1)
+        self.n = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def agregar(self, seg):
+        i = 0 if seg <= BASE else min(BALDES, math.ceil(math.log2(seg / BASE) * POR_DUPLICACION))
+        self.baldes[i] += 1
+        self.n += 1
+        self.total += seg
+        if seg > self.maximo:
+            self.maximo = seg
+
+    def percentil(self, p):
+        """Límite superior del balde donde cae el percentil p (0-100); nunca más que el máximo."""
+        if not self.n:
+            return 0.0
+        objetivo = self.n * p / 100.0
+        acumulado = 0
+        for i, c in enumerate(self.baldes):
+            acumulado += c
+            if c and acumulado >= objetivo:
+                return min(BASE * 2 ** (i / POR_DUPLICACION), self.maximo)
+        return self.maximo
+
+
+_lock = threading.Lock()
+_histogramas = {}
+_log = None
+
+
+def ubicar_log(carpeta):
+    """Deja el log en la carpeta de los datos, salvo que ya tenga una ruta fija."""
+    global LOG_LENTAS
+    if LOG_LENTAS is None:
+        LOG_LENTAS = os.path.join(carpeta, NOMBRE_LOG)
+
+
+def ruta_log():
+    return os.path.abspath(LOG_LENTAS or NOMBRE_LOG)
+
+
+def _log_lentas():
+    global _log
+    if _log is None:
+        log = logging.getLogger("encanto.lento")
+        log.propagate = False
+        try:
+            manejador = RotatingFileHandler(ruta_log(), maxBytes=LOG_BYTES, backupCount=LOG_COPIAS, encoding="utf-8")
+        except OSError:
+            manejador = logging.NullHandler()  # read-only folder: keep the histograms anyway
+        manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        log.addHandler(manejador)
+        log.setLevel(logging.INFO)
+        _log = log
+    return _log
+
+
+def registrar(nombre, seg, detalle=""):
+    with _lock:
+        h = _histogramas.get(nombre)
+        if h is None:
+            h = _histogramas[nombre] = Histograma()
+        h.agregar(seg)
+    if seg >= UMBRAL_LENTO:
+        hilo = threading.current_thread().name
+        _log_lentas().info(f"{nombre} {seg * 1000:.1f} ms [{hilo}]{' ' + detalle if detalle else ''}")
+
+
+class _Medicion:
+    __slots__ = ("nombre", "t0")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        registrar(self.nombre, time.perf_counter() - self.t0, f"({tipo.__name__})" if tipo else "")
+        return False
+
+
+class _Nada:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        return False
+
+
+_NADA = _Nada()
+
+
+def medir(nombre):
+    """Context manager: mide el bloque (no hace nada con las métricas apagadas)."""
+    return _Medicion(nombre) if ACTIVO else _NADA
+
+
+def medido(nombre):
+    """Decorador: mide cada llamada bajo ese nombre."""
+    def decorar(fn):
+        if not ACTIVO:
+            return fn
+
+        @wraps(fn)
+        def envuelta(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registrar(nombre, time.perf_counter() - t0)
+        return envuelta
+    return decorar
+
+
+def resumen():
+    """[(nombre, n, p50, p95, p99, máximo, total)] en segundos, las de más tiempo total primero."""
+    with _lock:
+        filas = [(nombre, h.n, h.percentil(50), h.percentil(95), h.percentil(99), h.maximo, h.total)
+                 for nombre, h in _histogramas.items()]
+    filas.sort(key=lambda f: -f[6])
+    return filas
+
+
+def reiniciar():
+    with _lock:
+        _histogramas.clear()
@@ -0,0 +1,572 @@
+"""
+nucleo.py
+Motor de negocio de ENCANTO, sin Tkinter.
+
+- Inventario: alta/edición, baja, ajuste de stock, precios en lote (vista
+  previa y deshacer, precios.py) y productos bajo su stock mínimo
+  (alertas.py), al día en cada cambio.
+- Ventas: validación, descuento de stock y registro (con el modelo Carrito).
+- Clientes por DNI con sus agregados e historial, a partir de las ventas.
+- Reportes por rango de fechas (índice por fecha + agregados diarios) y
+  análisis en columnas (analitica.py).
+- Meses archivados (archivo.py): al abrir solo está el mes en curso; un
+  reporte, análisis o historial de cliente que toca un mes cerrado lo trae
+  del almacén la primera vez (cargar_periodo) y queda en memoria.
+- Persistencia a través del almacén configurado; con un escritor en segundo
+  plano (UI) o sincrónica (escritor=None: scripts, benchmarks, otros front-ends).
+- Varias cajas (almacén SQLite compartido): escrituras sincrónicas con control
+  de versión, reservas de stock al cargar el carrito y sincronizar() para
+  traer lo que hicieron las otras cajas. Con JSON, bloquear() impide abrir
+  una segunda instancia sobre los mismos archivos.
+
+Operaciones de carga, guardado, búsqueda, venta y reportes medidas con
+metricas.py (histogramas y log de operaciones lentas).
+
+CargaEnSegundoPlano carga los datos en un hilo: la ventana aparece antes de
+leer los JSON y se llena cuando terminan.
+
+Los errores de validación se informan con ErrorNegocio (mensaje listo para
+mostrar); la interfaz decide cómo presentarlos.
+"""
+
+import os, socket, threading
+from datetime import datetime
+
+from almacenamiento import crear_almacen, combinar_instantaneas, normalizar_producto, normalizar_venta, ConflictoVersion, DATA_FILE, VENTAS_FILE
+from bloqueo import ArchivoBloqueado
+from carrito import StockInsuficiente
+from repositorio import RepositorioProductos
+from busqueda import IndiceBusqueda
+from agregados import IndiceVentasPorFecha, clave_fecha
+from analitica import AnaliticaVentas
+from alertas import IndiceStockBajo
+from clientes import IndiceClientes
+from diario import escribir_json_atomico
+from precios import DESHACER_FILE, RegistroDeshacer, calcular_cambios
+from compacto import Venta
+from metricas import medido, medir, ubicar_log
+
+COMPACTAR_CADA = 500  # ventas en el diario antes de reescribir ventas.json
+FORMATO_FECHA = "%d/%m/%Y %H:%M"
+RESERVA_SEGUNDOS = 600  # reservas del carrito (se renuevan mientras la caja está abierta)
+
+
+class ErrorNegocio(ValueError):
+    pass
+
+
+class CarritoVacio(ErrorNegocio):
+    pass
+
+
+class Conflicto(ErrorNegocio):
+    """Choca con el estado actual: stock que no alcanza o cambios de otra caja (409 en la API)."""
+
+
+class MotorEncanto:
+    def __init__(self, almacen=None, escritor=None, caja=None):
+        self.almacen = almacen if almacen is not None else crear_almacen(compactar_cada=COMPACTAR_CADA)
+        self.escritor = escritor  # None => escrituras sincrónicas
+        ubicar_log(self.almacen.carpeta)
+        self.caja = caja or os.environ.get("ENCANTO_CAJA") or f"{socket.gethostname()}-{os.getpid()}"
+        self._remotos = [[], False, []]  # [productos cambiados, catálogo cambió, ventas nuevas]
+        self.version_catalogo = 0  # sube con cada cambio de productos o stock (ETag de la API)
+        self.productos = []
+        self.repo = RepositorioProductos(self.productos)
+        self.indice_busqueda = IndiceBusqueda(self.productos)
+        self.stock_bajo = IndiceStockBajo()
+        self.ventas = []
+        self.ventas_archivo = []  # meses archivados ya traídos (cargar_periodo)
+        self._meses_archivo = set()
+        self.indice_fechas = IndiceVentasPorFecha()
+        self.analitica = AnaliticaVentas()
+        self.clientes = IndiceClientes()
+        self.deshacer_precios = RegistroDeshacer(os.path.join(self.almacen.carpeta, DESHACER_FILE))
+
+    # -------------------- Persistencia --------------------
+    @property
+    def compartido(self):
+        return self.almacen.compartido
+
+    def bloquear(self):
+        """Uso exclusivo de los archivos (JSON). Lanza ErrorNegocio si hay otra instancia abierta."""
+        try:
+            self.almacen.bloquear()
+        except ArchivoBloqueado as e:
+            raise ErrorNegocio(f"{e}\nPara usar varias cajas a la vez configure ENCANTO_ALMACEN=sqlite.")
+
+    def _encolar(self, clave, funcion, datos, combinar=None, descripcion=""):
+        if self.compartido:
+            # shared store: write now so a version conflict reaches the caller
+            try:
+                with medir(f"escribir_{clave}"):
+                    funcion(datos)
+            except ConflictoVersion as e:
+                # the transaction was rolled back but memory already has the edit:
+                # reload the catalog from the store (the source of truth)
+                self.cargar_productos()
+                self._remotos[1] = True
+                raise Conflicto(str(e))
+        elif self.escritor is None:
+            with medir(f"escribir_{clave}"):
+                funcion(datos)
+        else:
+            self.escritor.encolar(clave, funcion, datos, combinar, descripcion)
+
+    def cargar(self):
+        """Carga productos y ventas. Devuelve avisos para mostrar al usuario."""
+        return self.cargar_productos() + self.cargar_ventas()
+
+    @medido("cargar_productos")
+    def cargar_productos(self):
+        avisos = []
+        try:
+            productos = self.almacen.cargar_productos()
+        except Exception:
+            avisos.append(f"{DATA_FILE} corrupto. Iniciando inventario vacío.")
+            productos = []
+        # the stores return normalized products (the binary copy needs no per-field pass)
+        self.productos = productos
+        self.repo.cargar(productos)
+        self.indice_busqueda.invalidar(productos)
+        self.stock_bajo.cargar(productos)
+        self.version_catalogo += 1
+        return avisos + self.deshacer_precios.cargar()
+
+    @medido("cargar_ventas")
+    def cargar_ventas(self):
+        # JSON: snapshot ventas.json + replay del diario append-only
+        self.ventas_archivo = []
+        self._meses_archivo = set()
+        try:
+            ventas, avisos_diario = self.almacen.cargar_ventas()
+        except Exception:
+            self.ventas = []
+            self.indice_fechas.cargar(self.ventas)
+            self.clientes.cargar_archivo({})
+            return [f"{VENTAS_FILE} corrupto. Iniciando historial vacío."]
+        # old single-line records -> current format, as compact records
+        self.ventas = [Venta.desde(normalizar_venta(v)) for v in ventas]
+        del ventas  # the parsed dicts can go before the date index is built
+        self.indice_fechas.cargar(self.ventas)
+        try:
+            self.clientes.cargar_archivo(self.almacen.clientes_archivados())
+        except (OSError, ValueError):
+            self.clientes.cargar_archivo({})
+        avisos = []
+        if avisos_diario:
+            avisos.append("Diario de ventas recuperado:\n" + "\n".join(avisos_diario))
+        avisos.extend(self.almacen.avisos_archivo)
+        if self.almacen.necesita_compactar():
+            self.guardar_ventas()
+        return avisos
+
+    def guardar_productos(self, cambiados=None):
+        # cambiados: products touched (row-level write in SQLite); None = full save.
+        # Snapshot taken here; with a background writer bursts are merged.
+        self.version_catalogo += 1
+        inst = self.almacen.instantanea_productos(self.productos, cambiados)
+        self._encolar("productos", self.almacen.escribir_productos, inst, combinar_instantaneas, "No se pudo guardar productos")
+
+    def guardar_eliminacion(self, eliminados):
+        self.version_catalogo += 1
+        inst = self.almacen.instantanea_baja(self.productos, eliminados)
+        self._encolar("productos", self.almacen.escribir_productos, inst, combinar_instantaneas, "No se pudo guardar productos")
+
+    def guardar_ventas(self):
+        # reescritura completa (compactación): snapshot atómico + diario vacío
+        self._encolar("ventas", self.almacen.guardar_ventas, list(self.ventas), lambda a, b: b, "No se pudo guardar ventas")
+
+    def _persistir_venta(self, venta, cambiados):
+        # only the new sale + touched stock are written (one transaction in SQLite);
+        # self.ventas only grows, so ventas[:n] is the history as of this sale
+        inst = self.almacen.instantanea_productos(self.productos, cambiados)
+        datos = (venta, inst, self.ventas, len(self.ventas))
+        self._encolar("venta", lambda d: self.almacen.escribir_venta(*d), datos, descripcion="No se pudo guardar la venta")
+
+    def _guardar_deshacer(self):
+        path = self.deshacer_precios.path
+        self._encolar("deshacer", lambda d: escribir_json_atomico(path, d), self.deshacer_precios.datos(),
+                      lambda a, b: b, "No se pudo guardar el historial de precios")
+
+    def tomar_errores(self):
+        return self.escritor.tomar_errores() if self.escritor is not None else []
+
+    def cerrar(self, timeout=30):
+        """Vacía las escrituras pendientes y cierra el almacén. False si no terminó a tiempo."""
+        ok = self.escritor.detener(timeout) if self.escritor is not None else True
+        if ok:
+            if self.compartido:
+                self.almacen.liberar_reservas(self.caja)
+            self.almacen.cerrar()
+        return ok
+
+    # -------------------- Varias cajas --------------------
+    @medido("sincronizar")
+    def sincronizar(self):
+        """Aplica los cambios de las otras cajas (almacén compartido). Ver tomar_cambios_remotos."""
+        if not self.compartido:
+            return
+        actualizados, nuevos, bajas, ventas = self.almacen.sincronizar()
+        cambiados, lista, nuevas = self._remotos
+        for p, vals in actualizados:
+            if any(p[k] != vals[k] for k in ("articulo", "nombre", "marca")):
+                lista = True
+            self.repo.actualizar(p, **vals)
+            cambiados.append(p)
+        for p in nuevos:
+            self.repo.agregar(normalizar_producto(p))
+        for p in bajas:
+            self.repo.quitar(p)
+            self.stock_bajo.quitar(p)
+        self.stock_bajo.actualizar([p for p, _vals in actualizados] + nuevos)
+        if nuevos or bajas:
+            lista = True
+        for v in ventas:
+            v = Venta.desde(normalizar_venta(v))
+            self.ventas.append(v)
+            self.indice_fechas.agregar(v)
+            nuevas.append(v)
+        if bajas:
+            self.catalogo_cambiado()
+        elif actualizados or nuevos:
+            self.catalogo_cambiado([p for p, _vals in actualizados])
+        if actualizados or nuevos or bajas:
+            self.version_catalogo += 1
+        self._remotos[1] = lista
+
+    def tomar_cambios_remotos(self):
+        """(productos cambiados, catálogo cambió (altas/bajas/nombres), ventas nuevas) desde la última llamada."""
+        res = tuple(self._remotos)
+        self._remotos = [[], False, []]
+        return res
+
+    def renovar_reservas(self):
+        if self.compartido:
+            self.almacen.renovar_reservas(self.caja, RESERVA_SEGUNDOS)
+
+    def _reservar(self, p, cantidad):
+        if not self.compartido:
+            return
+        try:
+            self.almacen.reservar(p, cantidad, self.caja, RESERVA_SEGUNDOS)
+        except ConflictoVersion as e:
+            self.sincronizar()
+            raise StockInsuficiente(str(e))
+
+    def agregar_al_carrito(self, carrito, p, cantidad):
+        """carrito.agregar + reserva del total de la línea para las otras cajas."""
+        linea = carrito.get(p["articulo"])
+        antes = linea.cantidad if linea else 0
+        if cantidad > 0 and antes + cantidad <= p["stock"]:
+            self._reservar(p, antes + cantidad)
+        return carrito.agregar(p, cantidad)
+
+    def fijar_cantidad_carrito(self, carrito, articulo, cantidad):
+        p = self.repo.get(articulo)
+        if p is not None and 0 <= cantidad <= p["stock"]:
+            self._reservar(p, cantidad)
+        return carrito.fijar_cantidad(articulo, cantidad, p["stock"] if p else None)
+
+    def quitar_del_carrito(self, carrito, articulo):
+        linea = carrito.quitar(articulo)
+        p = self.repo.get(articulo)
+        if linea is not None and p is not None:
+            try:
+                self._reservar(p, 0)
+            except StockInsuficiente:
+                pass
+        return linea
+
+    def vaciar_carrito(self, carrito):
+        carrito.vaciar()
+        if self.compartido:
+            self.almacen.liberar_reservas(self.caja)
+
+    # -------------------- Inventario --------------------
+    def producto(self, articulo):
+        return self.repo.get(articulo)
+
+    def marcas(self):
+        return self.repo.marcas()
+
+    @medido("buscar")
+    def buscar(self, texto):
+        """(etiquetas 'articulo - nombre (marca)', total de coincidencias)."""
+        return self.indice_busqueda.buscar(texto)
+
+    def catalogo_cambiado(self, editados=None):
+        """Índice de búsqueda al día: editados (y altas al final) en el lugar;
+        sin editados (bajas, recarga), se reconstruye en la próxima búsqueda."""
+        if editados is None:
+            self.indice_busqueda.invalidar(self.productos)
+        else:
+            self.indice_busqueda.actualizar(editados)
+
+    def agregar_o_actualizar_producto(self, art, nombre, marca, precio, stock, minimo=None):
+        """Alta o edición por artículo. minimo: stock mínimo propio ("" = el general, None = no cambia).
+        Devuelve (producto, es_nuevo)."""
+        art = str(art).strip(); nombre = str(nombre).strip(); marca = str(marca).strip()
+        try:
+            precio = float(precio)
+            stock = int(stock)
+            if minimo is not None:
+                minimo = int(minimo) if str(minimo).strip() else ""
+        except (TypeError, ValueError):
+            raise ErrorNegocio("Precio, stock o mínimo inválidos.")
+        if not art or not nombre or not marca:
+            raise ErrorNegocio("Artículo, Nombre y Marca son obligatorios.")
+        # si existe artículo, actualizar
+        existing = self.repo.get(art)
+        if existing:
+            p = self.repo.actualizar(existing, nombre=nombre, marca=marca, precio=precio, stock=stock)
+        else:
+            p = self.repo.agregar({"articulo":art,"nombre":nombre,"marca":marca,"precio":precio,"stock":stock})
+        if minimo == "":
+            p.pop("minimo", None)
+        elif minimo is not None:
+            p["minimo"] = minimo
+        self.stock_bajo.actualizar([p])
+        self.guardar_productos([p])
+        self.catalogo_cambiado([p])
+        return p, existing is None
+
+    @medido("upsert_productos")
+    def upsert_productos(self, filas):
+        """Alta o actualización en lote (importación). filas: dicts parciales ya validados,
+        con 'articulo' y solo los campos a cambiar. Un solo guardado para todo el lote.
+        Devuelve (nuevos, actualizados, errores[(articulo, mensaje)])."""
+        nuevos = []; actualizados = []; errores = []
+        for f in filas:
+            cambios = {k: f[k] for k in ("nombre", "marca", "precio", "stock", "minimo") if k in f}
+            existing = self.repo.get(f["articulo"])
+            if existing:
+                if any(existing.get(k) != v for k, v in cambios.items()):
+                    actualizados.append(self.repo.actualizar(existing, **cambios))
+            elif not cambios.get("nombre") or not cambios.get("marca"):
+                errores.append((f["articulo"], "Artículo nuevo sin Nombre o Marca."))
+            else:
+                p = {"articulo": f["articulo"], "nombre": cambios["nombre"], "marca": cambios["marca"],
+                     "precio": float(cambios.get("precio", 0.0)), "stock": int(cambios.get("stock", 0))}
+                if "minimo" in cambios:
+                    p["minimo"] = cambios["minimo"]
+                nuevos.append(self.repo.agregar(p))
+        if nuevos or actualizados:
+            self.stock_bajo.actualizar(nuevos + actualizados)
+            self.guardar_productos(nuevos + actualizados)
+            self.catalogo_cambiado(actualizados)
+        return nuevos, actualizados, errores
+
+    def eliminar_producto(self, art):
+        eliminados = self.repo.eliminar(art)
+        for p in eliminados:
+            self.stock_bajo.quitar(p)
+        if eliminados:
+            self.guardar_eliminacion(eliminados)
+            self.catalogo_cambiado()
+        return eliminados
+
+    # -------------------- Precios en lote --------------------
+    def previsualizar_precios(self, filtro, pct=0.0, monto=0.0, redondear_a=0):
+        """Cambios que produciría el lote, sin aplicarlos."""
+        try:
+            return calcular_cambios(filtro.candidatos(self.repo), pct, monto, redondear_a)
+        except ValueError as e:
+            raise ErrorNegocio(str(e))
+
+    @medido("aplicar_cambios_precio")
+    def aplicar_cambios_precio(self, cambios, descripcion=""):
+        """Aplica una vista previa completa o nada (si algún precio cambió desde la vista previa).
+        Un solo guardado para el lote y una entrada en el registro de deshacer."""
+        viejos = [c for c in cambios if c.producto["precio"] != c.anterior]
+        if viejos:
+            raise Conflicto(f"{len(viejos)} precio(s) cambiaron desde la vista previa. Vuelva a calcularla.")
+        if not cambios:
+            return []
+        for c in cambios:
+            c.producto["precio"] = c.nuevo
+        productos = [c.producto for c in cambios]
+        try:
+            self.guardar_productos(productos)
+        except Exception:
+            for c in cambios:
+                c.producto["precio"] = c.anterior
+            raise
+        self.deshacer_precios.agregar(descripcion, cambios)
+        self._guardar_deshacer()
+        return productos
+
+    def deshacer_ultimo_cambio_precio(self):
+        """Revierte el último lote. Los productos editados después (o borrados) no se tocan.
+        Devuelve (lote, restaurados, omitidos). Si no se puede guardar, el lote queda para deshacer."""
+        lote = self.deshacer_precios.ultimo()
+        if lote is None:
+            raise ErrorNegocio("No hay cambios de precio para deshacer.")
+        restaurados = []; precios_lote = []; omitidos = 0
+        for art, anterior, nuevo in lote["cambios"]:
+            # artículos repetidos: el primero que todavía tiene el precio del lote
+            p = next((x for x in self.repo.todos(art) if x["precio"] == nuevo), None)
+            if p is not None:
+                p["precio"] = anterior
+                restaurados.append(p)
+                precios_lote.append(nuevo)
+            else:
+                omitidos += 1
+        if restaurados:
+            try:
+                self.guardar_productos(restaurados)
+            except Exception:
+                # memory back in line with the store; the batch stays in the undo log
+                for p, nuevo in zip(restaurados, precios_lote):
+                    p["precio"] = nuevo
+                raise
+        self.deshacer_precios.quitar_ultimo()
+        self._guardar_deshacer()
+        return lote, restaurados, omitidos
+
+    def sumar_stock(self, art, qty):
+        p = self.repo.get(art)
+        if not p:
+            raise ErrorNegocio("Producto no encontrado.")
+        if self.compartido:
+            # relative update: other registers' sales are not overwritten
+            try:
+                p["stock"] = self.almacen.ajustar_stock(p, qty)
+            except ConflictoVersion as e:
+                self.sincronizar()
+                raise Conflicto(str(e))
+            self.version_catalogo += 1
+            self.stock_bajo.actualizar([p])
+            return p
+        p["stock"] += int(qty)
+        self.stock_bajo.actualizar([p])
+        self.guardar_productos([p])
+        return p
+
+    # -------------------- Ventas --------------------
+    def validar_venta(self, carrito, cliente, dni):
+        if not str(cliente).strip():
+            raise ErrorNegocio("El nombre del cliente es obligatorio.")
+        if not str(dni).strip().isdigit():
+            raise ErrorNegocio("DNI inválido (solo números).")
+        for linea in carrito:
+            if linea.cantidad <= 0:
+                raise ErrorNegocio(f"Cantidad inválida para {linea.nombre}.")
+            # check stock again
+            p = self.repo.get(linea.articulo)
+            if not p or p['stock'] < linea.cantidad:
+                raise Conflicto(f"No hay stock suficiente para {linea.nombre}.")
+        if not len(carrito):
+            raise CarritoVacio("No hay productos para vender.")
+
+    @medido("registrar_venta")
+    def registrar_venta(self, carrito, cliente, dni, tel="", fecha=None):
+        """Valida, descuenta stock, registra y persiste la venta. Devuelve (venta, productos_cambiados)."""
+        self.validar_venta(carrito, cliente, dni)
+        venta = Venta(
+            fecha=(fecha or datetime.now()).strftime(FORMATO_FECHA),
+            cliente=str(cliente).strip(),
+            dni=str(dni).strip(),
+            tel=str(tel).strip(),
+            productos=carrito.items_venta(),
+            total=round(carrito.total, 2))
+        lineas = [(self.repo.get(l.articulo), l.cantidad) for l in carrito]
+        cambiados = [p for p, _q in lineas if p]
+        if self.compartido:
+            # the store checks availability and decrements inside the sale transaction
+            try:
+                stocks = self.almacen.confirmar_venta(venta, lineas, self.caja)
+            except ConflictoVersion as e:
+                self.sincronizar()
+                raise Conflicto(str(e))
+            for p in cambiados:
+                p['stock'] = stocks[id(p)]
+        else:
+            for p, cantidad in lineas:
+                if p:
+                    p['stock'] -= cantidad
+        self.version_catalogo += 1
+        self.stock_bajo.actualizar(cambiados)
+        self.ventas.append(venta)
+        self.indice_fechas.agregar(venta)
+        if not self.compartido:
+            self._persistir_venta(venta, cambiados)
+        return venta, cambiados
+
+    # -------------------- Reportes --------------------
+    @medido("cargar_periodo")
+    def cargar_periodo(self, desde=None, hasta=None):
+        """Trae los meses archivados con ventas entre desde y hasta (date, None = sin límite) que falten."""
+        return self.cargar_meses(self.almacen.meses_archivados(desde, hasta))
+
+    def cargar_meses(self, meses):
+        faltan = [m for m in meses if m not in self._meses_archivo]
+        if not faltan:
+            return 0
+        nuevas = []
+        for mes in faltan:
+            try:
+                nuevas.extend(self.almacen.leer_mes(mes))
+            except (OSError, ValueError, KeyError) as e:
+                raise ErrorNegocio(f"No se pudo leer el mes archivado {mes}: {e}")
+        self._meses_archivo.update(faltan)
+        self.ventas_archivo.extend(nuevas)
+        return self.indice_fechas.incorporar(nuevas)
+
+    @medido("reporte")
+    def reporte(self, desde, hasta):
+        """Ventas entre dos fechas (date, inclusive) y totales del período."""
+        self.cargar_periodo(desde, hasta)
+        ventas = self.indice_fechas.rango(desde, hasta)
+        return ventas, self.indice_fechas.totales(desde, hasta)
+
+    @medido("analisis")
+    def analisis(self, desde=None, hasta=None):
+        """Columnas de análisis al día: solo se agregan las ventas nuevas desde la última consulta
+        (y los meses archivados del rango, la primera vez que se piden)."""
+        self.cargar_periodo(desde, hasta)
+        return self.analitica.sincronizar(self.ventas_archivo, self.ventas)
+
+    # -------------------- Clientes --------------------
+    def cliente(self, dni):
+        """Cliente registrado (clientes.Cliente) o None. El índice se pone al día con las ventas nuevas."""
+        return self.clientes.sincronizar(self.ventas).get(dni)
+
+    def buscar_clientes(self, texto):
+        return self.clientes.sincronizar(self.ventas).buscar(texto)
+
+    def historial_cliente(self, dni):
+        """Compras del cliente, la más reciente primero, incluidas las de meses archivados."""
+        c = self.cliente(dni)
+        if c is None:
+            return []
+        self.cargar_meses(c.meses)
+        viejas = [v for v in self.ventas_archivo if str(v.dni or "").strip() == c.dni] if c.meses else []
+        return sorted(viejas + c.ventas, key=lambda v: clave_fecha(v) or (0, 0), reverse=True)
+
+
+class CargaEnSegundoPlano(threading.Thread):
+    """motor.cargar() en un hilo, más el índice de búsqueda y preparar() (filas de las tablas, por ejemplo).
+    Atributos para la UI (consultados con after()): terminado, avisos, error, preparado.
+    Mientras no termine, el hilo de la UI no debe tocar el motor."""
+
+    def __init__(self, motor, preparar=None):
+        super().__init__(name="encanto-carga", daemon=True)
+        self.motor = motor
+        self.preparar = preparar
+        self.avisos = []
+        self.preparado = None
+        self.error = None
+        self.terminado = False
+
+    def run(self):
+        try:
+            with medir("carga_inicial"):
+                self.avisos = self.motor.cargar()
+                self.motor.buscar("")  # the first search would build the index on the Tk thread
+                if self.preparar is not None:
+                    self.preparado = self.preparar()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.terminado = True
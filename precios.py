@@ -0,0 +1,140 @@
+"""
+precios.py
+Cambios de precio en lote: filtro -> vista previa -> aplicar -> deshacer.
+
+- FiltroPrecios combina marca, prefijo de artículo, patrón de nombre y rango
+  de stock. Arranca del índice más angosto del repositorio (marca o prefijo)
+  y aplica el resto de las condiciones en una sola pasada.
+- calcular_cambios arma la lista de CambioPrecio sin tocar ningún producto:
+  es lo que muestra la vista previa.
+- MotorEncanto.aplicar_cambios_precio aplica todo o nada y guarda el lote en
+  una sola escritura; cada lote queda en el registro de deshacer
+  (precios_deshacer.json, en la carpeta de los datos: el mismo para todas
+  las cajas de un almacén compartido) para poder revertirlo después.
+"""
+
+import fnmatch, json, os
+from datetime import datetime
+
+from busqueda import normalizar
+
+DESHACER_FILE = "precios_deshacer.json"
+MAX_DESHACER = 20  # lotes que se conservan para deshacer
+
+
+class FiltroPrecios:
+    __slots__ = ("marca", "prefijo", "patron", "stock_min", "stock_max")
+
+    def __init__(self, marca="", prefijo="", patron="", stock_min=None, stock_max=None):
+        self.marca = str(marca or "").strip()
+        self.prefijo = str(prefijo or "").strip()
+        self.patron = str(patron or "").strip()
+        self.stock_min = stock_min
+        self.stock_max = stock_max
+
+    def _coincide_nombre(self):
+        if not self.patron:
+            return None
+        patron = normalizar(self.patron)
+        if any(c in patron for c in "*?["):
+            return lambda p: fnmatch.fnmatchcase(normalizar(p["nombre"]), patron)
+        return lambda p: patron in normalizar(p["nombre"])
+
+    def candidatos(self, repo):
+        """Productos del repositorio que cumplen todas las condiciones (orden de la lista)."""
+        if self.marca:
+            base = repo.por_marca(self.marca)
+        elif self.prefijo:
+            base = repo.por_prefijo(self.prefijo)
+        else:
+            base = repo.productos
+        prefijo = self.prefijo; smin = self.stock_min; smax = self.stock_max
+        nombre = self._coincide_nombre()
+        res = []
+        for p in base:
+            if prefijo and not p["articulo"].startswith(prefijo): continue
+            if smin is not None and p["stock"] < smin: continue
+            if smax is not None and p["stock"] > smax: continue
+            if nombre is not None and not nombre(p): continue
+            res.append(p)
+        return res
+
+    def describir(self):
+        partes = []
+        if self.marca: partes.append(f"marca {self.marca}")
+        if self.prefijo: partes.append(f"artículo {self.prefijo}*")
+        if self.patron: partes.append(f"nombre '{self.patron}'")
+        if self.stock_min is not None: partes.append(f"stock >= {self.stock_min}")
+        if self.stock_max is not None: partes.append(f"stock <= {self.stock_max}")
+        return ", ".join(partes) or "todo el catálogo"
+
+
+class CambioPrecio:
+    __slots__ = ("producto", "anterior", "nuevo")
+
+    def __init__(self, producto, anterior, nuevo):
+        self.producto = producto
+        self.anterior = anterior
+        self.nuevo = nuevo
+
+    @property
+    def diferencia(self):
+        return round(self.nuevo - self.anterior, 2)
+
+
+def nuevo_precio(precio, pct=0.0, monto=0.0, redondear_a=0):
+    """Precio con porcentaje y monto fijo aplicados; redondear_a (p.ej. 50) redondea al múltiplo más cercano."""
+    nuevo = precio*(1.0 + pct/100.0) + monto
+    if redondear_a:
+        nuevo = round(nuevo / redondear_a) * redondear_a
+    return round(nuevo, 2)
+
+
+def calcular_cambios(productos, pct=0.0, monto=0.0, redondear_a=0):
+    """Lista de CambioPrecio (solo los que cambian). Lanza ValueError si algún precio queda negativo."""
+    cambios = []
+    for p in productos:
+        nuevo = nuevo_precio(p["precio"], pct, monto, redondear_a)
+        if nuevo < 0:
+            raise ValueError(f"El precio de {p['articulo']} quedaría negativo ({nuevo:.2f}).")
+        if nuevo != p["precio"]:
+            cambios.append(CambioPrecio(p, p["precio"], nuevo))
+    return cambios
+
+
+class RegistroDeshacer:
+    """Lotes aplicados, del más viejo al más nuevo: {"fecha", "descripcion", "cambios": [[art, anterior, nuevo]]}."""
+
+    def __init__(self, path=DESHACER_FILE, maximo=MAX_DESHACER):
+        self.path = path
+        self.maximo = maximo
+        self.lotes = []
+
+    def cargar(self):
+        self.lotes = []
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.lotes = list(json.load(f))[-self.maximo:]
+            except Exception:
+                self.lotes = []
+                return [f"{self.path} corrupto. Historial de cambios de precio vacío."]
+        return []
+
+    def agregar(self, descripcion, cambios):
+        self.lotes.append({
+            "fecha": datetime.now().strftime("%d/%m/%Y %H:%M"),
+            "descripcion": descripcion,
+            "cambios": [[c.producto["articulo"], c.anterior, c.nuevo] for c in cambios],
+        })
+        del self.lotes[:-self.maximo]
+
+    def ultimo(self):
+        return self.lotes[-1] if self.lotes else None
+
+    def quitar_ultimo(self):
+        return self.lotes.pop() if self.lotes else None
+
+    def datos(self):
+        # copia para el hilo de guardado
+        return list(self.lotes)
@@ -0,0 +1,111 @@
+"""
+reportes.py
+Armado del reporte por rango de fechas (sin Tkinter).
+
+- Líneas planas (una por artículo vendido) a partir de las ventas filtradas.
+- Orden por fecha, cliente, marca, artículo o importe.
+- Agrupado por día, marca, artículo o cliente (unidades, importe, líneas).
+- Texto en bloques: la ventana lo va insertando de a partes con after()
+  en lugar de hacer un insert por línea antes de mostrarse.
+"""
+
+from itertools import islice
+
+ORDENES = {
+    "Fecha": None,  # las ventas ya vienen en orden cronológico
+    "Cliente": lambda l: (l.cliente.lower(), l.pos),
+    "Marca": lambda l: (l.marca.lower(), l.pos),
+    "Artículo": lambda l: (l.articulo, l.pos),
+    "Importe (mayor primero)": lambda l: (-l.total, l.pos),
+}
+
+AGRUPACIONES = {
+    "(ninguno)": None,
+    "Día": lambda l: l.fecha[:10],
+    "Marca": lambda l: l.marca,
+    "Artículo": lambda l: f"{l.articulo} - {l.nombre}",
+    "Cliente": lambda l: f"{l.cliente} ({l.dni})" if l.dni else l.cliente,
+}
+
+ENCABEZADO = f"{'Fecha':20} {'Cliente':20} {'DNI':10} {'Tel':12} {'Artículo':10} {'Producto':25} {'Marca':12} {'Cant':4} {'Total $':8}\n"
+SEPARADOR = "-"*140 + "\n"
+
+
+class LineaReporte:
+    __slots__ = ("pos", "fecha", "cliente", "dni", "tel", "articulo", "nombre", "marca", "cantidad", "total")
+
+    def __init__(self, pos, v, prod):
+        self.pos = pos
+        self.fecha = v.get("fecha","")
+        self.cliente = v.get("cliente","")
+        self.dni = v.get("dni","")
+        self.tel = v.get("tel","")
+        self.articulo = prod["articulo"]
+        self.nombre = prod["nombre"]
+        self.marca = prod["marca"]
+        self.cantidad = prod["cantidad"]
+        self.total = prod["precio"]*prod["cantidad"]
+
+    def texto(self):
+        return f"{self.fecha:20} {self.cliente[:20]:20} {self.dni:10} {self.tel:12} {self.articulo:10} {self.nombre[:25]:25} {self.marca[:12]:12} {self.cantidad:4} ${self.total:8.2f}\n"
+
+
+def lineas_reporte(ventas):
+    lineas = []
+    for v in ventas:
+        for prod in v.get("productos", []):
+            lineas.append(LineaReporte(len(lineas), v, prod))
+    return lineas
+
+
+def ordenar(lineas, orden):
+    clave = ORDENES.get(orden)
+    return lineas if clave is None else sorted(lineas, key=clave)
+
+
+def agrupar(lineas, por):
+    """[(grupo, unidades, importe, n_lineas)] ordenado por grupo (día) o por importe."""
+    clave = AGRUPACIONES.get(por)
+    if clave is None:
+        return []
+    grupos = {}
+    for l in lineas:
+        g = clave(l)
+        acc = grupos.get(g)
+        if acc is None:
+            grupos[g] = [l.cantidad, l.total, 1]
+        else:
+            acc[0] += l.cantidad; acc[1] += l.total; acc[2] += 1
+    filas = [(g, u, t, n) for g, (u, t, n) in grupos.items()]
+    if por == "Día":
+        filas.sort(key=lambda f: (f[0][6:10], f[0][3:5], f[0][0:2]))  # dd/mm/yyyy
+    else:
+        filas.sort(key=lambda f: -f[2])
+    return filas
+
+
+def texto_resumen(fi, ff, totales):
+    return (f"Reporte {fi} -> {ff}\n"
+            f"Ventas: {totales['ventas']}   Unidades: {totales['unidades']}   "
+            f"Ganancia total periodo: ${totales['ingresos']:.2f}\n\n")
+
+
+def bloques_texto(lineas, por=None, tam_bloque=500):
+    """Genera el cuerpo del reporte en bloques de texto (tam_bloque líneas por bloque)."""
+    grupos = agrupar(lineas, por) if por else []
+    if grupos:
+        yield f"{por:40} {'Unid.':>8} {'Líneas':>8} {'Total $':>14}\n" + SEPARADOR
+        it = iter(grupos)
+        while True:
+            bloque = list(islice(it, tam_bloque))
+            if not bloque:
+                break
+            yield "".join(f"{str(g)[:40]:40} {u:8} {n:8} ${t:13.2f}\n" for g, u, t, n in bloque)
+        yield "\n"
+    yield ENCABEZADO + SEPARADOR
+    it = iter(lineas)
+    while True:
+        bloque = list(islice(it, tam_bloque))
+        if not bloque:
+            break
+        yield "".join(l.texto() for l in bloque)
@@ -0,0 +1,147 @@
+"""
+repositorio.py
+Repositorio de productos con índices hash.
+
+- Índice principal por artículo: búsqueda O(1) en lugar de recorrer la lista.
+- Índice secundario por marca (sin distinguir mayúsculas).
+- La lista original se conserva (orden de carga y formato de productos.json);
+  los índices se mantienen sincronizados en altas, bajas y ediciones.
+- Si hay artículos repetidos (datos viejos), get() devuelve el primero,
+  igual que el `next(...)` que reemplaza.
+- Búsqueda por prefijo de artículo con una lista ordenada de claves que se
+  arma sola la primera vez que se pide (y se descarta en altas/bajas).
+- Las altas se guardan como compacto.Producto (vista de dict con __slots__).
+"""
+
+from bisect import bisect_left
+
+from compacto import Producto
+
+
+def _clave_marca(marca):
+    return str(marca or "").strip().lower()
+
+
+class RepositorioProductos:
+    def __init__(self, productos=None):
+        self.productos = []
+        self._por_articulo = {}   # articulo -> [productos] (orden de la lista)
+        self._por_marca = {}      # marca.lower() -> {id(p): p}
+        self._nombres_marca = {}  # marca.lower() -> {marca original: cantidad}
+        self._articulos = None    # claves de _por_articulo ordenadas (lazy)
+        self.cargar(productos if productos is not None else [])
+
+    # -------------------- Carga --------------------
+    def cargar(self, productos):
+        """Reemplaza el contenido y reconstruye los índices (misma lista, sin copiar)."""
+        self.productos = productos
+        self._por_articulo = {}
+        self._por_marca = {}
+        self._nombres_marca = {}
+        self._articulos = None
+        for p in productos:
+            self._indexar(p)
+
+    def _indexar(self, p):
+        if p["articulo"] not in self._por_articulo:
+            self._articulos = None
+        self._por_articulo.setdefault(p["articulo"], []).append(p)
+        marca = p.get("marca", "")
+        k = _clave_marca(marca)
+        self._por_marca.setdefault(k, {})[id(p)] = p
+        nombres = self._nombres_marca.setdefault(k, {})
+        nombres[marca] = nombres.get(marca, 0) + 1
+
+    def _desindexar(self, p):
+        lst = self._por_articulo.get(p["articulo"], [])
+        lst[:] = [x for x in lst if x is not p]
+        if not lst:
+            self._por_articulo.pop(p["articulo"], None)
+            self._articulos = None
+        marca = p.get("marca", "")
+        k = _clave_marca(marca)
+        grupo = self._por_marca.get(k, {})
+        grupo.pop(id(p), None)
+        if not grupo:
+            self._por_marca.pop(k, None)
+        nombres = self._nombres_marca.get(k, {})
+        if marca in nombres:
+            nombres[marca] -= 1
+            if nombres[marca] <= 0:
+                del nombres[marca]
+        if not nombres:
+            self._nombres_marca.pop(k, None)
+
+    # -------------------- Consultas --------------------
+    def __iter__(self):
+        return iter(self.productos)
+
+    def __len__(self):
+        return len(self.productos)
+
+    def __contains__(self, articulo):
+        return articulo in self._por_articulo
+
+    def get(self, articulo):
+        lst = self._por_articulo.get(articulo)
+        return lst[0] if lst else None
+
+    def todos(self, articulo):
+        """Todos los productos con ese artículo (más de uno solo en datos viejos)."""
+        return list(self._por_articulo.get(articulo, ()))
+
+    def por_marca(self, marca):
+        """Productos de una marca (comparación sin mayúsculas), en orden de la lista."""
+        grupo = self._por_marca.get(_clave_marca(marca), {})
+        return list(grupo.values())
+
+    def por_prefijo(self, prefijo):
+        """Productos cuyo artículo empieza con prefijo (bisect sobre las claves ordenadas)."""
+        if self._articulos is None:
+            self._articulos = sorted(self._por_articulo)
+        claves = self._articulos
+        res = []
+        i = bisect_left(claves, prefijo)
+        while i < len(claves) and claves[i].startswith(prefijo):
+            res.extend(self._por_articulo[claves[i]])
+            i += 1
+        return res
+
+    def marcas(self):
+        """Nombres de marca distintos (como fueron cargados), ordenados."""
+        return sorted(m for nombres in self._nombres_marca.values() for m in nombres if m)
+
+    # -------------------- Altas / bajas / ediciones --------------------
+    def agregar(self, p):
+        p = Producto.desde(p)
+        self.productos.append(p)
+        self._indexar(p)
+        return p
+
+    def actualizar(self, p, **cambios):
+        """Modifica campos de un producto manteniendo los índices al día."""
+        reindexar = any(k in cambios and cambios[k] != p.get(k) for k in ("articulo", "marca"))
+        if reindexar:
+            self._desindexar(p)
+        p.update(cambios)
+        if reindexar:
+            self._indexar(p)
+        return p
+
+    def quitar(self, p):
+        """Quita ese producto (por identidad), aunque haya otros con el mismo artículo."""
+        self._desindexar(p)
+        self.productos[:] = [x for x in self.productos if x is not p]
+
+    def eliminar(self, articulo):
+        """Elimina todos los productos con ese artículo. Devuelve la lista de eliminados."""
+        lst = self._por_articulo.get(articulo)
+        if not lst:
+            return []
+        eliminados = list(lst)
+        quitar = {id(p) for p in eliminados}
+        for p in eliminados:
+            self._desindexar(p)
+        # in-place: quien tenga referencia a la lista ve el cambio
+        self.productos[:] = [p for p in self.productos if id(p) not in quitar]
+        return eliminados
@@ -0,0 +1,437 @@
+"""
+servidor_api.py
+API HTTP/JSON local (opcional) sobre MotorEncanto.
+
+Endpoints:
+    GET  /                                                (index.html: el catálogo de la tienda)
+    GET  /api/salud
+    GET  /api/marcas
+    GET  /api/productos?q=&marca=&pagina=1&por_pagina=50   (ETag / If-None-Match)
+    GET  /api/productos/<articulo>                        (ETag / If-None-Match)
+    GET  /api/stock?articulos=A,B,C
+    POST /api/ventas   {"cliente", "dni", "tel", "productos": [{"articulo", "cantidad"}]}
+
+- Pool fijo de hilos para atender pedidos (ServidorAPI).
+- Todo acceso al motor pasa por un ejecutor: con la UI abierta las
+  operaciones corren en el hilo de Tk (EjecutorTk); sin UI, en serie con un
+  lock (EjecutorLocal). El motor no se toca desde dos hilos a la vez.
+- El ETag del catálogo es la versión del motor (version_catalogo): la
+  página o las otras cajas consultan seguido y reciben 304 sin cuerpo
+  mientras nada cambie. Las búsquedas filtradas se cachean por versión.
+- Los precios de una venta salen del catálogo, nunca del pedido.
+- 409 para nucleo.Conflicto (stock o cambios de otra caja), 400 para el
+  resto de ErrorNegocio. 503 si la caja no llegó a atender el pedido: se
+  cancela sin correr, así que reintentar no duplica la venta.
+- CORS solo para los orígenes de ENCANTO_API_ORIGEN (separados por coma);
+  por defecto, el del propio servidor (la página se sirve en /).
+- POST exige "Content-Type: application/json" (un navegador no lo manda
+  desde otra página sin preflight) y rechaza orígenes no permitidos. Si
+  ENCANTO_API_TOKEN está definido, exige además "Authorization: Bearer <token>".
+
+Uso:
+    python servidor_api.py [--host 127.0.0.1] [--puerto 8765]
+    ENCANTO_API=8765 python ENCANTO.py        # dentro de la caja
+"""
+
+import argparse, json, os, queue, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from busqueda import normalizar
+from carrito import Carrito, StockInsuficiente
+from compacto import a_json
+from nucleo import MotorEncanto, ErrorNegocio, Conflicto
+
+PUERTO = 8765
+HILOS = 8
+POR_PAGINA = 50
+MAX_POR_PAGINA = 500
+MAX_CUERPO = 1 << 20  # bytes aceptados en un POST
+PAGINA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index.html")
+SINCRONIZAR_SEG = 1.0  # standalone + almacén compartido: cambios de las cajas
+
+
+class ErrorAPI(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# -------------------- Ejecutores --------------------
+class EjecutorLocal:
+    """Sin UI: las llamadas al motor se serializan con un lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __call__(self, fn):
+        with self._lock:
+            return fn()
+
+
+class _Llamada:
+    __slots__ = ("fn", "ok", "valor", "listo", "iniciada", "cancelada")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.ok = False
+        self.valor = None
+        self.listo = threading.Event()
+        self.iniciada = False
+        self.cancelada = False
+
+
+class EjecutorTk:
+    """Con UI: la llamada se encola y la corre el hilo de Tk (after); el hilo del pedido espera.
+    Si vence el timeout antes de que empiece, se cancela (nunca corre); si ya empezó, se espera."""
+
+    def __init__(self, root, intervalo_ms=20, timeout=10):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self.timeout = timeout
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        root.after(intervalo_ms, self._atender)
+
+    def _atender(self):
+        while True:
+            try:
+                llamada = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                if llamada.cancelada:
+                    continue  # the client already got a 503
+                llamada.iniciada = True
+            try:
+                llamada.valor = llamada.fn()
+                llamada.ok = True
+            except BaseException as e:
+                llamada.valor = e
+            llamada.listo.set()
+        self.root.after(self.intervalo_ms, self._atender)
+
+    def __call__(self, fn):
+        llamada = _Llamada(fn)
+        self._cola.put(llamada)
+        if not llamada.listo.wait(self.timeout):
+            with self._lock:
+                if not llamada.iniciada:
+                    llamada.cancelada = True
+                    # never ran: retrying cannot record a sale twice
+                    raise ErrorAPI(503, "La caja está ocupada, intente de nuevo.")
+            llamada.listo.wait()
+        if not llamada.ok:
+            raise llamada.valor
+        return llamada.valor
+
+
+# -------------------- Lógica de la API (sin HTTP) --------------------
+def _producto_json(p):
+    return {"articulo": p["articulo"], "nombre": p["nombre"], "marca": p["marca"],
+            "precio": p["precio"], "stock": p["stock"]}
+
+
+class API:
+    def __init__(self, motor, ejecutar=None, al_vender=None, cache=64):
+        self.motor = motor
+        self.ejecutar = ejecutar or EjecutorLocal()
+        self.al_vender = al_vender  # (venta, cambiados), en el hilo del ejecutor (UI)
+        self.inicio = f"{int(time.time()):x}"  # a restart never reuses an ETag
+        self._cache = OrderedDict()  # (version, q, marca) -> productos filtrados
+        self._cache_max = cache
+        self._ultima_sync = 0.0
+
+    def etag(self):
+        return f'W/"{self.inicio}-{self.motor.version_catalogo}"'
+
+    def necesita_sincronizar(self):
+        # standalone server on a shared store: the other registers' changes are pulled here
+        return self.motor.compartido and self.al_vender is None
+
+    def responder(self, fn, si_no_coincide=None):
+        """Corre fn() en el ejecutor; 304 si el ETag del cliente sigue vigente."""
+        if self.necesita_sincronizar() and time.monotonic() - self._ultima_sync > SINCRONIZAR_SEG:
+            self._ultima_sync = time.monotonic()
+            self.motor.sincronizar()
+            self.motor.tomar_cambios_remotos()
+        if si_no_coincide and si_no_coincide == self.etag():
+            return 304, None, si_no_coincide
+        return fn()
+
+    def _filtrar(self, q, marca):
+        clave = (self.motor.version_catalogo, q, marca.lower())
+        res = self._cache.get(clave)
+        if res is not None:
+            self._cache.move_to_end(clave)
+            return res
+        base = self.motor.repo.por_marca(marca) if marca else self.motor.productos
+        if q:
+            t = normalizar(q)
+            res = [p for p in base if t in normalizar(p["articulo"] + " " + p["nombre"] + " " + p["marca"])]
+        else:
+            res = list(base)
+        self._cache[clave] = res
+        if len(self._cache) > self._cache_max:
+            self._cache.popitem(last=False)
+        return res
+
+    # each method returns (status, body, etag or None); runs inside the executor (see responder)
+    def salud(self, params):
+        return 200, {"ok": True, "productos": len(self.motor.productos), "ventas": len(self.motor.ventas),
+                     "version": self.motor.version_catalogo, "compartido": self.motor.compartido}, None
+
+    def marcas(self, params):
+        return 200, {"marcas": self.motor.marcas()}, self.etag()
+
+    def productos(self, params):
+        try:
+            pagina = max(1, int(params.get("pagina", 1)))
+            por_pagina = min(MAX_POR_PAGINA, max(1, int(params.get("por_pagina", POR_PAGINA))))
+        except ValueError:
+            raise ErrorAPI(400, "pagina y por_pagina deben ser números.")
+        filtrados = self._filtrar(params.get("q", "").strip(), params.get("marca", "").strip())
+        total = len(filtrados)
+        desde = (pagina - 1) * por_pagina
+        return 200, {
+            "total": total, "pagina": pagina, "por_pagina": por_pagina,
+            "paginas": (total + por_pagina - 1) // por_pagina,
+            "productos": [_producto_json(p) for p in filtrados[desde:desde + por_pagina]],
+        }, self.etag()
+
+    def producto(self, params, articulo):
+        p = self.motor.producto(articulo)
+        if p is None:
+            raise ErrorAPI(404, f"Artículo {articulo} no encontrado.")
+        return 200, _producto_json(p), self.etag()
+
+    def stock(self, params):
+        arts = [a.strip() for a in params.get("articulos", "").split(",") if a.strip()]
+        if not arts:
+            raise ErrorAPI(400, "Indique articulos=A,B,C.")
+        res = {}
+        for a in arts[:MAX_POR_PAGINA]:
+            p = self.motor.producto(a)
+            res[a] = p["stock"] if p else None
+        return 200, {"stock": res}, self.etag()
+
+    def registrar_venta(self, datos):
+        if not isinstance(datos, dict) or not isinstance(datos.get("productos"), list):
+            raise ErrorAPI(400, "Se espera {cliente, dni, tel, productos: [{articulo, cantidad}]}.")
+        carrito = Carrito()
+        try:
+            for it in datos["productos"]:
+                art = str(it.get("articulo", "")).strip()
+                p = self.motor.producto(art)
+                if p is None:
+                    raise ErrorAPI(404, f"Artículo {art} no encontrado.")
+                # no reservation: the sale is confirmed right away (and checked by the engine)
+                carrito.agregar(p, int(it.get("cantidad", 0)))
+            venta, cambiados = self.motor.registrar_venta(
+                carrito, datos.get("cliente", ""), datos.get("dni", ""), datos.get("tel", ""))
+        except StockInsuficiente as e:
+            raise ErrorAPI(409, str(e))
+        except Conflicto as e:
+            raise ErrorAPI(409, str(e))
+        except ErrorNegocio as e:
+            raise ErrorAPI(400, str(e))
+        except (TypeError, ValueError, AttributeError):
+            raise ErrorAPI(400, "Cantidad inválida.")
+        if self.al_vender is not None:
+            self.al_vender(venta, cambiados)
+        return 201, {"venta": venta}, None
+
+
+# -------------------- HTTP --------------------
+class Manejador(BaseHTTPRequestHandler):
+    server_version = "EncantoAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    timeout = 5  # idle keep-alive connections give their pool thread back
+
+    def log_message(self, formato, *args):
+        pass  # sin ruido en la consola de la caja
+
+    def _origen_permitido(self):
+        origen = self.headers.get("Origin")
+        return origen if origen in self.server.origenes else None
+
+    def _cors(self):
+        origen = self._origen_permitido()
+        if origen:
+            self.send_header("Access-Control-Allow-Origin", origen)
+            self.send_header("Access-Control-Expose-Headers", "ETag")
+        self.send_header("Vary", "Origin")
+
+    def _enviar(self, estado, cuerpo=None, etag=None, datos=None, tipo="application/json; charset=utf-8"):
+        if datos is None:
+            datos = b"" if cuerpo is None else json.dumps(cuerpo, ensure_ascii=False, default=a_json).encode("utf-8")
+        self.send_response(estado)
+        self._cors()
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # revalidate each time (cheap 304)
+        if datos:
+            self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        if datos and self.command != "HEAD":
+            self.wfile.write(datos)
+
+    def _error(self, estado, mensaje):
+        self._enviar(estado, {"error": mensaje})
+
+    def _ruta(self):
+        partes = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        return partes.path.rstrip("/") or "/", params
+
+    def do_OPTIONS(self):
+        # preflight: only the allowed origins get the CORS headers (the browser blocks the rest)
+        self.send_response(204)
+        self._cors()
+        if self._origen_permitido():
+            self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization, If-None-Match")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        api = self.server.api
+        ruta, params = self._ruta()
+        if ruta in ("/", "/index.html"):
+            try:
+                with open(PAGINA, "rb") as f:
+                    return self._enviar(200, datos=f.read(), tipo="text/html; charset=utf-8")
+            except OSError:
+                return self._error(404, "index.html no encontrado.")
+        if ruta == "/api/salud":
+            fn = lambda: api.salud(params)
+        elif ruta == "/api/marcas":
+            fn = lambda: api.marcas(params)
+        elif ruta == "/api/productos":
+            fn = lambda: api.productos(params)
+        elif ruta.startswith("/api/productos/"):
+            art = unquote(ruta[len("/api/productos/"):])
+            fn = lambda: api.producto(params, art)
+        elif ruta == "/api/stock":
+            fn = lambda: api.stock(params)
+        else:
+            return self._error(404, "Ruta desconocida.")
+        # conditional GET: ETag = catalog version, no body if unchanged
+        etag = self.headers.get("If-None-Match")
+        if etag and not api.necesita_sincronizar() and etag == api.etag():
+            return self._enviar(304, etag=etag)  # fast path, no trip to the engine thread
+        try:
+            estado, cuerpo, etag = api.ejecutar(lambda: api.responder(fn, etag))
+        except ErrorAPI as e:
+            return self._error(e.estado, str(e))
+        except Exception as e:
+            return self._error(500, str(e))
+        self._enviar(estado, cuerpo, etag)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        api = self.server.api
+        ruta, _params = self._ruta()
+        if ruta != "/api/ventas":
+            return self._error(404, "Ruta desconocida.")
+        # another web page open in the register's browser must not be able to sell
+        if self.headers.get("Origin") is not None and not self._origen_permitido():
+            return self._error(403, "Origen no permitido.")
+        tipo = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if tipo != "application/json":
+            return self._error(415, "Se espera Content-Type: application/json.")
+        token = self.server.token
+        if token and self.headers.get("Authorization", "") != f"Bearer {token}":
+            return self._error(401, "Token inválido.")
+        try:
+            largo = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            largo = -1
+        if largo < 0 or largo > MAX_CUERPO:
+            return self._error(413, "Pedido demasiado grande.")
+        try:
+            datos = json.loads(self.rfile.read(largo).decode("utf-8") or "null")
+        except (UnicodeDecodeError, ValueError):
+            return self._error(400, "JSON inválido.")
+        try:
+            estado, cuerpo, _etag = api.ejecutar(lambda: api.responder(lambda: api.registrar_venta(datos)))
+        except ErrorAPI as e:
+            return self._error(e.estado, str(e))
+        except Exception as e:
+            return self._error(500, str(e))
+        self._enviar(estado, cuerpo)
+
+
+class ServidorAPI(HTTPServer):
+    """HTTPServer con un pool fijo de hilos (en lugar de un hilo por conexión)."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, api, host="127.0.0.1", puerto=PUERTO, hilos=HILOS, token=None, origenes=None):
+        super().__init__((host, puerto), Manejador)
+        self.api = api
+        self.token = token if token is not None else os.environ.get("ENCANTO_API_TOKEN") or None
+        if origenes is None:
+            origenes = [o.strip() for o in os.environ.get("ENCANTO_API_ORIGEN", "").split(",") if o.strip()]
+        if not origenes:
+            # the server's own origin (index.html served at /)
+            puerto = self.server_address[1]
+            origenes = [f"http://127.0.0.1:{puerto}", f"http://localhost:{puerto}"]
+            if host not in ("", "0.0.0.0", "127.0.0.1", "localhost"):
+                origenes.append(f"http://{host}:{puerto}")
+        self.origenes = set(origenes)
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="encanto-api")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def iniciar(self):
+        """Atiende en un hilo aparte (para usar junto con la UI)."""
+        hilo = threading.Thread(target=self.serve_forever, name="encanto-api", daemon=True)
+        hilo.start()
+        return hilo
+
+    def detener(self):
+        self.shutdown()
+        self.server_close()
+        self._pool.shutdown(wait=False)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="API HTTP/JSON local de ENCANTO")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=PUERTO)
+    ap.add_argument("--hilos", type=int, default=HILOS)
+    args = ap.parse_args(argv)
+    motor = MotorEncanto()
+    try:
+        motor.bloquear()
+    except ErrorNegocio as e:
+        raise SystemExit(str(e))
+    for aviso in motor.cargar():
+        print(aviso)
+    servidor = ServidorAPI(API(motor), args.host, args.puerto, args.hilos)
+    print(f"API de ENCANTO en http://{args.host}:{args.puerto}/api/productos (tienda en http://{args.host}:{args.puerto}/)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        motor.cerrar()
+
+
+if __name__ == "__main__":
+    main()
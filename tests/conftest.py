@@ -0,0 +1,6 @@
+import os, sys
+
+# the modules live at the repository root (flat layout)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# no slow-operation log in the working directory while testing
+os.environ.setdefault("ENCANTO_METRICAS", "0")
@@ -0,0 +1,78 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from agregados import IndiceVentasPorFecha, clave_fecha
+from compacto import Venta
+
+
+def venta(fecha, *lineas):
+    return {"fecha": fecha, "cliente": "c", "dni": "1",
+            "productos": [{"articulo": a, "nombre": a, "marca": m, "cantidad": c, "precio": p} for a, m, c, p in lineas]}
+
+
+def azar(n=300, seed=5):
+    r = random.Random(seed)
+    res = []
+    for _ in range(n):
+        f = datetime(2025, 1, 1) + timedelta(minutes=r.randrange(200 * 24 * 60))
+        res.append(venta(f.strftime("%d/%m/%Y %H:%M"), (f"A{r.randrange(5)}", f"M{r.randrange(2)}", r.randint(1, 3), 10.0)))
+    return res
+
+
+def fecha(v):
+    return datetime.strptime(v["fecha"], "%d/%m/%Y %H:%M")
+
+
+def test_clave_fecha_igual_para_dict_y_venta():
+    v = venta("05/03/2025 14:30", ("A", "M", 1, 1.0))
+    assert clave_fecha(v) == clave_fecha(Venta.desde(v)) == (date(2025, 3, 5).toordinal(), 14 * 3600 + 30 * 60)
+    assert clave_fecha({"fecha": "ayer"}) is None
+
+
+def test_rango_igual_que_filtrar_todo():
+    ventas = azar()
+    indice = IndiceVentasPorFecha(ventas)
+    desde, hasta = date(2025, 2, 10), date(2025, 3, 31)
+    esperadas = sorted((v for v in ventas if desde <= fecha(v).date() <= hasta), key=fecha)
+    assert indice.rango(desde, hasta) == esperadas
+    assert indice.rango(date(2030, 1, 1), date(2030, 12, 31)) == []
+
+
+def test_mismo_minuto_conserva_el_orden_de_llegada():
+    a = venta("01/04/2025 10:00", ("A", "M", 1, 1.0))
+    b = venta("01/04/2025 10:00", ("B", "M", 1, 1.0))
+    indice = IndiceVentasPorFecha([a])
+    indice.agregar(b)
+    assert indice.rango(date(2025, 4, 1), date(2025, 4, 1)) == [a, b]
+
+
+def test_agregar_fuera_de_orden_e_incorporar():
+    ventas = azar()
+    indice = IndiceVentasPorFecha(ventas[:100])
+    for v in ventas[100:200]:
+        assert indice.agregar(v)
+    assert indice.incorporar(ventas[200:] + [{"fecha": "sin fecha"}]) == 100
+    assert not indice.agregar({"fecha": ""})
+    completo = IndiceVentasPorFecha(ventas)
+    assert len(indice) == 300
+    assert [fecha(v) for v in indice.rango(date(2025, 1, 1), date(2025, 12, 31))] == sorted(fecha(v) for v in ventas)
+    assert indice.totales(date(2025, 1, 1), date(2025, 12, 31)) == completo.totales(date(2025, 1, 1), date(2025, 12, 31))
+
+
+@pytest.mark.parametrize("desde,hasta", [(date(2025, 1, 1), date(2025, 12, 31)), (date(2025, 3, 3), date(2025, 3, 9)),
+                                         (date(2025, 5, 20), date(2025, 5, 20))])
+def test_totales_diarios_igual_que_sumar_las_ventas(desde, hasta):
+    ventas = azar()
+    tot = IndiceVentasPorFecha(ventas).totales(desde, hasta)
+    del_rango = [v for v in ventas if desde <= fecha(v).date() <= hasta]
+    lineas = [l for v in del_rango for l in v["productos"]]
+    assert tot["ventas"] == len(del_rango)
+    assert tot["unidades"] == sum(l["cantidad"] for l in lineas)
+    assert tot["ingresos"] == pytest.approx(sum(l["cantidad"] * l["precio"] for l in lineas))
+    for marca in ("M0", "M1"):
+        u = sum(l["cantidad"] for l in lineas if l["marca"] == marca)
+        assert tot["por_marca"].get(marca, [0, 0.0])[0] == u
+    assert sum(tot["por_dia"].values()) == pytest.approx(tot["ingresos"])
+    assert all(desde.toordinal() <= d <= hasta.toordinal() for d in tot["por_dia"])
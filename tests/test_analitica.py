@@ -0,0 +1,100 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import analitica
+from analitica import AnaliticaVentas
+from compacto import Venta
+
+DESDE, HASTA = date(2025, 1, 1), date(2025, 12, 31)
+
+
+def historial(n=400, seed=3):
+    """Ventas de todo 2025 (no siempre en orden), con dicts sueltos como en datos viejos."""
+    r = random.Random(seed)
+    ventas = []
+    for i in range(n):
+        f = datetime(2025, 1, 1) + timedelta(hours=r.randrange(365 * 24))
+        lineas = [{"articulo": f"A{a}", "nombre": f"Prenda {a}", "marca": f"M{a % 3}",
+                   "cantidad": r.randint(1, 3), "precio": 100.0 + a} for a in r.sample(range(12), r.randint(1, 4))]
+        ventas.append({"fecha": f.strftime("%d/%m/%Y %H:%M"), "cliente": "c", "dni": "1", "productos": lineas})
+    return ventas
+
+
+def columnas(an):
+    return ([list(c) for c in (an.dia, an.mes, an.art, an.marca, an.cant, an.imp)],
+            an.articulos, an.marcas, [dict(l) for l in an.lineas], an.dia_min)
+
+
+def test_carga_en_bloque_igual_que_de_a_una():
+    ventas = [Venta.desde(v) for v in historial()]
+    en_bloque = AnaliticaVentas().sincronizar(ventas)
+    de_a_una = AnaliticaVentas()
+    de_a_una._reiniciar((ventas,))
+    for v in ventas:
+        de_a_una._agregar(v)
+    assert columnas(en_bloque) == columnas(de_a_una)
+    # dict sales (old data) take the per-sale path and give the same columns
+    assert columnas(AnaliticaVentas().sincronizar(historial())) == columnas(de_a_una)
+
+
+def test_ventas_nuevas_se_agregan_sin_reconstruir():
+    ventas = [Venta.desde(v) for v in historial()]
+    lista = ventas[:300]
+    an = AnaliticaVentas().sincronizar(lista)
+    lista.extend(ventas[300:])
+    an.sincronizar(lista)
+    assert columnas(an) == columnas(AnaliticaVentas().sincronizar(ventas))
+
+
+def test_nombre_de_la_venta_mas_nueva():
+    vieja = Venta.desde({"fecha": "01/03/2025 10:00", "productos": [
+        {"articulo": "A1", "nombre": "Nombre viejo", "marca": "M", "cantidad": 1, "precio": 10.0}]})
+    nueva = Venta.desde({"fecha": "01/06/2025 10:00", "productos": [
+        {"articulo": "A1", "nombre": "Nombre nuevo", "marca": "M", "cantidad": 2, "precio": 12.0}]})
+    for listas in (([vieja], [nueva]), ([nueva], [vieja]), ([nueva, vieja],)):
+        an = AnaliticaVentas().sincronizar(*listas)
+        assert an.mas_vendidos(DESDE, HASTA) == [("A1", "Nombre nuevo", "M", 3, 34.0)]
+
+
+def test_consultas_conocidas():
+    ventas = [Venta.desde(v) for v in (
+        {"fecha": "10/01/2025 10:00", "productos": [{"articulo": "A", "nombre": "a", "marca": "X", "cantidad": 5, "precio": 10.0},
+                                                     {"articulo": "B", "nombre": "b", "marca": "Y", "cantidad": 1, "precio": 100.0}]},
+        {"fecha": "15/02/2025 10:00", "productos": [{"articulo": "A", "nombre": "a", "marca": "X", "cantidad": 2, "precio": 10.0}]},
+    )]
+    an = AnaliticaVentas().sincronizar(ventas)
+    assert an.mas_vendidos(DESDE, HASTA) == [("A", "a", "X", 7, 70.0), ("B", "b", "Y", 1, 100.0)]
+    assert an.mas_vendidos(DESDE, HASTA, por_importe=True)[0][0] == "B"
+    assert an.por_marca(DESDE, HASTA) == [("Y", 1, 100.0), ("X", 7, 70.0)]
+    assert an.por_mes(DESDE, HASTA) == [("01/2025", 6, 150.0), ("02/2025", 2, 20.0)]
+    assert an.por_mes(date(2025, 2, 1), HASTA) == [("02/2025", 2, 20.0)]
+
+
+@pytest.mark.parametrize("desde,hasta", [(DESDE, HASTA), (date(2025, 3, 1), date(2025, 5, 15)),
+                                         (date(2025, 7, 4), date(2025, 7, 4)), (date(2026, 1, 1), date(2026, 2, 1))])
+def test_numpy_y_python_puro_dan_lo_mismo(desde, hasta, monkeypatch):
+    pytest.importorskip("numpy")
+    ventas = [Venta.desde(v) for v in historial(1500)]
+    productos = [{"articulo": f"A{a}", "nombre": f"Prenda {a}", "marca": f"M{a % 3}", "precio": 1.0, "stock": a % 5}
+                 for a in range(14)]
+    an = AnaliticaVentas().sincronizar(ventas)
+    lo, hi = desde.toordinal(), hasta.toordinal()
+    con_np, sin_np = an._sumas_np(lo, hi), an._sumas_py(lo, hi)
+    for k in ("art", "marca"):
+        assert con_np[k][0] == sin_np[k][0]
+        assert con_np[k][1] == pytest.approx(sin_np[k][1])
+    assert con_np["mes"].keys() == sin_np["mes"].keys()
+    for m, (u, i) in sin_np["mes"].items():
+        assert con_np["mes"][m][0] == u and con_np["mes"][m][1] == pytest.approx(i)
+
+    def consultas():
+        an._cache = None
+        return (an.mas_vendidos(desde, hasta), an.mas_vendidos(desde, hasta, por_importe=True),
+                an.por_marca(desde, hasta), an.por_mes(desde, hasta),
+                [(i.producto["articulo"], i.pedir, round(i.dias_stock, 6))
+                 for i in an.sugerencias_reposicion(desde, hasta, productos)])
+    resultado_np = consultas()
+    monkeypatch.setattr(analitica, "np", None)
+    assert consultas() == resultado_np
@@ -0,0 +1,133 @@
+import http.client, json, threading, time
+
+import pytest
+
+from almacenamiento import AlmacenJSON
+from nucleo import MotorEncanto
+from servidor_api import API, EjecutorTk, ErrorAPI, ServidorAPI
+
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    motor = MotorEncanto(almacen=AlmacenJSON("productos.json", "ventas.json", "ventas.jsonl", copia_binaria=False), caja="api")
+    motor.cargar()
+    motor.agregar_o_actualizar_producto("X1", "Bombacha", "M", 100, 10)
+    s = ServidorAPI(API(motor), puerto=0, hilos=2, token="")
+    s.iniciar()
+    yield s, motor
+    s.detener()
+    motor.cerrar()
+
+
+def pedir(s, metodo, ruta, cuerpo=None, headers=None):
+    con = http.client.HTTPConnection("127.0.0.1", s.server_address[1], timeout=5)
+    try:
+        con.request(metodo, ruta, body=cuerpo, headers=headers or {})
+        r = con.getresponse()
+        return r.status, dict(r.getheaders()), r.read()
+    finally:
+        con.close()
+
+
+VENTA = json.dumps({"cliente": "Ana", "dni": "111", "productos": [{"articulo": "X1", "cantidad": 2}]})
+
+
+def test_post_sin_json_se_rechaza(servidor):
+    s, motor = servidor
+    estado, _h, _c = pedir(s, "POST", "/api/ventas", VENTA, {"Content-Type": "text/plain"})
+    assert estado == 415
+    assert motor.ventas == [] and motor.producto("X1")["stock"] == 10
+
+
+def test_post_desde_otro_origen_se_rechaza(servidor):
+    s, motor = servidor
+    estado, h, _c = pedir(s, "POST", "/api/ventas", VENTA,
+                          {"Content-Type": "application/json", "Origin": "http://otra-pagina.example"})
+    assert estado == 403
+    assert "Access-Control-Allow-Origin" not in h
+    assert motor.ventas == []
+
+
+def test_post_json_registra_la_venta(servidor):
+    s, motor = servidor
+    estado, _h, cuerpo = pedir(s, "POST", "/api/ventas", VENTA, {"Content-Type": "application/json"})
+    assert estado == 201
+    assert json.loads(cuerpo)["venta"]["total"] == 200
+    assert motor.producto("X1")["stock"] == 8
+
+
+def test_cors_solo_para_el_origen_propio(servidor):
+    s, _motor = servidor
+    propio = f"http://127.0.0.1:{s.server_address[1]}"
+    _e, h, _c = pedir(s, "GET", "/api/productos", headers={"Origin": propio})
+    assert h["Access-Control-Allow-Origin"] == propio
+    _e, h, _c = pedir(s, "GET", "/api/productos", headers={"Origin": "http://otra-pagina.example"})
+    assert "Access-Control-Allow-Origin" not in h
+    estado, h, _c = pedir(s, "OPTIONS", "/api/ventas", headers={"Origin": "http://otra-pagina.example"})
+    assert estado == 204 and "Access-Control-Allow-Methods" not in h
+
+
+def test_token_obligatorio_si_esta_configurado(servidor):
+    s, motor = servidor
+    s.token = "secreto"
+    estado, _h, _c = pedir(s, "POST", "/api/ventas", VENTA, {"Content-Type": "application/json"})
+    assert estado == 401
+    estado, _h, _c = pedir(s, "POST", "/api/ventas", VENTA,
+                           {"Content-Type": "application/json", "Authorization": "Bearer secreto"})
+    assert estado == 201
+
+
+def test_pagina_servida_en_la_raiz(servidor):
+    s, _motor = servidor
+    estado, h, cuerpo = pedir(s, "GET", "/")
+    assert estado == 200 and h["Content-Type"].startswith("text/html") and b"ENCANTO" in cuerpo
+
+
+def test_sin_stock_es_conflicto_y_dni_invalido_no(servidor):
+    s, motor = servidor
+    sin_stock = json.dumps({"cliente": "Ana", "dni": "111", "productos": [{"articulo": "X1", "cantidad": 11}]})
+    estado, _h, _c = pedir(s, "POST", "/api/ventas", sin_stock, {"Content-Type": "application/json"})
+    assert estado == 409
+    mal_dni = json.dumps({"cliente": "Ana", "dni": "abc", "productos": [{"articulo": "X1", "cantidad": 1}]})
+    estado, _h, _c = pedir(s, "POST", "/api/ventas", mal_dni, {"Content-Type": "application/json"})
+    assert estado == 400
+    assert motor.ventas == []
+
+
+class RaizLenta:
+    """Sustituto de Tk: los after se corren a mano (la caja 'ocupada' no los atiende a tiempo)."""
+
+    def __init__(self):
+        self.pendientes = []
+
+    def after(self, ms, fn):
+        self.pendientes.append(fn)
+
+    def atender(self):
+        fn = self.pendientes.pop(0)
+        fn()
+
+
+def test_ejecutor_tk_cancela_lo_que_no_empezo():
+    raiz = RaizLenta()
+    ejecutar = EjecutorTk(raiz, timeout=0.05)
+    corridas = []
+    with pytest.raises(ErrorAPI) as e:
+        ejecutar(lambda: corridas.append(1))
+    assert e.value.estado == 503
+    raiz.atender()  # the Tk thread gets to the queue late
+    assert corridas == []
+
+
+def test_ejecutor_tk_espera_lo_que_ya_empezo():
+    raiz = RaizLenta()
+    ejecutar = EjecutorTk(raiz, timeout=0.05)
+    res = []
+    hilo = threading.Thread(target=lambda: res.append(ejecutar(lambda: time.sleep(0.3) or "vendida")))
+    hilo.start()
+    while ejecutar._cola.empty():
+        time.sleep(0.001)
+    raiz.atender()  # starts before the timeout and outlasts it
+    hilo.join()
+    assert res == ["vendida"]
@@ -0,0 +1,176 @@
+import json, os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from almacenamiento import AlmacenJSON, AlmacenSQLite, importar_json_a_sqlite, normalizar_venta
+from archivo import MANIFIESTO, ArchivoVentas, inicio_mes
+from carrito import Carrito
+from compacto import Venta
+from diario import escribir_json_atomico
+from nucleo import MotorEncanto
+
+HOY = datetime.now()
+INICIO = datetime.fromtimestamp(0) + timedelta(seconds=inicio_mes())  # first instant of this month (local)
+
+
+def venta(fecha, dni, total=100.0, art="A1"):
+    return {"fecha": fecha.strftime("%d/%m/%Y %H:%M"), "cliente": f"cliente {dni}", "dni": dni, "tel": "",
+            "productos": [{"articulo": art, "nombre": "Bombacha", "marca": "M", "cantidad": 1, "precio": total}],
+            "total": total}
+
+
+def historial():
+    """Una venta cada 5 días durante ~6 meses hasta hoy, más una del mes en curso."""
+    ventas = [venta(INICIO - timedelta(days=5 * i, hours=3), str(i % 7)) for i in range(36, 0, -1)]
+    ventas.append(venta(INICIO + timedelta(minutes=30), "1", 250.0))
+    return ventas
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    escribir_json_atomico("productos.json", [{"articulo": "A1", "nombre": "Bombacha", "marca": "M", "precio": 100.0, "stock": 50}])
+    escribir_json_atomico("ventas.json", historial())
+    return tmp_path
+
+
+def abrir(comprimir=False, archivo=True):
+    almacen = AlmacenJSON("productos.json", "ventas.json", "ventas.jsonl",
+                          archivo=ArchivoVentas("ventas_archivo", comprimir) if archivo else None)
+    m = MotorEncanto(almacen=almacen, caja="t")
+    avisos = m.cargar()
+    return m, avisos
+
+
+def fechas(ventas):
+    return sorted(v["fecha"] for v in ventas)
+
+
+@pytest.mark.parametrize("comprimir", [False, True])
+def test_primera_apertura_archiva_los_meses_cerrados(carpeta, comprimir):
+    m, avisos = abrir(comprimir)
+    assert avisos == []
+    assert [v["dni"] for v in m.ventas] == ["1"]  # only the current month stays in ventas.json
+    assert len(json.load(open("ventas.json"))) == 1
+    manifiesto = json.load(open(os.path.join("ventas_archivo", MANIFIESTO)))
+    assert "pendiente" not in manifiesto
+    particiones = manifiesto["particiones"]
+    assert sum(p["ventas"] for p in particiones.values()) == 36
+    assert round(sum(p["total"] for p in particiones.values()), 2) == 3600.0
+    assert all(p["archivo"].endswith(".gz") == comprimir for p in particiones.values())
+    # nothing archived is loaded until a report needs it
+    assert m.ventas_archivo == []
+
+
+def test_reporte_trae_solo_los_meses_del_rango(carpeta):
+    m, _ = abrir()
+    abrir()  # second open: nothing left to archive
+    desde = (INICIO - timedelta(days=20)).date()
+    ventas, _ = m.reporte(desde, HOY.date())
+    esperadas = [v for v in historial() if datetime.strptime(v["fecha"], "%d/%m/%Y %H:%M").date() >= desde]
+    assert fechas(ventas) == fechas(esperadas)
+    archivadas = [datetime.strptime(v["fecha"], "%d/%m/%Y %H:%M") for v in esperadas]
+    assert m._meses_archivo == {f.strftime("%Y-%m") for f in archivadas if f < INICIO}
+
+
+def test_reporte_completo_igual_que_sin_archivo(carpeta):
+    ref, _ = abrir(archivo=False)
+    desde, hasta = date(2000, 1, 1), HOY.date()
+    ref_ventas, ref_totales = ref.reporte(desde, hasta)
+    m, _ = abrir()
+    ventas, totales = m.reporte(desde, hasta)
+    assert fechas(ventas) == fechas(ref_ventas)
+    assert totales == ref_totales
+    assert m.analisis(desde, hasta).mas_vendidos(desde, hasta) == ref.analisis().mas_vendidos(desde, hasta)
+
+
+def test_clientes_conocidos_sin_leer_particiones(carpeta):
+    ref, _ = abrir(archivo=False)
+    m, _ = abrir()
+    for dni in map(str, range(7)):
+        c, rc = m.cliente(dni), ref.cliente(dni)
+        assert (c.visitas, round(c.gastado, 2), c.fecha_ultima()) == (rc.visitas, round(rc.gastado, 2), rc.fecha_ultima())
+    assert m.ventas_archivo == []
+    assert [v["fecha"] for v in m.historial_cliente("3")] == [v["fecha"] for v in ref.historial_cliente("3")]
+
+
+def test_venta_tardia_se_suma_a_su_mes(carpeta):
+    m, _ = abrir()
+    carrito = Carrito()
+    m.agregar_al_carrito(carrito, m.producto("A1"), 1)
+    m.registrar_venta(carrito, "Tardía", "999", fecha=INICIO - timedelta(days=40))
+    m2, avisos = abrir()
+    assert avisos == []
+    assert all(v["dni"] != "999" for v in m2.ventas)
+    c = m2.cliente("999")
+    assert c.visitas == 1 and len(c.meses) == 1
+    assert len(m2.historial_cliente("999")) == 1
+    # the replaced generation of that month is gone
+    mes = c.meses[0]
+    assert len([f for f in os.listdir("ventas_archivo") if f.startswith(mes)]) == 1
+
+
+def test_corte_despues_de_escribir_el_manifiesto(carpeta):
+    """Manifiesto escrito (con la marca de pendiente) pero ventas.json sin reescribir."""
+    archivo = ArchivoVentas("ventas_archivo")
+    vs = [Venta.desde(normalizar_venta(v)) for v in historial()]
+    corte = inicio_mes()
+    archivo.archivar([v for v in vs if v.ts < corte], corte, "ventas.json")
+    assert "pendiente" in archivo.manifiesto
+    m, avisos = abrir()
+    assert avisos == []
+    assert [v["dni"] for v in m.ventas] == ["1"]
+    assert "pendiente" not in json.load(open(os.path.join("ventas_archivo", MANIFIESTO)))
+    ventas, _ = m.reporte(date(2000, 1, 1), HOY.date())
+    assert len(ventas) == 37  # nothing doubled
+
+
+def test_corte_antes_de_confirmar_no_deja_generaciones_viejas(carpeta, monkeypatch):
+    m, _ = abrir()
+    carrito = Carrito()
+    m.agregar_al_carrito(carrito, m.producto("A1"), 1)
+    m.registrar_venta(carrito, "Tardía", "999", fecha=INICIO - timedelta(days=40))
+    m.cerrar()
+
+    def corte(self):
+        raise OSError("corte de luz")
+    confirmar = ArchivoVentas.confirmar
+    monkeypatch.setattr(ArchivoVentas, "confirmar", corte)
+    abrir()
+    monkeypatch.setattr(ArchivoVentas, "confirmar", confirmar)
+    assert "pendiente" in json.load(open(os.path.join("ventas_archivo", MANIFIESTO)))
+    antes = set(os.listdir("ventas_archivo"))
+    m2, avisos = abrir()
+    assert avisos == []
+    manifiesto = json.load(open(os.path.join("ventas_archivo", MANIFIESTO)))
+    vigentes = {p["archivo"] for p in manifiesto["particiones"].values()} | {manifiesto["clientes"], MANIFIESTO}
+    assert set(os.listdir("ventas_archivo")) == vigentes < antes
+    ventas, _ = m2.reporte(date(2000, 1, 1), HOY.date())
+    assert len(ventas) == 38
+
+
+def test_restos_de_un_corte_se_borran_al_abrir(carpeta):
+    abrir()
+    for nombre in ("2020-01.99.json", "clientes.99.json.tmp", "notas.txt"):
+        open(os.path.join("ventas_archivo", nombre), "w").close()
+    abrir()
+    restos = set(os.listdir("ventas_archivo"))
+    assert "notas.txt" in restos
+    assert "2020-01.99.json" not in restos and "clientes.99.json.tmp" not in restos
+
+
+def test_manifiesto_danado_no_archiva_encima(carpeta):
+    abrir()
+    with open(os.path.join("ventas_archivo", MANIFIESTO), "w") as f:
+        f.write("{roto")
+    m, avisos = abrir()
+    assert len(avisos) == 1 and "archivo de ventas" in avisos[0]
+    assert m.almacen.archivo is None
+    assert [v["dni"] for v in m.ventas] == ["1"]
+
+
+def test_importar_a_sqlite_incluye_el_archivo(carpeta):
+    abrir()
+    n_prod, n_ventas = importar_json_a_sqlite(AlmacenSQLite("encanto.db"))
+    assert (n_prod, n_ventas) == (1, 37)
@@ -0,0 +1,66 @@
+import os, subprocess, sys
+
+import pytest
+
+from almacenamiento import AlmacenJSON
+from diario import escribir_json_atomico
+from nucleo import CargaEnSegundoPlano, MotorEncanto
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cargados(codigo):
+    """Corre codigo en un intérprete nuevo y devuelve qué paquetes pesados quedaron importados."""
+    chequeo = "import sys; print(sorted(m for m in ('openpyxl', 'reportlab') if m in sys.modules))"
+    r = subprocess.run([sys.executable, "-c", f"{codigo}\n{chequeo}"], cwd=RAIZ, capture_output=True, text=True,
+                       env=dict(os.environ, ENCANTO_METRICAS="0"), timeout=60)
+    assert r.returncode == 0, r.stderr
+    return r.stdout.strip().splitlines()[-1]
+
+
+def test_importar_no_carga_los_exportadores():
+    assert cargados("import exportar, catalogo, nucleo, servidor_api") == "[]"
+
+
+def test_csv_no_necesita_openpyxl(tmp_path):
+    destino = str(tmp_path / "r.csv")
+    assert cargados(f"import exportar; exportar.exportar_csv({destino!r}, [])") == "[]"
+
+
+def test_excel_importa_openpyxl_al_exportar(tmp_path):
+    pytest.importorskip("openpyxl")
+    destino = str(tmp_path / "r.xlsx")
+    assert cargados(f"import exportar; exportar.exportar_excel({destino!r}, [])") == "['openpyxl']"
+
+
+@pytest.fixture
+def motor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    escribir_json_atomico("productos.json", [{"articulo": f"A{i}", "nombre": f"Remera {i}", "marca": "Sol",
+                                              "precio": 10.0, "stock": 5} for i in range(50)])
+    escribir_json_atomico("ventas.json", [])
+    m = MotorEncanto(almacen=AlmacenJSON("productos.json", "ventas.json", "ventas.jsonl", copia_binaria=False))
+    yield m
+    m.cerrar()
+
+
+def test_carga_en_segundo_plano(motor, monkeypatch):
+    carga = CargaEnSegundoPlano(motor, preparar=lambda: [p["articulo"] for p in motor.productos])
+    carga.start(); carga.join(10)
+    assert carga.terminado and carga.error is None and carga.avisos == []
+    assert len(motor.productos) == 50 and carga.preparado[:2] == ["A0", "A1"]
+    assert not motor.indice_busqueda.sucio  # built off the Tk thread
+    construcciones = []
+    monkeypatch.setattr(motor.indice_busqueda, "_construir", lambda: construcciones.append(1))
+    motor.buscar("remera 4")
+    assert construcciones == []
+
+
+def test_carga_en_segundo_plano_guarda_el_error(motor):
+    def preparar():
+        raise RuntimeError("sin filas")
+
+    carga = CargaEnSegundoPlano(motor, preparar)
+    carga.start(); carga.join(10)
+    assert carga.terminado and carga.preparado is None
+    assert isinstance(carga.error, RuntimeError)
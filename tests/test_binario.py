@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import binario
+from almacenamiento import AlmacenJSON, normalizar_producto, normalizar_venta
+from compacto import Producto, Venta
+from diario import escribir_json_atomico
+
+PRODUCTOS = [
+    {"articulo": "A1", "nombre": "Corpiño encaje", "marca": "KAURY", "precio": 1999.9, "stock": 3, "minimo": 5},
+    {"articulo": "B2", "nombre": "Bombacha", "marca": "LODY", "precio": 500.0, "stock": 0},
+]
+VENTAS = [
+    {"fecha": "01/02/2025 10:30", "cliente": "Ana", "dni": "111", "tel": "", "total": 2499.9,
+     "productos": [{"articulo": "A1", "nombre": "Corpiño encaje", "marca": "KAURY", "cantidad": 1, "precio": 1999.9},
+                   {"articulo": "B2", "nombre": "Bombacha", "marca": "LODY", "cantidad": 1, "precio": 500.0}]},
+    {"fecha": "fecha vieja", "cliente": "Beto", "dni": "", "tel": "155", "total": 0.0, "productos": [], "nota": "x"},
+]
+
+
+@pytest.fixture
+def archivos(tmp_path):
+    pj, vj = str(tmp_path / "productos.json"), str(tmp_path / "ventas.json")
+    escribir_json_atomico(pj, PRODUCTOS)
+    escribir_json_atomico(vj, VENTAS)
+    return pj, vj
+
+
+def _productos():
+    return [normalizar_producto(Producto.desde(dict(p))) for p in PRODUCTOS]
+
+
+def _ventas():
+    return [Venta.desde(normalizar_venta(dict(v))) for v in VENTAS]
+
+
+def test_ida_y_vuelta(archivos):
+    pj, vj = archivos
+    pb, vb = binario.ruta_binario(pj), binario.ruta_binario(vj)
+    assert binario.escribir_productos(pb, _productos(), pj)
+    assert binario.escribir_ventas(vb, _ventas(), vj)
+    assert [dict(p) for p in binario.leer_productos(pb, pj)] == [dict(p) for p in _productos()]
+    leidas = binario.leer_ventas(vb, vj)
+    assert [dict(v) for v in leidas] == [dict(v) for v in _ventas()]
+    assert leidas[1]["fecha"] == "fecha vieja" and leidas[1]["nota"] == "x"
+
+
+def test_json_modificado_invalida_la_copia(archivos):
+    pj, _vj = archivos
+    pb = binario.ruta_binario(pj)
+    binario.escribir_productos(pb, _productos(), pj)
+    escribir_json_atomico(pj, PRODUCTOS[:1])  # the JSON changed after the copy
+    assert binario.leer_productos(pb, pj) is None
+
+
+@pytest.mark.parametrize("dano", ["byte", "truncado", "vacio", "version"])
+def test_copia_danada_devuelve_none(archivos, dano):
+    _pj, vj = archivos
+    vb = binario.ruta_binario(vj)
+    binario.escribir_ventas(vb, _ventas(), vj)
+    with open(vb, "rb") as f:
+        datos = bytearray(f.read())
+    if dano == "byte":
+        datos[-3] ^= 0xFF  # caught by the CRC
+    elif dano == "truncado":
+        datos = datos[:-10]
+    elif dano == "vacio":
+        datos = b""
+    else:
+        datos[4] = binario.VERSION + 1
+    with open(vb, "wb") as f:
+        f.write(datos)
+    st = os.stat(vj)
+    os.utime(vj, ns=(st.st_atime_ns, st.st_mtime_ns))  # the JSON itself is untouched
+    assert binario.leer_ventas(vb, vj) is None
+
+
+def test_falta_la_copia_o_el_json(archivos, tmp_path):
+    pj, _vj = archivos
+    assert binario.leer_productos(binario.ruta_binario(pj), pj) is None
+    assert binario.leer_productos(binario.ruta_binario(pj), str(tmp_path / "no.json")) is None
+
+
+def test_almacen_rehace_la_copia_vencida(archivos, tmp_path):
+    pj, vj = archivos
+    almacen = AlmacenJSON(pj, vj, str(tmp_path / "ventas.jsonl"))
+    assert [p["articulo"] for p in almacen.cargar_productos()] == ["A1", "B2"]
+    assert binario.leer_productos(almacen.bin_productos, pj) is not None
+    # edited by hand (or by an older version without the copy): the JSON wins
+    escribir_json_atomico(pj, PRODUCTOS[1:])
+    assert [p["articulo"] for p in almacen.cargar_productos()] == ["B2"]
+    assert [p["articulo"] for p in binario.leer_productos(almacen.bin_productos, pj)] == ["B2"]
+    ventas, _avisos = almacen.cargar_ventas()
+    assert [v["cliente"] for v in ventas] == ["Ana", "Beto"]
+    escribir_json_atomico(vj, VENTAS[:1])
+    ventas, _avisos = almacen.cargar_ventas()
+    assert [v["cliente"] for v in ventas] == ["Ana"]
@@ -0,0 +1,114 @@
+import pytest
+
+from almacenamiento import AlmacenJSON
+from busqueda import IndiceBusqueda, normalizar
+from nucleo import MotorEncanto
+
+
+def producto(art, nombre, marca="M", stock=5):
+    return {"articulo": art, "nombre": nombre, "marca": marca, "precio": 100.0, "stock": stock}
+
+
+def catalogo():
+    return [producto("S1", "Sostén encaje"), producto("S2", "Sostén deportivo", "Lola"),
+            producto("B1", "Bombacha algodón"), producto("C1", "Camisón")]
+
+
+class Contador(IndiceBusqueda):
+    construcciones = 0
+
+    def _construir(self):
+        self.construcciones += 1
+        super()._construir()
+
+
+def test_normalizar_sin_acentos():
+    assert normalizar("Sostén CAMISÓN") == "sosten camison"
+
+
+def test_sin_acentos_encuentra_con_acentos():
+    etiquetas, total = IndiceBusqueda(catalogo()).buscar("sosten")
+    assert total == 2
+    assert etiquetas == ["S1 - Sostén encaje (M)", "S2 - Sostén deportivo (Lola)"]
+    assert IndiceBusqueda(catalogo()).buscar("ALGODON")[1] == 1
+
+
+def test_consulta_mas_larga_filtra_lo_anterior():
+    indice = IndiceBusqueda(catalogo())
+    assert indice.buscar("sos")[1] == 2
+    assert indice.buscar("sosten dep") == (["S2 - Sostén deportivo (Lola)"], 1)
+    # a shorter query is not a refinement: back to the trigram index
+    assert indice.buscar("cam")[1] == 1
+
+
+def test_articulo_y_nombre_no_se_cruzan():
+    assert IndiceBusqueda(catalogo()).buscar("s1sos")[1] == 0
+
+
+def test_limite_de_resultados():
+    productos = [producto(f"A{i:03}", "Bombacha") for i in range(50)]
+    indice = IndiceBusqueda(productos, limite=10)
+    etiquetas, total = indice.buscar("bomba")
+    assert len(etiquetas) == 10 and total == 50
+    assert indice.etiquetas() == etiquetas
+    assert len(IndiceBusqueda(productos, limite=0).buscar("bomba")[0]) == 50
+
+
+def test_edicion_de_nombre_reindexa_solo_ese_producto():
+    productos = catalogo()
+    indice = Contador(productos)
+    assert indice.buscar("sosten")[1] == 2
+    productos[0]["nombre"] = "Corpiño encaje"
+    indice.actualizar([productos[0]])
+    assert indice.buscar("sosten")[1] == 1
+    assert indice.buscar("corpino") == (["S1 - Corpiño encaje (M)"], 1)
+    assert indice.construcciones == 1
+
+
+def test_precio_o_stock_no_tocan_el_indice():
+    productos = catalogo()
+    indice = Contador(productos)
+    indice.buscar("sos")
+    ultima = indice._ultima
+    productos[1]["stock"] = 0
+    productos[1]["precio"] = 1.0
+    indice.actualizar([productos[1]])
+    assert indice._ultima is ultima
+    assert indice.buscar("sost")[1] == 2 and indice.construcciones == 1
+
+
+def test_alta_al_final_y_baja():
+    productos = catalogo()
+    indice = Contador(productos)
+    indice.buscar("sos")
+    productos.append(producto("S3", "Sostén push up"))
+    indice.actualizar([])
+    assert indice.buscar("sosten")[1] == 3 and indice.construcciones == 1
+    del productos[0]
+    indice.actualizar([])
+    assert indice.sucio
+    assert indice.buscar("sosten")[1] == 2 and indice.construcciones == 2
+
+
+@pytest.fixture
+def motor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    m = MotorEncanto(almacen=AlmacenJSON("productos.json", "ventas.json", "ventas.jsonl", copia_binaria=False))
+    m.cargar()
+    for p in catalogo():
+        m.agregar_o_actualizar_producto(p["articulo"], p["nombre"], p["marca"], p["precio"], p["stock"])
+    yield m
+    m.cerrar()
+
+
+def test_motor_no_reconstruye_por_stock_o_precio(motor):
+    motor.indice_busqueda.buscar("")
+    assert not motor.indice_busqueda.sucio
+    motor.sumar_stock("S1", 3)
+    motor.agregar_o_actualizar_producto("S1", "Sostén encaje", "M", 120, 8)
+    assert not motor.indice_busqueda.sucio
+    motor.agregar_o_actualizar_producto("S1", "Sostén encaje", "Nueva", 120, 8)
+    assert not motor.indice_busqueda.sucio
+    assert motor.buscar("sosten encaje")[0] == ["S1 - Sostén encaje (Nueva)"]
+    motor.eliminar_producto("S1")
+    assert motor.buscar("sosten")[1] == 1
@@ -0,0 +1,102 @@
+import pytest
+
+from almacenamiento import AlmacenSQLite
+from carrito import Carrito, StockInsuficiente
+from nucleo import ErrorNegocio, MotorEncanto
+
+
+@pytest.fixture
+def cajas(tmp_path):
+    db = str(tmp_path / "encanto.db")
+    motores = []
+
+    def abrir(caja):
+        m = MotorEncanto(almacen=AlmacenSQLite(db), caja=caja)
+        m.cargar()
+        motores.append(m)
+        return m
+    yield abrir
+    for m in motores:
+        m.cerrar()
+
+
+@pytest.fixture
+def dos_cajas(cajas):
+    a = cajas("A")
+    a.agregar_o_actualizar_producto("X1", "Bombacha", "M", 100, 10)
+    return a, cajas("B")
+
+
+def test_edicion_concurrente_da_conflicto_y_recarga(dos_cajas):
+    a, b = dos_cajas
+    a.agregar_o_actualizar_producto("X1", "Bombacha", "M", 120, 10)
+    with pytest.raises(ErrorNegocio):
+        b.agregar_o_actualizar_producto("X1", "Bombacha roja", "M", 130, 10)
+    # B lost its edit and now sees A's row
+    assert b.producto("X1")["precio"] == 120
+    assert b.producto("X1")["nombre"] == "Bombacha"
+    _cambiados, lista, _ventas = b.tomar_cambios_remotos()
+    assert lista
+    # with the current version the edit goes through
+    b.agregar_o_actualizar_producto("X1", "Bombacha roja", "M", 130, 10)
+    a.sincronizar()
+    assert a.producto("X1")["nombre"] == "Bombacha roja"
+
+
+def test_baja_llega_a_la_otra_caja_y_su_edicion_da_conflicto(dos_cajas):
+    a, b = dos_cajas
+    b.eliminar_producto("X1")
+    with pytest.raises(ErrorNegocio):
+        a.agregar_o_actualizar_producto("X1", "Bombacha", "M", 120, 10)
+    assert a.producto("X1") is None
+
+
+def test_reserva_descuenta_disponible_para_otras_cajas(dos_cajas):
+    a, b = dos_cajas
+    carrito_a, carrito_b = Carrito(), Carrito()
+    a.agregar_al_carrito(carrito_a, a.producto("X1"), 8)
+    with pytest.raises(StockInsuficiente):
+        b.agregar_al_carrito(carrito_b, b.producto("X1"), 3)
+    assert len(carrito_b) == 0
+    b.agregar_al_carrito(carrito_b, b.producto("X1"), 2)
+    # the reservation follows the cart line: lowering it frees stock
+    a.fijar_cantidad_carrito(carrito_a, "X1", 5)
+    b.fijar_cantidad_carrito(carrito_b, "X1", 5)
+    a.vaciar_carrito(carrito_a)
+    c = Carrito()
+    a.agregar_al_carrito(c, a.producto("X1"), 5)
+
+
+def test_venta_respeta_reservas_y_stock_relativo(dos_cajas):
+    a, b = dos_cajas
+    carrito_a, carrito_b = Carrito(), Carrito()
+    a.agregar_al_carrito(carrito_a, a.producto("X1"), 6)
+    b.agregar_al_carrito(carrito_b, b.producto("X1"), 4)
+    a.registrar_venta(carrito_a, "Ana", "111")
+    b.registrar_venta(carrito_b, "Beto", "222")
+    assert b.producto("X1")["stock"] == 0
+    a.sincronizar()
+    assert a.producto("X1")["stock"] == 0
+    assert sorted(v["dni"] for v in a.ventas) == ["111", "222"]
+    _cambiados, _lista, ventas = a.tomar_cambios_remotos()
+    assert [v["dni"] for v in ventas] == ["222"]
+
+
+def test_venta_sin_disponible_no_escribe_nada(dos_cajas):
+    a, b = dos_cajas
+    carrito_b = Carrito()
+    b.agregar_al_carrito(carrito_b, b.producto("X1"), 5)
+    a.sumar_stock("X1", -8)  # another register sold/adjusted meanwhile
+    with pytest.raises(ErrorNegocio):
+        b.registrar_venta(carrito_b, "Beto", "222")
+    assert b.producto("X1")["stock"] == 2
+    assert b.ventas == []
+
+
+def test_ajuste_de_stock_relativo(dos_cajas):
+    a, b = dos_cajas
+    a.sumar_stock("X1", 5)
+    b.sumar_stock("X1", 3)  # B never saw A's +5: relative update keeps both
+    assert b.producto("X1")["stock"] == 18
+    a.sincronizar()
+    assert a.producto("X1")["stock"] == 18
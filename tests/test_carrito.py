@@ -0,0 +1,93 @@
+import pytest
+
+from carrito import Carrito, StockInsuficiente, a_centavos, formato_pesos
+
+
+def producto(art, precio, stock=10):
+    return {"articulo": art, "nombre": f"Prenda {art}", "marca": "M", "precio": precio, "stock": stock}
+
+
+def test_a_centavos_redondeo_comercial():
+    assert a_centavos(0.1) == 10
+    assert a_centavos("19.995") == 2000
+    assert a_centavos(2.675) == 268  # float 2.675 is 2.67499...: str() keeps the written value
+    assert a_centavos(1234.5) == 123450
+
+
+def test_formato_pesos():
+    assert formato_pesos(123456) == "$1234.56"
+    assert formato_pesos(5) == "$0.05"
+    assert formato_pesos(-250) == "-$2.50"
+
+
+def test_total_sin_error_de_float():
+    c = Carrito()
+    c.agregar(producto("A", 0.1), 3)
+    c.agregar(producto("B", 0.2), 1)
+    assert c.total_cent == 50
+    assert c.total == 0.5
+
+
+def test_agregar_mismo_articulo_suma():
+    c = Carrito()
+    c.agregar(producto("A", 100.0), 2)
+    c.agregar(producto("A", 100.0), 3)
+    assert len(c) == 1
+    assert c.get("A").cantidad == 5
+    assert c.total_cent == 50000
+    assert c.unidades == 5
+
+
+def test_total_al_editar_y_quitar():
+    c = Carrito()
+    c.agregar(producto("A", 12.34), 2)
+    c.agregar(producto("B", 5.5), 1)
+    c.fijar_cantidad("A", 5)
+    assert c.total_cent == 1234 * 5 + 550
+    assert c.fijar_cantidad("B", 0) is None
+    assert "B" not in c
+    assert c.total_cent == 1234 * 5
+    c.quitar("A")
+    assert c.total_cent == 0
+    assert len(c) == 0
+
+
+def test_total_igual_a_recalcular():
+    c = Carrito()
+    for i, precio in enumerate((0.01, 9.99, 1999.9, 33.33)):
+        c.agregar(producto(f"P{i}", precio, 100), i + 1)
+    c.fijar_cantidad("P2", 7)
+    c.quitar("P0")
+    assert c.total_cent == sum(l.subtotal_cent for l in c)
+    items = c.items_venta()
+    assert [it["articulo"] for it in items] == ["P1", "P2", "P3"]
+    assert items[1] == {"articulo": "P2", "nombre": "Prenda P2", "marca": "M", "cantidad": 7, "precio": 1999.9}
+
+
+def test_control_de_stock():
+    c = Carrito()
+    c.agregar(producto("A", 10.0, stock=3), 2)
+    with pytest.raises(StockInsuficiente):
+        c.agregar(producto("A", 10.0, stock=3), 2)
+    with pytest.raises(StockInsuficiente):
+        c.fijar_cantidad("A", 4, stock=3)
+    assert c.get("A").cantidad == 2
+    assert c.total_cent == 2000
+
+
+def test_cantidades_invalidas():
+    c = Carrito()
+    with pytest.raises(ValueError):
+        c.agregar(producto("A", 10.0), 0)
+    c.agregar(producto("A", 10.0), 1)
+    with pytest.raises(ValueError):
+        c.fijar_cantidad("A", -1)
+    with pytest.raises(KeyError):
+        c.fijar_cantidad("Z", 1)
+
+
+def test_vaciar():
+    c = Carrito()
+    c.agregar(producto("A", 10.0), 1)
+    c.vaciar()
+    assert len(c) == 0 and c.total_cent == 0
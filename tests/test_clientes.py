@@ -0,0 +1,90 @@
+from clientes import IndiceClientes
+from compacto import Venta
+
+
+def venta(fecha, dni, cliente, total=10.0, tel=""):
+    return {"fecha": fecha, "cliente": cliente, "dni": dni, "tel": tel, "productos": [], "total": total}
+
+
+def ventas():
+    return [
+        venta("01/03/2025 10:00", "111", "Ana Pérez", 10.0, "555-1"),
+        venta("02/03/2025 10:00", "222", "Beto Gómez", 20.0),
+        venta("05/03/2025 10:00", "111", "Ana María Pérez", 5.0),
+        venta("03/03/2025 10:00", " 111 ", "Ana P", 2.5, "555-9"),  # late entry from another register
+        venta("04/03/2025 10:00", "", "Sin DNI"),
+    ]
+
+
+def test_agregados_por_dni():
+    indice = IndiceClientes().sincronizar(ventas())
+    assert len(indice) == 2
+    ana = indice.get(111)
+    assert (ana.visitas, ana.gastado) == (3, 17.5)
+    # name and phone come from the newest purchase by date, not by arrival
+    assert ana.nombre == "Ana María Pérez" and ana.fecha_ultima() == "05/03/2025 10:00"
+    assert ana.tel == "555-1"  # the newest one has no phone: keep the last known
+    assert [v["total"] for v in ana.ventas] == [10.0, 5.0, 2.5]
+    assert indice.get("333") is None and indice.get("") is None
+
+
+def test_sincronizar_incremental_igual_que_desde_cero():
+    todas = ventas()
+    lista = todas[:2]
+    indice = IndiceClientes().sincronizar(lista)
+    lista.extend(todas[2:])
+    indice.sincronizar(lista)
+    ref = IndiceClientes().sincronizar([Venta.desde(v) for v in todas])
+    for dni in ("111", "222"):
+        a, b = indice.get(dni), ref.get(dni)
+        assert (a.nombre, a.tel, a.visitas, a.gastado, a.fecha_ultima()) == (b.nombre, b.tel, b.visitas, b.gastado, b.fecha_ultima())
+
+
+def test_otra_lista_reconstruye():
+    indice = IndiceClientes().sincronizar(ventas())
+    indice.sincronizar([venta("01/04/2025 10:00", "999", "Zoe")])
+    assert len(indice) == 1 and indice.get("111") is None
+
+
+def test_autocompletado_por_cualquier_palabra():
+    indice = IndiceClientes().sincronizar(ventas())
+    assert [c.dni for c in indice.buscar("ana")] == ["111"]
+    assert [c.dni for c in indice.buscar("PEREZ")] == ["111"]  # accents and case folded
+    assert [c.dni for c in indice.buscar("maria p")] == ["111"]
+    assert [c.dni for c in indice.buscar("go")] == ["222"]
+    assert indice.buscar("x") == [] and indice.buscar("  ") == []
+
+
+def test_autocompletado_al_dia_con_altas_y_cambios_de_nombre():
+    lista = ventas()
+    indice = IndiceClientes().sincronizar(lista)
+    assert indice.buscar("zoe") == []
+    lista.append(venta("06/03/2025 10:00", "222", "Zoe Gómez"))
+    lista.append(venta("06/03/2025 11:00", "333", "Zoe Díaz"))
+    indice.sincronizar(lista)
+    assert sorted(c.dni for c in indice.buscar("zoe")) == ["222", "333"]
+    assert indice.buscar("beto") == []
+
+
+def test_autocompletado_respeta_el_limite():
+    lista = [venta("01/03/2025 10:00", str(i), f"Cliente {i:03d}") for i in range(50)]
+    indice = IndiceClientes().sincronizar(lista)
+    assert len(indice.buscar("cliente")) == 20
+    assert [c.dni for c in indice.buscar("cliente", limite=3)] == ["0", "1", "2"]
+
+
+
+def test_resumen_archivado_y_ventas_nuevas():
+    indice = IndiceClientes()
+    indice.cargar_archivo({"111": {"nombre": "Ana Vieja", "tel": "1", "visitas": 4, "gastado": 40.0,
+                                   "ultima": "15/01/2025 09:00", "meses": ["2025-01"]}})
+    lista = []
+    indice.sincronizar(lista)
+    ana = indice.get("111")
+    assert (ana.visitas, ana.fecha_ultima(), ana.meses) == (4, "15/01/2025 09:00", ["2025-01"])
+    lista.append(venta("01/01/2025 10:00", "111", "Ana Tardía"))  # older than the archived last purchase
+    indice.sincronizar(lista)
+    assert (ana.visitas, ana.gastado, ana.nombre, ana.fecha_ultima()) == (5, 50.0, "Ana Vieja", "15/01/2025 09:00")
+    lista.append(venta("01/03/2025 10:00", "111", "Ana Nueva"))
+    indice.sincronizar(lista)
+    assert (ana.visitas, ana.nombre, ana.fecha_ultima()) == (6, "Ana Nueva", "01/03/2025 10:00")
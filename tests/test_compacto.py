@@ -0,0 +1,80 @@
+import csv, json, sys
+from datetime import datetime
+
+import pytest
+
+from compacto import LineaVenta, Producto, Venta, a_json, a_segundos, desde_segundos, parse_fecha
+from exportar import exportar_csv
+
+
+def venta_dict(fecha="01/03/2025 10:05"):
+    return {"fecha": fecha, "cliente": "Ana", "dni": "30111222", "tel": "",
+            "productos": [{"articulo": "A1", "nombre": "Remera", "marca": "Sol", "cantidad": 2, "precio": 1.25,
+                           "talle": "M"},
+                          {"articulo": "B1", "nombre": "Short", "marca": "Luna", "cantidad": 1, "precio": 10.0}],
+            "total": 12.5, "nota": "regalo"}
+
+
+def test_venta_ida_y_vuelta_por_json():
+    d = venta_dict()
+    v = Venta.desde(d)
+    assert json.loads(json.dumps(v, default=a_json)) == d
+    assert Venta.desde(v) is v
+    assert Venta.desde(json.loads(json.dumps(v, default=a_json))).a_dict() == v.a_dict()
+
+
+@pytest.mark.parametrize("fecha", ["01/03/2025 10:05", "01/03/2025 10:05:30", "1/3/2025", "", "sin fecha"])
+def test_fecha_se_conserva_tal_cual(fecha):
+    v = Venta.desde(venta_dict(fecha))
+    assert v["fecha"] == fecha
+    dt = parse_fecha(fecha)
+    assert v.ts == (a_segundos(dt) if dt else None)
+
+
+def test_fecha_desde_datetime_y_segundos():
+    v = Venta(datetime(2025, 3, 1, 10, 5, 59))
+    assert v.fecha == "01/03/2025 10:05" and v.fecha_dt() == datetime(2025, 3, 1, 10, 5)
+    assert desde_segundos(a_segundos(datetime(1999, 12, 31, 23, 59, 1))) == datetime(1999, 12, 31, 23, 59, 1)
+
+
+def test_vista_de_dict():
+    v = Venta.desde(venta_dict())
+    assert "productos" in v and "nota" in v and "otra" not in v
+    assert v.get("otra", 5) == 5 and v.get("productos")[0]["talle"] == "M"
+    assert len(v) == 7 and list(v) == ["fecha", "cliente", "dni", "tel", "productos", "total", "nota"]
+    with pytest.raises(KeyError):
+        v["otra"]
+    assert v.pop("nota") == "regalo" and "nota" not in v
+    with pytest.raises(KeyError):
+        v.pop("cliente")
+    assert v.pop("cliente", None) is None and v["cliente"] == "Ana"
+
+
+def test_producto_update_y_extra():
+    p = Producto.desde({"articulo": "A1", "nombre": "Remera", "marca": "Sol", "precio": 1.0, "stock": 3, "minimo": 1})
+    p.update({"precio": 2.0}, stock=5, color="rojo")
+    assert dict(p) == {"articulo": "A1", "nombre": "Remera", "marca": "Sol", "precio": 2.0, "stock": 5,
+                       "minimo": 1, "color": "rojo"}
+    assert p == dict(p) and p.stock == 5
+    with pytest.raises(AttributeError):
+        p.otro = 1  # __slots__: no per-record __dict__
+    with pytest.raises(TypeError):
+        hash(p)
+
+
+def test_strings_internados():
+    a = LineaVenta.desde({"articulo": "".join(["A", "1"]), "nombre": "x", "marca": "".join(["S", "ol"]),
+                          "cantidad": 1, "precio": 1.0})
+    b = LineaVenta.desde({"articulo": "".join(["A", "1"]), "nombre": "x", "marca": "".join(["S", "ol"]),
+                          "cantidad": 1, "precio": 1.0})
+    assert a.marca is b.marca is sys.intern("Sol") and a.articulo is b.articulo
+
+
+def test_exportar_compactas_igual_que_dicts(tmp_path):
+    dicts = [venta_dict(f"{d:02d}/03/2025 10:05") for d in range(1, 20)]
+    exportar_csv(str(tmp_path / "d.csv"), dicts)
+    exportar_csv(str(tmp_path / "c.csv"), [Venta.desde(v) for v in dicts])
+    assert (tmp_path / "c.csv").read_bytes() == (tmp_path / "d.csv").read_bytes()
+    with open(tmp_path / "c.csv", encoding="utf-8-sig", newline="") as f:
+        filas = list(csv.reader(f, delimiter=";"))
+    assert filas[1] == ["01/03/2025 10:05", "Ana", "30111222", "", "A1", "Remera", "Sol", "2", "2.5"]
@@ -0,0 +1,113 @@
+import json, os
+
+import pytest
+
+from diario import DiarioVentas, _volcar_json
+
+
+def venta(n):
+    return {"fecha": f"0{n % 9 + 1}/01/2025 10:00", "cliente": f"cliente {n}", "dni": str(n), "tel": "",
+            "productos": [{"articulo": "A1", "nombre": "Corpiño", "marca": "M", "cantidad": 1, "precio": 100.0}],
+            "total": 100.0}
+
+
+@pytest.fixture
+def diario(tmp_path):
+    return DiarioVentas(str(tmp_path / "ventas.json"), str(tmp_path / "ventas.jsonl"))
+
+
+def dnis(ventas):
+    return [v["dni"] for v in ventas]
+
+
+def test_snapshot_mas_replay(diario):
+    diario.compactar([venta(1), venta(2)])
+    diario.agregar(venta(3))
+    diario.agregar(venta(4))
+    ventas, avisos = DiarioVentas(diario.path_snapshot, diario.path_diario).cargar()
+    assert dnis(ventas) == ["1", "2", "3", "4"]
+    assert avisos == []
+
+
+def test_ultimo_registro_truncado_se_descarta_y_recorta(diario):
+    diario.agregar(venta(1))
+    diario.agregar(venta(2))
+    with open(diario.path_diario, "ab") as f:
+        f.write(b'{"fecha": "01/01/2025 10:00", "cliente": "cor')
+    ventas, avisos = diario.cargar()
+    assert dnis(ventas) == ["1", "2"]
+    assert len(avisos) == 1
+    # the file is cut back to the last valid record: new sales append cleanly
+    diario.agregar(venta(3))
+    ventas, avisos = diario.cargar()
+    assert dnis(ventas) == ["1", "2", "3"]
+    assert avisos == []
+
+
+def test_registro_sin_salto_final_se_conserva(diario):
+    with open(diario.path_diario, "w", encoding="utf-8") as f:
+        f.write(json.dumps(venta(1)))
+    ventas, _ = diario.cargar()
+    diario.agregar(venta(2))
+    ventas, avisos = diario.cargar()
+    assert dnis(ventas) == ["1", "2"]
+    assert avisos == []
+
+
+def test_linea_danada_en_el_medio_se_saltea(diario):
+    diario.agregar(venta(1))
+    with open(diario.path_diario, "a", encoding="utf-8") as f:
+        f.write("{basura\n")
+    diario.agregar(venta(2))
+    ventas, avisos = diario.cargar()
+    assert dnis(ventas) == ["1", "2"]
+    assert len(avisos) == 1
+
+
+def test_compactar_vacia_el_diario(diario):
+    diario.agregar(venta(1))
+    diario.compactar([venta(1)])
+    assert not os.path.exists(diario.path_diario)
+    assert not os.path.exists(diario.path_retirado)
+    ventas, _ = diario.cargar()
+    assert dnis(ventas) == ["1"]
+    assert diario.pendientes == 0
+
+
+def _corte_con_diario_retirado(diario, reemplazado):
+    """Compactación de [1, 2] (snapshot [1] + diario [2]) cortada después de retirar el diario."""
+    diario.compactar([venta(1)])
+    diario.agregar(venta(2))
+    _volcar_json(f"{diario.path_snapshot}.tmp", [venta(1), venta(2)])
+    os.replace(diario.path_diario, diario.path_retirado)
+    if reemplazado:
+        os.replace(f"{diario.path_snapshot}.tmp", diario.path_snapshot)
+
+
+@pytest.mark.parametrize("reemplazado", [False, True])
+def test_corte_durante_compactacion_no_duplica(diario, reemplazado):
+    _corte_con_diario_retirado(diario, reemplazado)
+    nuevo = DiarioVentas(diario.path_snapshot, diario.path_diario)
+    ventas, _ = nuevo.cargar()
+    assert dnis(ventas) == ["1", "2"]
+    assert not os.path.exists(diario.path_retirado)
+    assert not os.path.exists(f"{diario.path_snapshot}.tmp")
+    # and it stays that way on the next start
+    assert dnis(DiarioVentas(diario.path_snapshot, diario.path_diario).cargar()[0]) == ["1", "2"]
+
+
+def test_corte_antes_de_retirar_el_diario_descarta_el_temporal(diario):
+    diario.compactar([venta(1)])
+    diario.agregar(venta(2))
+    with open(f"{diario.path_snapshot}.tmp", "w", encoding="utf-8") as f:
+        f.write("[{\"fecha\": ")  # temporary cut while being written
+    ventas, _ = DiarioVentas(diario.path_snapshot, diario.path_diario).cargar()
+    assert dnis(ventas) == ["1", "2"]
+    assert not os.path.exists(f"{diario.path_snapshot}.tmp")
+
+
+def test_snapshot_corrupto_lanza_value_error(diario):
+    with open(diario.path_snapshot, "w", encoding="utf-8") as f:
+        f.write("[{")
+    with pytest.raises(ValueError):
+        diario.cargar()
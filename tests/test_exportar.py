@@ -0,0 +1,95 @@
+import csv, os
+
+import pytest
+
+import exportar
+from exportar import (COLUMNAS, ExportacionCancelada, ExportacionEnSegundoPlano, contar_lineas,
+                      exportar_csv, exportar_excel, filas_reporte)
+
+
+def ventas(n=1200):
+    return [{"fecha": f"{1 + i % 28:02d}/03/2025 10:00", "cliente": "Ana", "dni": "30111222", "tel": "",
+             "productos": [{"articulo": f"A{i}", "nombre": "Remera", "marca": "Sol", "cantidad": 2, "precio": 1.25},
+                           {"articulo": "B", "nombre": "Short", "marca": "Luna", "cantidad": 1, "precio": 10.0}]}
+            for i in range(n)]
+
+
+def test_filas_reporte_una_por_linea():
+    filas = list(filas_reporte(ventas(3)))
+    assert len(filas) == contar_lineas(ventas(3)) == 6
+    assert filas[0] == ["01/03/2025 10:00", "Ana", "30111222", "", "A0", "Remera", "Sol", 2, 2.5]
+
+
+def test_csv_para_excel_en_espanol(tmp_path):
+    path = str(tmp_path / "r.csv")
+    v = ventas()
+    assert exportar_csv(path, v) == 2400
+    with open(path, "rb") as f:
+        assert f.read(3) == b"\xef\xbb\xbf"
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        filas = list(csv.reader(f, delimiter=";"))
+    assert filas[0] == COLUMNAS
+    assert filas[1:] == [[str(c) for c in fila] for fila in filas_reporte(v)]
+    assert not os.path.exists(path + ".parcial")
+
+
+def test_progreso_cada_paso(tmp_path):
+    avisos = []
+    exportar_csv(str(tmp_path / "r.csv"), ventas(), progreso=avisos.append)
+    assert avisos == [500, 1000, 1500, 2000]
+
+
+def test_cancelar_no_deja_archivos(tmp_path):
+    path = str(tmp_path / "r.csv")
+    with pytest.raises(ExportacionCancelada):
+        exportar_csv(path, ventas(), cancelado=lambda: True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_error_no_pisa_el_archivo_anterior(tmp_path):
+    path = tmp_path / "r.csv"
+    path.write_text("anterior")
+    malas = ventas(2) + [{"productos": [{"articulo": "X"}]}]
+    with pytest.raises(KeyError):
+        exportar_csv(str(path), malas)
+    assert path.read_text() == "anterior"
+    assert sorted(os.listdir(tmp_path)) == ["r.csv"]
+
+
+def test_excel_en_streaming(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "r.xlsx")
+    v = ventas(300)
+    assert exportar_excel(path, v) == 600
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        ws = wb["Reporte Ventas"]
+        filas = [list(f) for f in ws.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+    assert filas[0] == COLUMNAS
+    assert filas[1:] == [[c if c != "" else None for c in fila] for fila in filas_reporte(v)]
+
+
+def test_segundo_plano_termina(tmp_path):
+    path = str(tmp_path / "r.csv")
+    hilo = ExportacionEnSegundoPlano(exportar_csv, path, ventas())
+    hilo.start(); hilo.join(10)
+    assert hilo.terminado and not hilo.cancelada and hilo.error is None
+    assert hilo.filas == hilo.total == hilo.hechas == 2400
+
+
+def test_segundo_plano_cancelado(tmp_path):
+    path = str(tmp_path / "r.csv")
+    hilo = ExportacionEnSegundoPlano(exportar_csv, path, ventas())
+    hilo.cancelar()
+    hilo.start(); hilo.join(10)
+    assert hilo.terminado and hilo.cancelada and hilo.error is None
+    assert not os.path.exists(path)
+
+
+def test_segundo_plano_guarda_el_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(exportar, "HAY_EXCEL", False)
+    hilo = ExportacionEnSegundoPlano(exportar_excel, str(tmp_path / "r.xlsx"), ventas(1))
+    hilo.start(); hilo.join(10)
+    assert hilo.terminado and isinstance(hilo.error, RuntimeError)
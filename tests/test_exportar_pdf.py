@@ -0,0 +1,60 @@
+import os, re
+
+import pytest
+
+pytest.importorskip("reportlab")
+from reportlab import rl_config
+
+from exportar import ExportacionCancelada, exportar_pdf
+
+
+def ventas(n):
+    return [{"fecha": "01/03/2025 10:00", "cliente": "Ana", "dni": "1", "tel": "",
+             "productos": [{"articulo": f"A{i}", "nombre": "Remera", "marca": "Sol" if i % 2 else "Luna",
+                            "cantidad": 2, "precio": 1.25}]}
+            for i in range(n)]
+
+
+@pytest.fixture
+def sin_comprimir(monkeypatch):
+    # plain page streams so the test can look for the drawn text
+    monkeypatch.setattr(rl_config, "pageCompression", 0)
+
+
+def textos(path):
+    with open(path, "rb") as f:
+        return [t.decode("latin-1") for t in re.findall(rb"\(((?:[^()\\]|\\.)*)\) Tj", f.read())]
+
+
+def test_una_tabla_por_pagina_con_subtotales(tmp_path, sin_comprimir):
+    path = str(tmp_path / "r.pdf")
+    avisos = []
+    assert exportar_pdf(path, ventas(100), progreso=avisos.append, filas_por_tabla=30) == 100
+    t = textos(path)
+    # 4 tables of at most 30 rows, one per page, then the summary page
+    assert [x for x in t if x.startswith("Subtotal")] == [f"Subtotal p\\341gina {n}" for n in range(1, 5)]
+    assert "P\\341gina 5" in t and "P\\341gina 6" not in t
+    assert "$250.00" in t
+    assert avisos == [30, 60, 90, 100, 100]
+    assert os.listdir(tmp_path) == ["r.pdf"]
+
+
+def test_resumen_por_marca(tmp_path, sin_comprimir):
+    path = str(tmp_path / "r.pdf")
+    exportar_pdf(path, ventas(10), filas_por_tabla=4)
+    t = textos(path)
+    i = t.index("Marca", t.index("Resumen"))
+    assert t[i:i + 12] == ["Marca", "Unidades", "Total", "Luna", "10", "12.50", "Sol", "10", "12.50",
+                           "Total", "20", "25.00"]
+
+
+def test_cancelar_no_deja_archivos(tmp_path):
+    llamadas = []
+
+    def cancelado():
+        llamadas.append(1)
+        return len(llamadas) > 2
+
+    with pytest.raises(ExportacionCancelada):
+        exportar_pdf(str(tmp_path / "r.pdf"), ventas(100), cancelado=cancelado, filas_por_tabla=10)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,107 @@
+import logging
+
+import pytest
+
+import metricas
+from metricas import Histograma, umbral_segundos
+
+
+@pytest.fixture
+def activas(monkeypatch):
+    monkeypatch.setattr(metricas, "ACTIVO", True)
+    metricas.reiniciar()
+    yield
+    metricas.reiniciar()
+
+
+@pytest.fixture
+def log_en(tmp_path, monkeypatch):
+    path = tmp_path / "lento.log"
+    monkeypatch.setattr(metricas, "LOG_LENTAS", str(path))
+    monkeypatch.setattr(metricas, "_log", None)
+    yield path
+    log = logging.getLogger("encanto.lento")
+    for h in list(log.handlers):
+        log.removeHandler(h)
+        h.close()
+
+
+def test_percentiles_del_histograma():
+    h = Histograma()
+    for _ in range(90):
+        h.agregar(0.001)
+    for _ in range(9):
+        h.agregar(0.050)
+    h.agregar(2.0)
+    # bucket upper bounds: within one step (2**0.25, ~19%) of the real value
+    assert 0.001 <= h.percentil(50) < 0.001 * 2 ** 0.25
+    assert 0.050 <= h.percentil(95) < 0.050 * 2 ** 0.25
+    assert h.percentil(99) < 0.050 * 2 ** 0.25
+    assert h.percentil(100) == h.maximo == 2.0
+    assert h.n == 100 and round(h.total, 3) == round(90 * 0.001 + 9 * 0.05 + 2.0, 3)
+
+
+def test_percentil_nunca_supera_el_maximo():
+    h = Histograma()
+    h.agregar(0.0013)
+    assert h.percentil(50) == 0.0013
+    assert Histograma().percentil(99) == 0.0
+    h.agregar(1e-7)  # under the first bucket
+    assert h.percentil(1) == metricas.BASE
+
+
+def test_umbral_invalido_deja_el_de_siempre():
+    assert umbral_segundos("350") == 0.35
+    assert umbral_segundos("0") == 0.0
+    assert umbral_segundos("200ms") == 0.2
+    assert umbral_segundos("") == 0.2
+    assert umbral_segundos(None) == 0.2
+    assert umbral_segundos("-5") == 0.2
+    assert umbral_segundos("inf") == 0.2
+
+
+def test_solo_las_lentas_van_al_log(activas, log_en, monkeypatch):
+    monkeypatch.setattr(metricas, "UMBRAL_LENTO", 0.1)
+    metricas.registrar("rapida", 0.01)
+    assert not log_en.exists()  # created with the first slow operation
+    metricas.registrar("guardar", 0.25, "(OSError)")
+    texto = log_en.read_text(encoding="utf-8")
+    assert "guardar 250.0 ms" in texto and "(OSError)" in texto
+    assert "rapida" not in texto
+    assert [f[0] for f in metricas.resumen()] == ["guardar", "rapida"]
+
+
+def test_medir_y_medido_registran(activas):
+    @metricas.medido("sumar")
+    def sumar(a, b):
+        return a + b
+
+    assert sumar(2, 3) == 5
+    with metricas.medir("bloque"):
+        pass
+    with pytest.raises(KeyError):
+        with metricas.medir("falla"):
+            raise KeyError("x")
+    assert {f[0]: f[1] for f in metricas.resumen()} == {"sumar": 1, "bloque": 1, "falla": 1}
+
+
+def test_apagadas_no_envuelven_ni_registran(monkeypatch):
+    monkeypatch.setattr(metricas, "ACTIVO", False)
+    metricas.reiniciar()
+
+    def f():
+        return 1
+
+    assert metricas.medido("f")(f) is f
+    assert metricas.medir("x") is metricas.medir("y")
+    with metricas.medir("x"):
+        pass
+    assert metricas.resumen() == []
+
+
+def test_log_en_la_carpeta_de_datos(tmp_path, monkeypatch):
+    monkeypatch.setattr(metricas, "LOG_LENTAS", None)
+    metricas.ubicar_log(str(tmp_path))
+    assert metricas.ruta_log() == str(tmp_path / metricas.NOMBRE_LOG)
+    metricas.ubicar_log("/otra")  # the first data folder (or ENCANTO_LOG_LENTO) wins
+    assert metricas.ruta_log() == str(tmp_path / metricas.NOMBRE_LOG)
@@ -0,0 +1,74 @@
+import pytest
+
+from almacenamiento import AlmacenJSON, AlmacenSQLite
+from nucleo import ErrorNegocio, MotorEncanto
+from precios import FiltroPrecios
+
+
+@pytest.fixture
+def cajas(tmp_path):
+    db = str(tmp_path / "encanto.db")
+    motores = []
+
+    def abrir(caja):
+        m = MotorEncanto(almacen=AlmacenSQLite(db), caja=caja)
+        m.cargar()
+        motores.append(m)
+        return m
+    yield abrir
+    for m in motores:
+        m.cerrar()
+
+
+def test_deshacer_restaura_y_quita_el_lote(cajas):
+    a = cajas("A")
+    a.agregar_o_actualizar_producto("X1", "Bombacha", "M", 100, 10)
+    a.aplicar_cambios_precio(a.previsualizar_precios(FiltroPrecios(marca="M"), pct=10), "+10%")
+    assert a.producto("X1")["precio"] == 110
+    lote, restaurados, omitidos = a.deshacer_ultimo_cambio_precio()
+    assert lote["descripcion"] == "+10%" and len(restaurados) == 1 and omitidos == 0
+    assert a.producto("X1")["precio"] == 100
+    assert a.deshacer_precios.ultimo() is None
+    assert cajas("B").producto("X1")["precio"] == 100
+
+
+def test_deshacer_con_conflicto_conserva_el_lote(cajas):
+    a = cajas("A")
+    a.agregar_o_actualizar_producto("X1", "Bombacha", "M", 100, 10)
+    a.aplicar_cambios_precio(a.previsualizar_precios(FiltroPrecios(marca="M"), pct=10), "+10%")
+    b = cajas("B")
+    b.agregar_o_actualizar_producto("X1", "Bombacha", "M", 110, 7)  # the other register touches the row
+    with pytest.raises(ErrorNegocio):
+        a.deshacer_ultimo_cambio_precio()
+    # the batch is still there to undo, and memory matches the store
+    assert a.deshacer_precios.ultimo()["descripcion"] == "+10%"
+    assert a.producto("X1")["precio"] == 110
+    assert a.producto("X1")["stock"] == 7
+    # once in sync, the undo goes through
+    a.deshacer_ultimo_cambio_precio()
+    assert a.deshacer_precios.ultimo() is None
+    assert cajas("C").producto("X1")["precio"] == 100
+
+
+def test_deshacer_sin_poder_guardar_no_pierde_el_lote(tmp_path):
+    m = MotorEncanto(almacen=AlmacenJSON(str(tmp_path / "productos.json"), str(tmp_path / "ventas.json"),
+                                         str(tmp_path / "ventas.jsonl"), copia_binaria=False), caja="A")
+    m.cargar()
+    m.agregar_o_actualizar_producto("X1", "Bombacha", "M", 100, 10)
+    m.aplicar_cambios_precio(m.previsualizar_precios(FiltroPrecios(marca="M"), pct=10), "+10%")
+    # productos.json can no longer be replaced
+    (tmp_path / "productos.json").unlink()
+    (tmp_path / "productos.json").mkdir()
+    with pytest.raises(OSError):
+        m.deshacer_ultimo_cambio_precio()
+    assert m.producto("X1")["precio"] == 110
+    assert m.deshacer_precios.ultimo()["descripcion"] == "+10%"
+
+
+def test_registro_de_deshacer_junto_a_los_datos(cajas, tmp_path):
+    a = cajas("A")
+    a.agregar_o_actualizar_producto("X1", "Bombacha", "M", 100, 10)
+    a.aplicar_cambios_precio(a.previsualizar_precios(FiltroPrecios(marca="M"), pct=10), "+10%")
+    assert (tmp_path / "precios_deshacer.json").exists()
+    # another register on the same store sees the same history
+    assert cajas("B").deshacer_precios.ultimo()["descripcion"] == "+10%"
@@ -0,0 +1,71 @@
+import pytest
+
+from compacto import Venta
+from reportes import ENCABEZADO, agrupar, bloques_texto, lineas_reporte, ordenar, texto_resumen
+
+
+def venta(fecha, cliente, dni, *lineas):
+    return {"fecha": fecha, "cliente": cliente, "dni": dni, "tel": "",
+            "productos": [{"articulo": a, "nombre": f"Prod {a}", "marca": m, "cantidad": c, "precio": p}
+                          for a, m, c, p in lineas]}
+
+
+VENTAS = [
+    venta("02/01/2025 10:00", "beto", "2", ("B1", "Luna", 1, 30.0), ("A1", "Sol", 2, 5.0)),
+    venta("15/12/2024 09:00", "Ana", "1", ("A1", "Sol", 3, 5.0)),
+    venta("02/01/2025 18:00", "Ana", "", ("C1", "luna", 1, 8.0)),
+]
+
+
+def test_una_linea_por_articulo_vendido():
+    lineas = lineas_reporte(VENTAS)
+    assert [(l.pos, l.articulo, l.total) for l in lineas] == [(0, "B1", 30.0), (1, "A1", 10.0), (2, "A1", 15.0),
+                                                             (3, "C1", 8.0)]
+    # compact sales give the same lines
+    assert [l.texto() for l in lineas_reporte([Venta.desde(v) for v in VENTAS])] == [l.texto() for l in lineas]
+
+
+@pytest.mark.parametrize("orden,esperado", [
+    ("Fecha", ["B1", "A1", "A1", "C1"]),
+    ("Cliente", ["A1", "C1", "B1", "A1"]),
+    ("Marca", ["B1", "C1", "A1", "A1"]),
+    ("Importe (mayor primero)", ["B1", "A1", "A1", "C1"]),
+])
+def test_ordenar_es_estable(orden, esperado):
+    assert [l.articulo for l in ordenar(lineas_reporte(VENTAS), orden)] == esperado
+
+
+def test_ordenar_por_articulo_mantiene_la_llegada():
+    assert [l.pos for l in ordenar(lineas_reporte(VENTAS), "Artículo")] == [1, 2, 0, 3]
+
+
+def test_agrupar_por_dia_en_orden_cronologico():
+    assert agrupar(lineas_reporte(VENTAS), "Día") == [("15/12/2024", 3, 15.0, 1), ("02/01/2025", 4, 48.0, 3)]
+
+
+def test_agrupar_por_marca_y_cliente_por_importe():
+    lineas = lineas_reporte(VENTAS)
+    assert agrupar(lineas, "Marca") == [("Luna", 1, 30.0, 1), ("Sol", 5, 25.0, 2), ("luna", 1, 8.0, 1)]
+    assert agrupar(lineas, "Cliente") == [("beto (2)", 3, 40.0, 2), ("Ana (1)", 3, 15.0, 1), ("Ana", 1, 8.0, 1)]
+    assert agrupar(lineas, "(ninguno)") == []
+
+
+def test_bloques_texto_de_tamano_acotado():
+    lineas = lineas_reporte(VENTAS * 3)
+    bloques = list(bloques_texto(lineas, tam_bloque=5))
+    assert bloques[0].startswith(ENCABEZADO)
+    assert [b.count("\n") for b in bloques[1:]] == [5, 5, 2]
+    assert "".join(bloques[1:]) == "".join(l.texto() for l in lineas)
+
+
+def test_bloques_texto_con_grupos_primero():
+    bloques = list(bloques_texto(lineas_reporte(VENTAS), por="Marca"))
+    assert bloques[0].startswith("Marca")
+    assert bloques[1].splitlines()[0].startswith("Luna")
+    assert bloques[2] == "\n" and bloques[3].startswith(ENCABEZADO)
+
+
+def test_texto_resumen():
+    t = texto_resumen("01/01/2025", "31/01/2025", {"ventas": 2, "unidades": 4, "ingresos": 48.0})
+    assert t.splitlines()[:2] == ["Reporte 01/01/2025 -> 31/01/2025",
+                                  "Ventas: 2   Unidades: 4   Ganancia total periodo: $48.00"]
@@ -0,0 +1,62 @@
+from compacto import Producto
+from repositorio import RepositorioProductos
+
+
+def catalogo():
+    return [
+        {"articulo": "B10", "nombre": "Bombacha", "marca": "Lola", "precio": 10.0, "stock": 3},
+        {"articulo": "S20", "nombre": "Sostén", "marca": "LOLA", "precio": 20.0, "stock": 1},
+        {"articulo": "B11", "nombre": "Bombacha tiro alto", "marca": "Encanto", "precio": 12.0, "stock": 0},
+        {"articulo": "B10", "nombre": "Repetido", "marca": "Encanto", "precio": 1.0, "stock": 0},
+    ]
+
+
+def test_get_devuelve_el_primero_de_los_repetidos():
+    repo = RepositorioProductos(catalogo())
+    assert repo.get("B10")["nombre"] == "Bombacha"
+    assert [p["nombre"] for p in repo.todos("B10")] == ["Bombacha", "Repetido"]
+    assert repo.get("X") is None and "X" not in repo and "S20" in repo
+    assert len(repo) == 4
+
+
+def test_marca_sin_mayusculas_y_nombres_originales():
+    repo = RepositorioProductos(catalogo())
+    assert [p["articulo"] for p in repo.por_marca(" lola ")] == ["B10", "S20"]
+    assert repo.marcas() == ["Encanto", "LOLA", "Lola"]
+    assert repo.por_marca("otra") == []
+
+
+def test_prefijo_de_articulo():
+    repo = RepositorioProductos(catalogo())
+    assert [p["nombre"] for p in repo.por_prefijo("B1")] == ["Bombacha", "Repetido", "Bombacha tiro alto"]
+    assert repo.por_prefijo("Z") == []
+    repo.agregar({"articulo": "B12", "nombre": "Nueva", "marca": "Lola", "precio": 5.0, "stock": 1})
+    assert [p["articulo"] for p in repo.por_prefijo("B12")] == ["B12"]
+
+
+def test_edicion_mantiene_los_indices():
+    repo = RepositorioProductos(catalogo())
+    p = repo.get("S20")
+    assert repo.actualizar(p, marca="Encanto", articulo="S21", stock=7) is p
+    assert repo.get("S20") is None and repo.get("S21") is p and p["stock"] == 7
+    assert [x["articulo"] for x in repo.por_marca("lola")] == ["B10"]
+    assert repo.marcas() == ["Encanto", "Lola"]
+
+
+def test_bajas_sobre_la_misma_lista():
+    productos = catalogo()
+    repo = RepositorioProductos(productos)
+    eliminados = repo.eliminar("B10")
+    assert [p["nombre"] for p in eliminados] == ["Bombacha", "Repetido"]
+    assert [p["articulo"] for p in productos] == ["S20", "B11"]  # same list object, changed in place
+    repo.quitar(repo.get("S20"))
+    assert productos == [repo.get("B11")] and repo.marcas() == ["Encanto"]
+    assert repo.eliminar("B10") == []
+
+
+def test_altas_se_guardan_compactas():
+    productos = []
+    repo = RepositorioProductos(productos)
+    p = repo.agregar({"articulo": "N1", "nombre": "Camisón", "marca": "Lola", "precio": 30.0, "stock": 2})
+    assert isinstance(p, Producto) and productos == [p]
+    assert repo.get("N1") is p and repo.por_marca("LOLA") == [p]
@@ -0,0 +1,155 @@
+"""
+vistas.py
+Treeview virtualizado para tablas grandes (productos, historial de ventas).
+
+- Solo se materializan las filas visibles; el
+  scrollbar representa el total de filas del modelo.
+- El iid de cada fila es estable (por ejemplo el artículo), así un cambio
+  de stock o de precio actualiza esa fila directamente sin reconstruir la tabla.
+- actualizar(objs): diff sobre las filas visibles; las que no están en
+  pantalla se pintan al hacer scroll.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class TablaVirtual:
+    def __init__(self, tree, valores, clave_iid, filas=None, scrollbar=None):
+        """
+        tree: ttk.Treeview ya creado (columnas/encabezados configurados).
+        valores(obj) -> tupla de valores de la fila.
+        clave_iid(obj) -> texto base del iid estable (se desambigua si se repite).
+        """
+        self.tree = tree
+        self.valores = valores
+        self.clave_iid = clave_iid
+        self.filas = filas if filas is not None else []
+        self.offset = 0
+        self._iids = {}     # id(obj) -> (obj, iid)
+        self._usados = set()
+        self._visibles = []  # iids materializados, en orden
+        self._obj_iid = {}   # iid -> obj (solo visibles)
+        self.scrollbar = scrollbar
+        if scrollbar is not None:
+            scrollbar.configure(command=self._on_scrollbar)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tree.bind(seq, self._on_rueda)
+        tree.bind("<Configure>", lambda e: self.render())
+        tree.bind("<Down>", lambda e: self._on_tecla(1))
+        tree.bind("<Up>", lambda e: self._on_tecla(-1))
+        tree.bind("<Next>", lambda e: self.desplazar(self._capacidad()))
+        tree.bind("<Prior>", lambda e: self.desplazar(-self._capacidad()))
+
+    # -------------------- Modelo --------------------
+    def iid_de(self, obj):
+        ent = self._iids.get(id(obj))
+        if ent is not None and ent[0] is obj:
+            return ent[1]
+        base = str(self.clave_iid(obj) or "").strip() or "sin-articulo"
+        iid, n = base, 1
+        while iid in self._usados:
+            n += 1
+            iid = f"{base}#{n}"
+        self._usados.add(iid)
+        self._iids[id(obj)] = (obj, iid)
+        return iid
+
+    def set_filas(self, filas):
+        """Reemplaza el modelo (altas/bajas). Solo se redibuja la ventana visible."""
+        self.filas = filas
+        vivos = {id(o) for o in filas}
+        for k in [k for k in self._iids if k not in vivos]:
+            self._usados.discard(self._iids.pop(k)[1])
+        self.render()
+
+    def agregar_filas(self, nuevas):
+        """Agrega filas al final del modelo (p.ej. líneas de una venta nueva)."""
+        self.filas.extend(nuevas)
+        self.render()
+
+    def actualizar(self, objs):
+        """Actualiza en el lugar las filas visibles de esos objetos."""
+        for o in objs:
+            ent = self._iids.get(id(o))
+            if ent is not None and ent[0] is o and ent[1] in self._obj_iid:
+                self.tree.item(ent[1], values=self.valores(o))
+
+    # -------------------- Render --------------------
+    def _capacidad(self):
+        alto = self.tree.winfo_height()
+        try:
+            fila = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (ValueError, tk.TclError):
+            fila = 20
+        if alto <= 1:
+            return int(self.tree.cget("height") or 10)
+        return max(1, (alto - fila) // fila)  # menos el encabezado
+
+    def render(self):
+        n = len(self.filas)
+        cap = self._capacidad()
+        self.offset = max(0, min(self.offset, n - cap))
+        ventana = self.filas[self.offset:self.offset + cap]
+        nuevos = [self.iid_de(o) for o in ventana]
+        nuevos_set = set(nuevos)
+        sel = [i for i in self.tree.selection() if i in nuevos_set]
+        quitar = [i for i in self._visibles if i not in nuevos_set]
+        if quitar:
+            self.tree.delete(*quitar)
+        obj_iid = {}
+        for pos, (iid, o) in enumerate(zip(nuevos, ventana)):
+            obj_iid[iid] = o
+            vals = self.valores(o)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=vals)
+                self.tree.move(iid, "", pos)
+            else:
+                self.tree.insert("", pos, iid=iid, values=vals)
+        self._visibles = nuevos
+        self._obj_iid = obj_iid
+        if sel:
+            self.tree.selection_set(sel)
+        if self.scrollbar is not None:
+            if n:
+                self.scrollbar.set(self.offset / n, min(1.0, (self.offset + cap) / n))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+
+    def desplazar(self, filas):
+        self.offset += filas
+        self.render()
+        return "break"
+
+    def ir_a(self, indice):
+        self.offset = indice
+        self.render()
+
+    # -------------------- Eventos --------------------
+    def _on_scrollbar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self.ir_a(int(float(cantidad) * len(self.filas)))
+        elif accion == "scroll":
+            paso = self._capacidad() if unidad == "pages" else 1
+            self.desplazar(int(cantidad) * paso)
+
+    def _on_rueda(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            return self.desplazar(-3)
+        return self.desplazar(3)
+
+    def _on_tecla(self, paso):
+        # at the window edge, move the window instead of letting Tk scroll internally
+        foco = self.tree.focus()
+        if foco not in self._obj_iid:
+            return None
+        destino = self.offset + self._visibles.index(foco) + paso
+        if not 0 <= destino < len(self.filas):
+            return "break"
+        cap = self._capacidad()
+        if self.offset <= destino < self.offset + cap:
+            return None
+        self.ir_a(destino if paso < 0 else destino - cap + 1)
+        iid = self.iid_de(self.filas[destino])
+        self.tree.focus(iid); self.tree.selection_set(iid)
+        return "break"